@@ -1,9 +1,11 @@
 # import json
 from json import dumps as json_dumps
-from typing import Dict, List
-from urllib3.util import Retry
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
 from requests import Request, Session, Response
 import requests
+from requests_clients.deadline import current_deadline, endpoint_timeout
 from baidu_client.utils import pretty_print_POST
 
 
@@ -12,30 +14,122 @@ class ClientError(Exception):
 
 
 class BaiDuClient:
+    # 幂等的接口，配置了 hedger 时可以对冲
+    HEDGE_PATHS = frozenset({'/text2audio'})
 
-    def __init__(self, timeout=10, apikey: str = None, secretkey: str = None) -> None:
-        self.timeout: int = timeout
+    def __init__(self, timeout=10, apikey: str = None, secretkey: str = None, session: Optional[Session] = None,
+                 debug: bool = True, breaker=None, timeouts: Optional[Dict] = None, retries=0,
+                 retry_backoff=0.2, hedger=None) -> None:
+        """
+        :param timeout: 默认超时，可以是秒数或 (connect, read) 元组
+        :param timeouts: 按接口路径覆盖超时，如 ``{'/text2audio': (3, 30)}``
+        :param retries: 连接失败时的重试次数，POST 只在连接超时（请求未发出）时重试
+        :param session: 自定义的 requests.Session，可挂载 adapter（如本地桩服务），为空时第一次请求时新建，之后复用连接
+        :param debug: 是否打印每个请求的内容
+        :param breaker: 熔断器（requests_clients.breaker.CircuitBreaker），上游不可用时快速失败
+        :param hedger: 对冲（requests_clients.hedging.Hedger），只作用于 HEDGE_PATHS 中的接口
+        """
+        self.timeout = timeout
+        self.timeouts: Dict = timeouts or {}
+        self.retries = retries
+        self.retry_backoff = retry_backoff
         self.apikey = apikey
         self.secretkey = secretkey
+        self.session: Optional[Session] = session
+        self._default_session: Optional[Session] = None
+        self.debug = debug
+        self.breaker = breaker
+        self.hedger = hedger
 
-    def do_request(self, method, url, params=None, json=None, headers=None, files=None, data=None):
+    def prepare_request(self, method, url, params=None, json=None, headers=None, files=None, data=None):
         req = Request(method=method, url=url, params=params, json=json, headers=headers, files=files, data=data)
         prepared = req.prepare()
 
         if json:
             prepared.body = json_dumps(json, ensure_ascii=False, allow_nan=False).encode('utf-8')
             prepared.prepare_content_length(prepared.body)
-        pretty_print_POST(prepared)
+        return prepared
 
+    def do_request(self, method, url, params=None, json=None, headers=None, files=None, data=None):
+        prepared = self.prepare_request(method, url, params=params, json=json, headers=headers, files=files,
+                                        data=data)
+        if self.debug:
+            pretty_print_POST(prepared)
+
+        timeout = endpoint_timeout(url, self.timeouts, self.timeout)
+        hedge_key = self.hedge_key(url)
+
+        attempt = 0
+        while True:
+            try:
+                if hedge_key is None:
+                    return self.request_once(url, prepared, timeout)
+                return self.hedger.run(hedge_key, lambda: self.request_once(url, prepared, timeout))
+            except ClientError as err:
+                if attempt >= self.retries or not self.should_retry(method, err.args[0]):
+                    raise
+            attempt += 1
+            delay = self.retry_backoff * 2 ** (attempt - 1)
+            deadline = current_deadline()
+            if deadline is not None:
+                delay = min(delay, deadline.check())
+            time.sleep(delay)
+
+    def should_retry(self, method, err) -> bool:
+        """连接超时说明请求没有发出，任何方法都可以重试；其他连接错误只重试 GET"""
+        if isinstance(err, requests.exceptions.ConnectTimeout):
+            return True
+        return isinstance(err, requests.exceptions.ConnectionError) and method.lower() == 'get'
+
+    def hedge_key(self, url) -> Optional[str]:
+        """可以对冲时返回对冲统计用的 key（不含查询参数的 URL），否则返回 None"""
+        if self.hedger is None:
+            return None
+        key = url.split('?', 1)[0]
+        return key if urlsplit(key).path in self.HEDGE_PATHS else None
+
+    def request_once(self, url, prepared, timeout):
+        """发送一次请求，超时会被当前截止时间裁剪"""
+        deadline = current_deadline()
+        if deadline is not None:
+            timeout = deadline.clip(timeout)
+
+        if self.breaker is None:
+            return self.send(prepared, timeout)
+
+        self.breaker.before(url)
+        resp = None
+        try:
+            resp = self.send(prepared, timeout)
+            return resp
+        finally:
+            self.breaker.record(url, resp is not None and resp.status_code < 500)
+
+    def default_session(self) -> Session:
+        """没有传入 session 时用的 Session，延迟到第一次请求创建；并发创建时多建一个也没关系"""
+        if self._default_session is None:
+            self._default_session = Session()
+        return self._default_session
+
+    def send(self, prepared, timeout=None):
         try:
-            s = Session()
+            s = self.session or self.default_session()
             # s.mount('http://', HTTPAdapter(max_retries=self.retries))
-            return s.send(prepared, timeout=self.timeout)
+            return s.send(prepared, timeout=self.timeout if timeout is None else timeout)
         except requests.exceptions.ReadTimeout as err:
             raise ClientError(err)
         except requests.exceptions.ConnectionError as err:
             raise ClientError(err)
 
+    def stats(self) -> Dict:
+        """运行状态，便于接入监控"""
+        stats = {}
+        if self.breaker is not None:
+            stats['breaker'] = self.breaker.stats()
+        if self.hedger is not None:
+            stats['hedger'] = self.hedger.stats()
+        return stats
+
     def do_get(self, url, params=None, headers=None):
         return self.do_request('get', url, params=params, headers=headers)
 
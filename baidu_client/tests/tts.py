@@ -0,0 +1,38 @@
+"""
+pytest baidu_client/tests/tts.py -s
+
+使用本地桩服务，不需要 .env
+"""
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from baidu_client.client import BaiDuClient
+from baidu_client.tts import concat_wav, gbk_len, split_text, text2audio_long
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+
+
+def test_split_text():
+    """
+    pytest baidu_client/tests/tts.py::test_split_text -s
+    """
+    text = '你好，世界。' * 300 + '没' * 2000
+    pieces = split_text(text, max_bytes=1000)
+    assert ''.join(pieces) == text
+    assert all(gbk_len(piece) <= 1000 for piece in pieces)
+
+
+def test_text2audio_long_wav():
+    """
+    pytest baidu_client/tests/tts.py::test_text2audio_long_wav -s
+    """
+    client = BaiDuClient(session=mock_session(MockApp()), debug=False)
+    text = '百度语音合成可以将文本转换为音频。' * 200
+    wav = text2audio_long(client, text, token='token', cuid='test', aue=6)
+    assert wav[:4] == b'RIFF'
+    assert concat_wav([wav]) == wav
+
+    mp3 = text2audio_long(client, text, token='token', cuid='test')
+    assert len(mp3) == len(text) * 500
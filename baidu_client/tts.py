@@ -0,0 +1,89 @@
+"""
+长文本语音合成：按标点把文本切成 text2audio 能接受的片段，逐段合成后拼接音频。
+"""
+import re
+import struct
+from typing import Iterable, Iterator, List
+
+from baidu_client.client import BaiDuClient, ClientError
+from requests_clients.offload import register_stage, run_stage
+
+# text2audio 的 tex 必须小于 1024 个 GBK 字节
+MAX_TEXT_BYTES = 1000
+WAV_AUE = 6
+
+SENTENCE_END = re.compile(r'(?<=[。！？；，、,.!?;\n])')
+
+
+def gbk_len(text: str) -> int:
+    return len(text.encode('gbk', errors='replace'))
+
+
+def split_text(text: str, max_bytes: int = MAX_TEXT_BYTES) -> List[str]:
+    """把长文本按句切分，每段不超过 max_bytes 个 GBK 字节"""
+    pieces = []
+    current = ''
+    for sentence in SENTENCE_END.split(text):
+        if not sentence:
+            continue
+        while gbk_len(sentence) > max_bytes:
+            # 单句过长时按字符硬切
+            cut = max_bytes // 2
+            head, sentence = sentence[:cut], sentence[cut:]
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(head)
+        if gbk_len(current) + gbk_len(sentence) > max_bytes:
+            pieces.append(current)
+            current = ''
+        current += sentence
+    if current.strip():
+        pieces.append(current)
+    return [piece for piece in pieces if piece.strip()]
+
+
+def concat_wav(chunks: Iterable[bytes]) -> bytes:
+    """拼接多个 wav，沿用第一个的 fmt，重写 RIFF/data 长度"""
+    fmt = None
+    data = []
+    for chunk in chunks:
+        offset = 12
+        while offset + 8 <= len(chunk):
+            chunk_id, size = struct.unpack('<4sI', chunk[offset:offset + 8])
+            body = chunk[offset + 8:offset + 8 + size]
+            if chunk_id == b'fmt ' and fmt is None:
+                fmt = body
+            elif chunk_id == b'data':
+                data.append(body)
+            offset += 8 + size + (size & 1)
+    if fmt is None:
+        raise ValueError('不是有效的 wav 数据')
+    data_size = sum(len(d) for d in data)
+    header = b'RIFF' + struct.pack('<I', 4 + 8 + len(fmt) + 8 + data_size) + b'WAVE'
+    header += b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', data_size)
+    return header + b''.join(data)
+
+
+register_stage('tts.concat_wav', concat_wav)
+
+
+def iter_text2audio(client: BaiDuClient, pieces: Iterable[str], token, cuid, **kwargs) -> Iterator[bytes]:
+    for piece in pieces:
+        resp = client.text2audio(piece, token=token, cuid=cuid, **kwargs)
+        if not resp.headers.get('Content-Type', '').startswith('audio'):
+            raise ClientError(resp.text)
+        yield resp.content
+
+
+def text2audio_long(client: BaiDuClient, text: str, token, cuid, aue=3, offloader=None, **kwargs) -> bytes:
+    """合成任意长度的文本
+
+    mp3/pcm 直接按字节拼接（mp3 由独立的帧组成），wav 需要合并文件头。
+
+    :param offloader: requests_clients.offload.Offloader，wav 拼接放到进程池执行，音频通过共享内存传递
+    """
+    chunks = iter_text2audio(client, split_text(text), token, cuid, aue=aue, **kwargs)
+    if aue == WAV_AUE:
+        return run_stage(offloader, 'tts.concat_wav', list(chunks) if offloader is not None else chunks)
+    return b''.join(chunks)
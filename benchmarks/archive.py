@@ -0,0 +1,55 @@
+"""
+草稿导出：全部翻页后 json.dump 与逐页写 NDJSON 的内存峰值；正文内联与存到 blob 目录时只读标题的扫描耗时。
+"""
+import json
+import os
+import tempfile
+import time
+from typing import Dict
+
+from benchmarks.common import peak_memory
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from weixin_client.archive import export_archive, iter_archive, iter_pages
+from weixin_client.client import WeiXinClient
+
+TOKEN = 'MOCK_TOKEN'
+CONTENT_BYTES = 20 * 1024
+
+
+def scan_titles(path: str) -> float:
+    start = time.perf_counter()
+    titles = [item['content']['news_item'][0]['title'] for item in iter_archive(path, load_content=False)]
+    assert titles
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def run(quick: bool = False) -> Dict:
+    drafts = 200 if quick else 2000
+    app = MockApp()
+    app.weixin.drafts.clear()
+    for index in range(drafts):
+        # 每篇正文不同，blob 不会去重
+        content = f'<p>{index}</p>' + '正文' * (CONTENT_BYTES // 6)
+        app.weixin.drafts[app.weixin.new_id('DRAFT')] = {
+            'news_item': [{'title': f'标题{index}', 'content': content, 'thumb_media_id': 'MEDIA'}], 'update_time': 0}
+    client = WeiXinClient(session=mock_session(app))
+    results = {'drafts': drafts}
+
+    with tempfile.TemporaryDirectory() as root:
+        dump_path = os.path.join(root, 'dump.json')
+
+        def dump_all():
+            items = [item for page in iter_pages(client, TOKEN, 'drafts') for item in page['item']]
+            with open(dump_path, 'w', encoding='utf-8') as fp:
+                json.dump(items, fp, ensure_ascii=False)
+
+        inline_path = os.path.join(root, 'inline.ndjson')
+        blob_path = os.path.join(root, 'drafts.ndjson')
+        results['dump_peak_bytes'] = peak_memory(dump_all)
+        results['ndjson_peak_bytes'] = peak_memory(
+            lambda: export_archive(client, TOKEN, 'drafts', inline_path, blob_threshold=None))
+        export_archive(client, TOKEN, 'drafts', blob_path)
+        results['inline_scan_ms'] = scan_titles(inline_path)
+        results['blob_scan_ms'] = scan_titles(blob_path)
+    return results
@@ -0,0 +1,35 @@
+"""
+卡券批量核销的吞吐：桩服务每个请求延迟 5ms，用 RedemptionQueue 在 1/4/16 个线程下核销同一批 code。
+"""
+import time
+from typing import Dict
+
+from requests_clients.mock.app import Faults, MockApp
+from requests_clients.mock.server import MockServer
+from weixin_client.cards import CONSUMED, RedemptionQueue
+from weixin_client.client import WeiXinClient
+
+LATENCY = 0.005
+WORKERS = (1, 4, 16)
+
+
+def measure(server: MockServer, total: int, workers: int) -> float:
+    card_id = server.app.weixin.add_card(codes=total)
+    codes = [f'{card_id}-{index}' for index in range(total)]
+    client = WeiXinClient(session=server.session(pool_maxsize=workers * 2))
+    queue = RedemptionQueue(client, 'MOCK_TOKEN', max_workers=workers)
+    start = time.perf_counter()
+    results = queue.consume_all(codes)
+    elapsed = time.perf_counter() - start
+    queue.close()
+    assert all(result.status == CONSUMED for result in results)
+    return round(total / elapsed, 1)
+
+
+def run(quick: bool = False) -> Dict:
+    total = 100 if quick else 1000
+    results = {}
+    with MockServer(MockApp(faults=Faults(latency=LATENCY))) as server:
+        for workers in WORKERS:
+            results[f'workers_{workers}_redeem_per_s'] = measure(server, total, workers)
+    return results
@@ -0,0 +1,73 @@
+"""
+基准测试的公共工具：计时、内存峰值、子进程桩服务。
+"""
+import gc
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_per_call(func: Callable, number: int, repeat: int = 5) -> float:
+    """返回 func 单次调用的耗时（微秒），取 repeat 轮中的最小值"""
+    func()
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1e6, 2)
+
+
+def peak_memory(func: Callable) -> int:
+    """返回 func 执行期间 Python 分配内存的峰值增量（字节）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - base
+
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        'p50_ms': round(statistics.median(samples) * 1000, 2),
+        'p99_ms': round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+@contextmanager
+def mock_server_process(*args: str):
+    """在子进程里启动桩服务，避免服务端的内存和 GIL 影响客户端的测量结果"""
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'requests_clients.mock', '--port', '0', *args],
+        stdout=subprocess.PIPE,
+        text=True,
+        cwd=ROOT_DIR,
+    )
+    try:
+        line = proc.stdout.readline()
+        yield line.rsplit(' ', 1)[-1].strip()
+    finally:
+        proc.terminate()
+        proc.wait()
@@ -0,0 +1,51 @@
+"""
+高并发下 HTTP/1.1 与 HTTP/2 的连接数和吞吐：桩服务每个请求延迟 20ms，64 个线程同时调用 get_draft_count。
+HTTP/1.1 用 requests（连接池 64），HTTP/2 用 HTTP2Adapter 连 h2c 桩服务（1 个连接）。没有安装 httpx 和 h2 时跳过。
+"""
+import importlib.util
+import sys
+import threading
+import time
+from typing import Dict
+
+from requests_clients.mock.app import Faults, MockApp
+from requests_clients.mock.server import MockServer
+from weixin_client.client import WeiXinClient
+
+LATENCY = 0.02
+CONCURRENCY = 64
+
+
+def measure(client: WeiXinClient, total: int) -> float:
+    per_thread = total // CONCURRENCY
+
+    def worker():
+        for _ in range(per_thread):
+            client.get_draft_count('MOCK_TOKEN')
+
+    threads = [threading.Thread(target=worker) for _ in range(CONCURRENCY)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return round(per_thread * CONCURRENCY / (time.perf_counter() - start), 1)
+
+
+def run(quick: bool = False) -> Dict:
+    if not all(importlib.util.find_spec(name) for name in ('httpx', 'h2')):
+        print('跳过 http2：需要安装 httpx 和 h2', file=sys.stderr)
+        return {}
+    from requests_clients.mock.h2server import H2MockServer
+
+    total = CONCURRENCY * (2 if quick else 10)
+    results = {}
+    with MockServer(MockApp(faults=Faults(latency=LATENCY))) as server:
+        client = WeiXinClient(session=server.session(pool_maxsize=CONCURRENCY))
+        results['http1_per_s'] = measure(client, total)
+        results['http1_connections'] = server.connections
+    with H2MockServer(MockApp(faults=Faults(latency=LATENCY))) as server:
+        client = WeiXinClient(session=server.session(max_connections=1))
+        results['http2_per_s'] = measure(client, total)
+        results['http2_connections'] = server.connections
+    return results
@@ -0,0 +1,35 @@
+"""
+JS-SDK 签名的单次耗时：只计算 sha1、完整的 sign()（含 ticket 缓存检查和随机串）、按 URL 缓存签名。
+"""
+import secrets
+import time
+from typing import Dict
+
+from benchmarks.common import time_per_call
+from weixin_client.jssdk import JsapiSigner, make_signature
+
+TICKET = 'sM4AOVdWfPE4DxkXGEs8VMCPGGVi4C3VM0P37wVUCFvkVAy_90u5h9nbSlYy3-Sl-HhTdfl2fzFy1AOcHKP7qg'
+URL = 'https://example.com/article/detail?id=12345&from=timeline'
+
+
+class StubClient:
+
+    def get_jsapi_ticket(self, access_token):
+        return {'errcode': 0, 'ticket': TICKET, 'expires_in': 7200}
+
+
+def run(quick: bool = False) -> Dict:
+    number = 2000 if quick else 20000
+    signer = JsapiSigner(StubClient(), 'token')
+    memo_signer = JsapiSigner(StubClient(), 'token', memoize=True)
+
+    def naive():
+        make_signature(TICKET, secrets.token_hex(8), int(time.time()), URL)
+
+    results = {
+        'naive_sign_us': time_per_call(naive, number),
+        'sign_us': time_per_call(lambda: signer.sign(URL), number),
+        'memoized_sign_us': time_per_call(lambda: memo_signer.sign(URL), number),
+    }
+    results['signs_per_s'] = round(1e6 / results['sign_us'])
+    return results
@@ -0,0 +1,53 @@
+"""
+本地素材重复上传：同一个 4MB 文件每次读出来上传，与 MediaLibrary 映射上传、命中索引跳过上传的单次耗时对比。
+"""
+import os
+import tempfile
+import time
+from typing import Dict
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.media import MediaLibrary
+
+SIZE = 4 * 1024 * 1024
+TOKEN = 'MOCK_TOKEN'
+
+
+def timeit(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return round((time.perf_counter() - start) / repeat * 1000, 3)
+
+
+def run(quick: bool = False) -> Dict:
+    repeat = 5 if quick else 50
+    client = WeiXinClient(session=mock_session(MockApp()))
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'video.mp4')
+        with open(path, 'wb') as fp:
+            fp.write(os.urandom(SIZE))
+
+        def read_upload():
+            with open(path, 'rb') as fp:
+                client.add_material_by_content(TOKEN, 'video', ('video.mp4', fp.read()), 'title', 'intro')
+
+        library = MediaLibrary(root)
+
+        def mmap_upload():
+            # 每次换一个公众号，不命中上传记录，只测映射发送
+            mmap_upload.count += 1
+            library.add_material(client, TOKEN, 'video.mp4', 'video', 'title', 'intro', account=str(mmap_upload.count))
+        mmap_upload.count = 0
+
+        library.add_material(client, TOKEN, 'video.mp4', 'video', 'title', 'intro')
+        results = {
+            'read_upload_ms': timeit(read_upload, repeat),
+            'mmap_upload_ms': timeit(mmap_upload, repeat),
+            'cached_ms': timeit(lambda: library.add_material(client, TOKEN, 'video.mp4', 'video', 'title', 'intro'),
+                                repeat),
+        }
+        library.close()
+    return results
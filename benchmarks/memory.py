@@ -0,0 +1,33 @@
+"""
+素材上传/下载时客户端的内存峰值，用 tracemalloc 统计，桩服务跑在子进程里不计入。
+"""
+from typing import Dict
+
+from benchmarks.common import mock_server_process, peak_memory
+from requests_clients.mock.adapters import mock_session
+from weixin_client.client import WeiXinClient
+
+TOKEN = 'MOCK_TOKEN'
+
+
+def run(quick: bool = False) -> Dict:
+    size = (2 if quick else 16) * 1024 * 1024
+    payload = bytes(range(256)) * (size // 256)
+    results = {'payload_bytes': size}
+
+    with mock_server_process() as url:
+        client = WeiXinClient(session=mock_session(url))
+        uploaded = {}
+
+        def upload():
+            uploaded.update(client.add_material_by_content(TOKEN, 'image', payload, 'title', 'intro'))
+
+        def download():
+            client.get_material(TOKEN, uploaded['media_id']).content
+
+        results['upload_peak_bytes'] = peak_memory(upload)
+        results['download_peak_bytes'] = peak_memory(download)
+
+    results['upload_peak_ratio'] = round(results['upload_peak_bytes'] / size, 2)
+    results['download_peak_ratio'] = round(results['download_peak_bytes'] / size, 2)
+    return results
@@ -0,0 +1,61 @@
+"""
+1 万条草稿列表常驻内存对比：原始 dict 与 weixin_client.models 的 slots 模型。
+按每页 20 条解码 JSON，分别保留 dict 或转换后的模型。
+"""
+import gc
+import json
+import time
+import tracemalloc
+from typing import Dict, List
+
+from requests_clients.mock.weixin import make_content
+from weixin_client.models import parse_draft_list
+
+PAGE_SIZE = 20
+
+
+def make_pages(total: int, content_size: int) -> List[bytes]:
+    pages = []
+    for offset in range(0, total, PAGE_SIZE):
+        items = []
+        for index in range(offset, min(total, offset + PAGE_SIZE)):
+            news = {
+                'title': f'测试文章{index}', 'author': '作者', 'digest': '摘要',
+                'content': make_content(index, content_size), 'content_source_url': '',
+                'thumb_media_id': 'MEDIA_00000001', 'show_cover_pic': 0, 'need_open_comment': 0,
+                'only_fans_can_comment': 0, 'url': f'http://mp.weixin.qq.com/s?__biz=MOCK&mid={index}',
+            }
+            items.append({'media_id': f'DRAFT_{index:08d}', 'content': {'news_item': [news]}, 'update_time': 0})
+        body = {'total_count': total, 'item_count': len(items), 'item': items}
+        pages.append(json.dumps(body, ensure_ascii=False).encode('utf-8'))
+    return pages
+
+
+def retained(build) -> Dict:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {'retained_mb': round(current / 1024 / 1024, 1), 'peak_mb': round(peak / 1024 / 1024, 1),
+            'build_s': round(elapsed, 2)}
+
+
+def run(quick: bool = False) -> Dict:
+    total = 1000 if quick else 10000
+    pages = make_pages(total, 8 * 1024)
+
+    def as_dicts():
+        return [item for page in pages for item in json.loads(page)['item']]
+
+    def as_models():
+        return [draft for page in pages for draft in parse_draft_list(json.loads(page)).item]
+
+    results = {'items': total}
+    for name, build in (('dict', as_dicts), ('model', as_models)):
+        for key, value in retained(build).items():
+            results[f'{name}_{key}'] = value
+    return results
@@ -0,0 +1,69 @@
+"""
+进程池卸载 CPU 密集阶段：
+
+1. 16MB wav 拼接经 pickle 管道与共享内存传给子进程的耗时
+2. 一个线程持续改写大篇 HTML 时，另一个线程里 1ms 周期任务（代表网络 I/O 线程）的 p99 延迟，
+   对比在当前进程执行和放到进程池执行
+"""
+import threading
+import time
+from typing import Dict
+
+from baidu_client.tts import concat_wav
+from benchmarks.common import latency_summary
+from requests_clients.mock.baidu import make_wav
+from requests_clients.offload import Offloader, run_stage
+from weixin_client.images import collect_images
+
+AUDIO_SIZE = 16 * 1024 * 1024
+TICK = 0.001
+
+
+def transfer_ms(offloader: Offloader, chunks, number: int) -> float:
+    assert offloader.run('tts.concat_wav', chunks) == concat_wav(chunks)
+    start = time.perf_counter()
+    for _ in range(number):
+        offloader.run('tts.concat_wav', chunks)
+    return round((time.perf_counter() - start) / number * 1000, 2)
+
+
+def tick_latency(offloader, content: str, rounds: int) -> Dict:
+    """后台线程反复改写 HTML，测量周期任务的实际间隔超出 TICK 的部分"""
+    mapping = {url: url.replace('example.com', 'mmbiz.qpic.cn') for url in collect_images(content)}
+    stop = threading.Event()
+
+    def rewrite():
+        for _ in range(rounds):
+            run_stage(offloader, 'html.rewrite_images', content, mapping)
+        stop.set()
+
+    samples = []
+    thread = threading.Thread(target=rewrite)
+    start = time.perf_counter()
+    thread.start()
+    while not stop.is_set():
+        before = time.perf_counter()
+        time.sleep(TICK)
+        samples.append(time.perf_counter() - before - TICK)
+    thread.join()
+    result = latency_summary(samples)
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def run(quick: bool = False) -> Dict:
+    number = 3 if quick else 10
+    rounds = 10 if quick else 40
+    chunks = [make_wav(b'\1' * (AUDIO_SIZE // 4)) for _ in range(4)]
+    content = ''.join(f'<p>{"文字" * 200}</p><img src="https://example.com/{index}.jpg">' for index in range(1000))
+
+    results = {}
+    with Offloader(max_workers=2, shm_threshold=1 << 62) as pickled:
+        results['wav_16mb_pickle_ms'] = transfer_ms(pickled, chunks, number)
+    with Offloader(max_workers=2) as offloader:
+        results['wav_16mb_shm_ms'] = transfer_ms(offloader, chunks, number)
+        for key, value in tick_latency(None, content, rounds).items():
+            results[f'inline_tick_{key}'] = value
+        for key, value in tick_latency(offloader, content, rounds).items():
+            results[f'offloaded_tick_{key}'] = value
+    return results
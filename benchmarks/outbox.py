@@ -0,0 +1,43 @@
+"""
+持久化发送队列：生产者入队的单次耗时（与上游延迟无关），以及桩服务延迟 20ms 时 4/16 个线程的发送吞吐。
+"""
+import os
+import tempfile
+import time
+from typing import Dict
+
+from benchmarks.common import time_per_call
+from requests_clients.mock.app import Faults, MockApp
+from requests_clients.mock.server import MockServer
+from weixin_client.client import WeiXinClient
+from weixin_client.outbox import Outbox
+
+LATENCY = 0.02
+WORKERS = (4, 16)
+DATA = {'thing1': {'value': 'hello'}}
+
+
+def run(quick: bool = False) -> Dict:
+    total = 200 if quick else 2000
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, MockServer(MockApp(faults=Faults(latency=LATENCY))) as server:
+        for workers in WORKERS:
+            client = WeiXinClient(session=server.session(pool_maxsize=workers * 2))
+            outbox = Outbox(os.path.join(tmp_dir, f'outbox-{workers}.db'), client, 'MOCK_TOKEN', max_workers=workers)
+            counter = iter(range(10 ** 9))
+
+            def enqueue():
+                outbox.enqueue('bizsend_message', f'openid{next(counter)}', 'TEMPLATE', DATA)
+
+            if workers == WORKERS[0]:
+                results['enqueue_us'] = time_per_call(enqueue, total // 5, repeat=3)
+                batch = [('bizsend_message', ('openid', 'TEMPLATE', DATA), {}, None)] * 100
+                results['enqueue_many_us_per_item'] = round(
+                    time_per_call(lambda: outbox.enqueue_many(batch), max(1, total // 500), repeat=3) / 100, 2)
+            pending = outbox.stats()['pending']
+            if pending < total:
+                outbox.enqueue_many([('bizsend_message', ('openid', 'TEMPLATE', DATA), {}, None)] * (total - pending))
+            start = time.perf_counter()
+            sent = outbox.drain()
+            results[f'workers_{workers}_sent_per_s'] = round(sent / (time.perf_counter() - start), 1)
+    return results
@@ -0,0 +1,46 @@
+"""
+客户端单次调用的自身开销（进程内桩服务，不含网络）：请求构造、JSON 编解码、handle_response。
+"""
+from typing import Dict
+
+from benchmarks.common import time_per_call
+from requests_clients.mock.adapters import build_response, mock_session
+from requests_clients.mock.app import MockApp, MockRequest
+from weixin_client.client import WeiXinClient
+
+TOKEN = 'MOCK_TOKEN'
+BIZSEND_URL = 'https://api.weixin.qq.com/cgi-bin/message/subscribe/bizsend'
+COUNT_URL = 'https://api.weixin.qq.com/cgi-bin/draft/count'
+TEMPLATE_DATA = {'thing1': {'value': '订单已发货'}, 'time2': {'value': '2023-10-01 12:00'}}
+
+
+def canned_response(app: MockApp, client: WeiXinClient, method, url, json=None):
+    prepared = client.prepare_request(method, url, params={'access_token': TOKEN}, json=json)
+    mock_response = app.handle(MockRequest(prepared.method, prepared.url, dict(prepared.headers), prepared.body))
+    resp = build_response(prepared, mock_response.status, mock_response.headers, mock_response.body)
+    resp.content
+    return resp
+
+
+def run(quick: bool = False) -> Dict:
+    number = 200 if quick else 2000
+    app = MockApp()
+    client = WeiXinClient(session=mock_session(app))
+    body = {'touser': 'openid', 'template_id': 'template', 'data': TEMPLATE_DATA}
+
+    ok_resp = canned_response(app, client, 'post', BIZSEND_URL, json=body)
+    list_resp = canned_response(app, client, 'post', 'https://api.weixin.qq.com/cgi-bin/draft/batchget',
+                                json={'offset': 0, 'count': 20, 'no_content': 0})
+
+    return {
+        'prepare_get_us': time_per_call(
+            lambda: client.prepare_request('get', COUNT_URL, params={'access_token': TOKEN}), number),
+        'prepare_json_us': time_per_call(
+            lambda: client.prepare_request('post', BIZSEND_URL, params={'access_token': TOKEN}, json=body), number),
+        'handle_response_us': time_per_call(lambda: client.handle_response(ok_resp), number),
+        'json_decode_draft_list_us': time_per_call(list_resp.json, max(10, number // 20)),
+        'call_get_draft_count_us': time_per_call(lambda: client.get_draft_count(TOKEN), number),
+        'call_bizsend_message_us': time_per_call(
+            lambda: client.bizsend_message(TOKEN, 'openid', 'template', TEMPLATE_DATA), number),
+        'call_get_draft_list_us': time_per_call(lambda: client.get_draft_list(TOKEN), max(10, number // 20)),
+    }
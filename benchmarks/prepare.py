@@ -0,0 +1,42 @@
+"""
+热点接口的请求构造开销：完整 Request.prepare() 与请求模板对比，
+并换算成每秒 1 万次调用时构造请求所占的 CPU 比例。
+"""
+from json import dumps as json_dumps
+from typing import Dict
+
+from requests import Request
+
+from benchmarks.common import time_per_call
+from weixin_client.client import WeiXinClient
+
+CALLS_PER_S = 10000
+TOKEN = 'MOCK_TOKEN'
+ENDPOINTS = {
+    'bizsend_message': ('https://api.weixin.qq.com/cgi-bin/message/subscribe/bizsend',
+                        {'touser': 'openid', 'template_id': 'template', 'data': {'thing1': {'value': '订单已发货'}}}),
+    'mass_get': ('https://api.weixin.qq.com/cgi-bin/message/mass/get', {'msg_id': 201053012}),
+    'query_publish_status': ('https://api.weixin.qq.com/cgi-bin/freepublish/get', {'publish_id': '100000001'}),
+}
+
+
+def full_prepare(url, body):
+    prepared = Request(method='post', url=url, params={'access_token': TOKEN}, json=body).prepare()
+    prepared.body = json_dumps(body, ensure_ascii=False, allow_nan=False).encode('utf-8')
+    prepared.prepare_content_length(prepared.body)
+    return prepared
+
+
+def run(quick: bool = False) -> Dict:
+    number = 1000 if quick else 10000
+    client = WeiXinClient()
+    results = {}
+    for name, (url, body) in ENDPOINTS.items():
+        full = time_per_call(lambda: full_prepare(url, body), number)
+        template = time_per_call(lambda: client.prepare_request('post', url, params={'access_token': TOKEN},
+                                                                json=body), number)
+        results[f'{name}_full_us'] = full
+        results[f'{name}_template_us'] = template
+        results[f'{name}_full_cpu_pct_at_10k'] = round(full * CALLS_PER_S / 1e4, 1)
+        results[f'{name}_template_cpu_pct_at_10k'] = round(template * CALLS_PER_S / 1e4, 1)
+    return results
@@ -0,0 +1,111 @@
+"""
+运行基准测试，结果以 JSON 输出，便于跟踪回归
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --quick --only overhead,tts
+    python -m benchmarks.run --compare old.json new.json
+
+不需要网络和 .env，所有请求都发往本地桩服务。
+"""
+import argparse
+import importlib
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from benchmarks.common import ROOT_DIR
+
+BENCHMARKS = (
+    'overhead',
+    'prepare',
+    'throughput',
+    'memory',
+    'models',
+    'tts',
+    'hedging',
+    'jssdk',
+    'cards',
+    'outbox',
+    'offload',
+    'media',
+    'startup',
+    'archive',
+    'http2',
+)
+
+# 指标名以这些后缀结尾时数值越大越好，其余（耗时、内存）越小越好
+HIGHER_IS_BETTER = ('_per_s',)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run(names, quick: bool = False) -> Dict:
+    results = {}
+    for name in names:
+        module = importlib.import_module(f'benchmarks.{name}')
+        print(f'running {name} ...', file=sys.stderr, flush=True)
+        results[name] = module.run(quick=quick)
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(old: Dict, new: Dict) -> str:
+    lines = [f'{"metric":<48}{"old":>14}{"new":>14}{"change":>10}']
+    for name, metrics in new['results'].items():
+        old_metrics = old['results'].get(name, {})
+        for key, value in metrics.items():
+            if key not in old_metrics:
+                continue
+            old_value = old_metrics[key]
+            change = (value - old_value) / old_value * 100 if old_value else 0.0
+            better = change > 0 if key.endswith(HIGHER_IS_BETTER) else change < 0
+            mark = '' if abs(change) < 5 else (' +' if better else ' -')
+            lines.append(f'{name + "." + key:<48}{old_value:>14}{value:>14}{change:>9.1f}%{mark}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run')
+    parser.add_argument('--only', help='逗号分隔的基准名，默认全部：' + ','.join(BENCHMARKS))
+    parser.add_argument('--quick', action='store_true', help='减少迭代次数，用于 CI 冒烟')
+    parser.add_argument('--output', help='结果 JSON 文件，默认输出到 stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='对比两次运行的结果')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        print(compare(old, new))
+        return
+
+    names = args.only.split(',') if args.only else BENCHMARKS
+    result = run(names, quick=args.quick)
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+冷启动：新进程中导入客户端模块的耗时（``python -X importtime`` 统计的累计时间）、导入的模块数，
+导入 + 构造客户端 + 构造第一个请求的总耗时，以及每次请求新建 Session 与复用的开销。
+
+测量方法和预算见 requests_clients.importtime。
+"""
+from typing import Dict
+
+from requests import Session
+
+from benchmarks.common import time_per_call
+from requests_clients.importtime import IMPORT_BUDGET_MS, MODULE_BUDGET, cold_start, import_time_us
+from weixin_client.client import WeiXinClient
+
+MODULES = ('weixin_client.client', 'baidu_client.client')
+
+
+def run(quick: bool = False) -> Dict:
+    repeat = 3 if quick else 10
+    results = {}
+    cold_start()
+    for module in MODULES:
+        # 取最小值，排除磁盘缓存和调度抖动
+        results[f'{module.split(".")[0]}_import_us'] = min(import_time_us(module) for _ in range(repeat))
+    runs = [cold_start() for _ in range(repeat)]
+    results['cold_prepare_ms'] = round(min(seconds for seconds, _ in runs) * 1000, 2)
+    results['cold_modules'] = runs[0][1]
+    results['import_budget_ms'] = IMPORT_BUDGET_MS
+    results['module_budget'] = MODULE_BUDGET
+    results['construct_us'] = time_per_call(WeiXinClient, 10000)
+    client = WeiXinClient()
+    results['session_new_us'] = time_per_call(Session, 1000)
+    results['session_reuse_us'] = time_per_call(client.default_session, 10000)
+    return results
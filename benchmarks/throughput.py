@@ -0,0 +1,38 @@
+"""
+不同并发下的吞吐量与延迟，桩服务跑在子进程里并对每个请求注入 20ms 延迟。
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from benchmarks.common import latency_summary, mock_server_process
+from requests_clients.mock.adapters import mock_session
+from weixin_client.client import WeiXinClient
+
+LATENCY = 0.02
+CONCURRENCY = (1, 8, 32)
+
+
+def run(quick: bool = False) -> Dict:
+    calls_per_worker = 5 if quick else 25
+    results = {}
+    with mock_server_process('--latency', str(LATENCY)) as url:
+        for concurrency in CONCURRENCY:
+            client = WeiXinClient(session=mock_session(url, pool_maxsize=concurrency))
+            samples = []
+
+            def call(_):
+                start = time.perf_counter()
+                client.get_material_count('MOCK_TOKEN')
+                samples.append(time.perf_counter() - start)
+
+            total = concurrency * calls_per_worker
+            start = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as executor:
+                list(executor.map(call, range(total)))
+            elapsed = time.perf_counter() - start
+
+            results[f'c{concurrency}_calls_per_s'] = round(total / elapsed, 1)
+            for key, value in latency_summary(samples).items():
+                results[f'c{concurrency}_{key}'] = value
+    return results
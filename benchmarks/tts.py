@@ -0,0 +1,25 @@
+"""
+长文本合成的切分与拼接吞吐（进程内桩服务）。
+"""
+import time
+from typing import Dict
+
+from baidu_client.client import BaiDuClient
+from baidu_client.tts import text2audio_long
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+
+SENTENCE = '百度语音合成可以将文本转换为可以播放的音频文件，'
+
+
+def run(quick: bool = False) -> Dict:
+    text = SENTENCE * (100 if quick else 1000)
+    client = BaiDuClient(session=mock_session(MockApp()), debug=False)
+    results = {'text_chars': len(text)}
+    for name, aue in (('mp3', 3), ('wav', 6)):
+        start = time.perf_counter()
+        audio = text2audio_long(client, text, token='MOCK_TOKEN', cuid='bench', aue=aue)
+        elapsed = time.perf_counter() - start
+        results[f'{name}_chars_per_s'] = round(len(text) / elapsed, 1)
+        results[f'{name}_audio_mb_per_s'] = round(len(audio) / elapsed / 1024 / 1024, 2)
+    return results
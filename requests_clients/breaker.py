@@ -0,0 +1,145 @@
+"""
+熔断器
+
+连续失败次数达到阈值后进入 open 状态，此后的请求直接抛出 CircuitOpenError，不再等待超时；
+经过 recovery_timeout 秒进入 half_open，只放行少量探测请求，探测成功则恢复 closed，失败则重新 open。
+
+    breaker = CircuitBreaker(failure_threshold=5, recovery_timeout=30)
+    wx_client = WeiXinClient(breaker=breaker)
+    wx_client.stats()['breaker']
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+    def __init__(self, key: str, retry_after: float) -> None:
+        super().__init__(f'{key} 熔断中，{retry_after:.1f} 秒后重试')
+        self.key = key
+        self.retry_after = retry_after
+
+
+class Circuit:
+
+    def __init__(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """
+    :param failure_threshold: 连续失败多少次后熔断
+    :param recovery_timeout: 熔断多少秒后进入 half_open 开始探测
+    :param half_open_max_calls: half_open 时同时放行的探测请求数
+    :param scope: 'endpoint' 按接口 URL 熔断，'host' 按域名熔断
+    :param on_state_change: 状态变化回调 ``f(key, old_state, new_state)``，可用于日志和监控
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        scope: str = 'endpoint',
+        on_state_change: Optional[Callable[[str, str, str], None]] = None,
+    ) -> None:
+        if scope not in ('endpoint', 'host'):
+            raise ValueError("scope 只能为 'endpoint' 或 'host'")
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.scope = scope
+        self.on_state_change = on_state_change
+        self._circuits: Dict[str, Circuit] = {}
+        self._lock = threading.Lock()
+
+    def key(self, url: str) -> str:
+        if self.scope == 'host':
+            return urlsplit(url).netloc
+        return url.split('?', 1)[0]
+
+    def _circuit(self, key: str) -> Circuit:
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = Circuit()
+        return circuit
+
+    def _transition(self, key: str, circuit: Circuit, state: str) -> Optional[Tuple[str, str, str]]:
+        """修改状态，返回需要通知的 (key, 旧状态, 新状态)，由调用方在释放锁之后通知"""
+        old_state, circuit.state = circuit.state, state
+        if state == OPEN:
+            circuit.opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            circuit.probes = 0
+        return (key, old_state, state) if old_state != state else None
+
+    def _notify(self, change: Optional[Tuple[str, str, str]]) -> None:
+        # 回调可能很慢或者再调用熔断器，不能在持有锁时调用
+        if change is not None and self.on_state_change is not None:
+            self.on_state_change(*change)
+
+    def before(self, url: str) -> None:
+        """请求前调用，熔断中时抛出 CircuitOpenError"""
+        key = self.key(url)
+        change = None
+        try:
+            with self._lock:
+                circuit = self._circuit(key)
+                if circuit.state == OPEN:
+                    retry_after = circuit.opened_at + self.recovery_timeout - time.monotonic()
+                    if retry_after > 0:
+                        circuit.rejected += 1
+                        raise CircuitOpenError(key, retry_after)
+                    change = self._transition(key, circuit, HALF_OPEN)
+                if circuit.state == HALF_OPEN:
+                    if circuit.probes >= self.half_open_max_calls:
+                        circuit.rejected += 1
+                        raise CircuitOpenError(key, 0)
+                    circuit.probes += 1
+        finally:
+            self._notify(change)
+
+    def cancel(self, url: str) -> None:
+        """before() 之后请求没有发出（如等待并发名额超时）时调用，归还 half_open 的探测名额，不记录结果"""
+        with self._lock:
+            circuit = self._circuit(self.key(url))
+            if circuit.state == HALF_OPEN and circuit.probes > 0:
+                circuit.probes -= 1
+
+    def record(self, url: str, success: bool) -> None:
+        """请求结束后调用，记录成功或失败"""
+        key = self.key(url)
+        change = None
+        with self._lock:
+            circuit = self._circuit(key)
+            if success:
+                circuit.failures = 0
+                if circuit.state != CLOSED:
+                    change = self._transition(key, circuit, CLOSED)
+            else:
+                circuit.failures += 1
+                if circuit.state == HALF_OPEN or circuit.failures >= self.failure_threshold:
+                    change = self._transition(key, circuit, OPEN)
+        self._notify(change)
+
+    def state(self, url: str) -> str:
+        with self._lock:
+            return self._circuit(self.key(url)).state
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                key: {'state': circuit.state, 'failures': circuit.failures, 'rejected': circuit.rejected}
+                for key, circuit in self._circuits.items()
+            }
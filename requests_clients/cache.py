@@ -0,0 +1,161 @@
+"""
+带 TTL 的响应缓存
+
+按 (method, 接口路径, 参数, 请求体) 缓存读接口的响应，参数里的 access_token 不参与 key，
+token 刷新后仍然命中。过期后的 stale_ttl 秒内直接返回旧值并在后台刷新（stale-while-revalidate），
+条目总数超过 maxsize 时淘汰最久未使用的。写接口调用后清空 invalidations 里对应路径的所有缓存。
+
+    cache = ResponseCache({'/cgi-bin/draft/count': 60}, invalidations={'/cgi-bin/draft/add': ['/cgi-bin/draft/count']})
+    wx_client = WeiXinClient(cache=cache)
+
+key 里不含 access_token，多个公众号需要各用一个 ResponseCache。
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps as json_dumps
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+IGNORED_PARAMS = ('access_token',)
+
+Key = Tuple[str, str, Tuple, Optional[str]]
+
+
+class CacheEntry:
+    __slots__ = ('value', 'expires_at', 'stale_until', 'refreshing')
+
+    def __init__(self, value: Any, ttl: float, stale_ttl: float) -> None:
+        now = time.monotonic()
+        self.value = value
+        self.expires_at = now + ttl
+        self.stale_until = self.expires_at + stale_ttl
+        self.refreshing = False
+
+
+class ResponseCache:
+    """
+    :param ttls: {接口路径: 缓存秒数}，只有这些路径会被缓存
+    :param maxsize: 最多缓存的条目数
+    :param stale_ttl: 过期后还能返回旧值的秒数，期间后台刷新，0 表示不启用
+    :param invalidations: {写接口路径: [受影响的读接口路径]}
+    """
+
+    def __init__(
+        self,
+        ttls: Dict[str, float],
+        maxsize: int = 1024,
+        stale_ttl: float = 0.0,
+        invalidations: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> None:
+        self.ttls = dict(ttls)
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self.invalidations = {path: tuple(paths) for path, paths in (invalidations or {}).items()}
+        self._entries: 'OrderedDict[Key, CacheEntry]' = OrderedDict()
+        # 每个路径的版本号，加载期间被清空过的结果不再写入
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, method: str, url: str, params: Optional[Dict] = None, json: Any = None) -> Optional[Key]:
+        """返回缓存 key，不缓存的接口返回 None"""
+        path = urlsplit(url).path
+        if path not in self.ttls:
+            return None
+        items = tuple(sorted(
+            (name, str(value)) for name, value in (params or {}).items()
+            if name not in IGNORED_PARAMS and value is not None
+        ))
+        body = None if json is None else json_dumps(json, sort_keys=True, ensure_ascii=False)
+        return method.lower(), path, items, body
+
+    def fetch(self, key: Key, loader: Callable[[], Any], cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        """命中时返回缓存，否则调用 loader 并在 cacheable(结果) 为真时写入缓存"""
+        path = key[1]
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry.expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+                if now < entry.stale_until:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        self._background().submit(self._refresh, key, loader, cacheable)
+                    return entry.value
+            self.misses += 1
+            generation = self._generations.get(path, 0)
+
+        value = loader()
+        if cacheable(value):
+            self._store(key, value, generation)
+        return value
+
+    def _refresh(self, key: Key, loader: Callable[[], Any], cacheable: Callable[[Any], bool]) -> None:
+        with self._lock:
+            generation = self._generations.get(key[1], 0)
+        try:
+            value = loader()
+        except Exception:
+            value = None
+        if value is not None and cacheable(value):
+            self._store(key, value, generation)
+            return
+        # 刷新失败时保留旧值，下次访问再试
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refreshing = False
+
+    def _store(self, key: Key, value: Any, generation: int) -> None:
+        path = key[1]
+        with self._lock:
+            if self._generations.get(path, 0) != generation:
+                return
+            self._entries[key] = CacheEntry(value, self.ttls[path], self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _background(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(2, thread_name_prefix='cache-refresh')
+        return self._executor
+
+    def invalidate(self, *paths: str) -> int:
+        """清空这些接口路径下的全部缓存，返回清掉的条目数"""
+        with self._lock:
+            for path in paths:
+                self._generations[path] = self._generations.get(path, 0) + 1
+            keys = [key for key in self._entries if key[1] in paths]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def invalidate_for(self, url: str) -> int:
+        """写接口调用后清空受影响的缓存"""
+        paths = self.invalidations.get(urlsplit(url).path)
+        return self.invalidate(*paths) if paths else 0
+
+    def clear(self) -> None:
+        self.invalidate(*self.ttls)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,405 @@
+"""
+批量操作的命令行工具
+
+    requests-clients export drafts -o drafts.ndjson.gz                 # 导出草稿 / 素材 / 已发布文章
+    requests-clients export materials --type image -o images.ndjson
+    requests-clients upload assets/ --type image --concurrency 8        # 上传目录，内容相同的文件只传一次
+    requests-clients export drafts | requests-clients publish           # 发布输入中的每个草稿
+    requests-clients tts article.txt -o article.mp3 --concurrency 4     # 长文本合成语音
+
+凭证从环境变量（或 --env 指定的 .env 文件）读取：WEIXIN_APPID、WEIXIN_APPSECRET、BAIDU_APIKEY、BAIDU_SECRETKEY。
+输入输出都是一行一个 JSON（NDJSON），可以用管道串起来；进度和吞吐输出到 stderr，--quiet 关闭。
+微信的请求经过 WeiXinClientPool（共用连接池、token 缓存、--rate 限速），--mock 把请求发往本地桩服务
+（python -m requests_clients.mock），不需要真实凭证。
+
+客户端模块在执行子命令时才导入，--help 不用等 requests 加载。
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Deque, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from weixin_client.archive import EXPORTS
+
+PAGE_SIZE = 20
+MATERIAL_TYPES = ('image', 'video', 'voice', 'news')
+TTS_FORMATS = {'.mp3': 3, '.pcm': 4, '.wav': 6}
+
+
+class Progress:
+    """在 stderr 上刷新一行进度：完成数 / 总数、失败数、每秒完成数"""
+
+    def __init__(self, label: str, total: Optional[int] = None, stream: Optional[TextIO] = None,
+                 interval: float = 0.5, quiet: bool = False) -> None:
+        self.label = label
+        self.total = total
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.quiet = quiet
+        self.done = 0
+        self.failed = 0
+        self.start = time.monotonic()
+        self._printed = 0.0
+
+    def update(self, count: int = 1, failed: bool = False) -> None:
+        self.done += count
+        if failed:
+            self.failed += count
+        now = time.monotonic()
+        if now - self._printed >= self.interval:
+            self._printed = now
+            self.show()
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        total = '' if self.total is None else f'/{self.total}'
+        return f'{self.label}: {self.done}{total} done, {self.failed} failed, {self.done / elapsed:.1f}/s'
+
+    def show(self, end: str = '') -> None:
+        if not self.quiet:
+            self.stream.write(f'\r{self.line()}{end}')
+            self.stream.flush()
+
+    def close(self) -> None:
+        self.show(end='\n')
+
+
+def write_record(out: TextIO, record: Dict) -> None:
+    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def read_records(lines: Iterable[str]) -> Iterator[Dict]:
+    """逐行解析 NDJSON，跳过空行"""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as err:
+            raise SystemExit(f'第 {number} 行不是有效的 JSON：{err}')
+
+
+def bounded(submit: Callable[[Dict], Future], items: Iterable, window: int,
+            ordered: bool = False) -> Iterator[Tuple[object, Future]]:
+    """边读输入边提交，在途任务最多 window 个，按完成顺序返回 (输入, Future)
+
+    :param ordered: 按输入顺序返回，最前面的任务没有完成时不再提交新的任务，已完成的结果最多积压 window 个
+    """
+    if ordered:
+        queue: Deque[Tuple[object, Future]] = deque()
+        for item in items:
+            queue.append((item, submit(item)))
+            if len(queue) >= window:
+                yield queue.popleft()
+        yield from queue
+        return
+    pending: Dict[Future, object] = {}
+    for item in items:
+        pending[submit(item)] = item
+        while len(pending) >= window:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future
+
+
+def error_record(err: Exception) -> Dict:
+    record = {'error': str(err)}
+    errcode = getattr(err, 'errcode', None)
+    if errcode is not None:
+        record['errcode'] = errcode
+    return record
+
+
+### 客户端 ###
+
+def load_env(path: Optional[str]) -> None:
+    """python-dotenv 没有安装时只读环境变量"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv(path or os.path.join(os.getcwd(), '.env'))
+
+
+def make_session(args):
+    if args.http2:
+        # HTTP/2 下并发请求复用少数连接
+        connections = max(1, args.concurrency // 32)
+        if args.mock:
+            from requests_clients.mock.adapters import mock_http2_session
+            return mock_http2_session(args.mock, max_connections=connections)
+        from requests_clients.http2 import http2_session
+        return http2_session(max_connections=connections)
+    if args.mock:
+        from requests_clients.mock.adapters import mock_session
+        return mock_session(args.mock, pool_maxsize=args.concurrency * 2)
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+    session = Session()
+    adapter = HTTPAdapter(pool_maxsize=args.concurrency * 2)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def require(value: Optional[str], name: str) -> str:
+    if not value:
+        raise SystemExit(f'缺少 {name}，在环境变量或 .env 中设置')
+    return value
+
+
+def weixin_pool(args):
+    from weixin_client.client import WeiXinClient
+    from weixin_client.pool import WeiXinClientPool
+    appid = require(args.appid or os.getenv('WEIXIN_APPID'), 'WEIXIN_APPID')
+    secret = require(args.secret or os.getenv('WEIXIN_APPSECRET'), 'WEIXIN_APPSECRET')
+    client = WeiXinClient(session=make_session(args), retries=2)
+    pool = WeiXinClientPool(secrets={appid: secret}, client=client, rate=args.rate, burst=max(1, args.concurrency),
+                            max_workers=args.concurrency, per_tenant_workers=args.concurrency)
+    return pool, appid
+
+
+def open_output(path: Optional[str]):
+    if path is None or path == '-':
+        return sys.stdout
+    return open(path, 'w', encoding='utf-8')
+
+
+def read_input(path: Optional[str]) -> str:
+    """读取整个输入文件，'-' 或空时读 stdin（不关闭 stdin）"""
+    if path is None or path == '-':
+        return sys.stdin.read()
+    with open(path, encoding='utf-8') as fp:
+        return fp.read()
+
+
+### 子命令 ###
+
+def cmd_export(args) -> int:
+    """翻页导出，第一页拿到总数后其余页并发请求，按顺序写出
+
+    写到文件时用 weixin_client.archive 的格式：按扩展名压缩，较大的正文存到 blob 目录；写到 stdout 时正文内联。
+    """
+    from weixin_client.archive import DEFAULT_BLOB_THRESHOLD, ArchiveWriter
+    method = EXPORTS[args.kind][0]
+    options = {'type': args.type} if args.kind == 'materials' else {'no_content': int(args.no_content)}
+    pool, appid = weixin_pool(args)
+    if args.output and args.output != '-':
+        writer = ArchiveWriter(args.output, args.blobs, None if args.inline_content else DEFAULT_BLOB_THRESHOLD)
+    else:
+        writer = None
+    progress = Progress(f'export {args.kind}', quiet=args.quiet)
+    try:
+        first = pool.call(appid, method, offset=0, count=PAGE_SIZE, **options)
+        total = first['total_count']
+        progress.total = total
+
+        def fetch(offset: int) -> Future:
+            return pool.submit(appid, method, offset=offset, count=PAGE_SIZE, **options)
+
+        # 按顺序写出，在途的页数有上限，内存占用不随总数增长
+        pages = bounded(fetch, range(PAGE_SIZE, total, PAGE_SIZE), args.concurrency * 2, ordered=True)
+        for page in itertools.chain([first], (future.result() for _, future in pages)):
+            items = page.get('item', [])
+            if writer is not None:
+                writer.write_many(items)
+            else:
+                for item in items:
+                    write_record(sys.stdout, item)
+                sys.stdout.flush()
+            progress.update(len(items))
+    finally:
+        progress.close()
+        pool.close()
+        if writer is not None:
+            writer.close()
+    return 0
+
+
+def cmd_upload(args) -> int:
+    """上传目录下的文件，经过 MediaLibrary：文件 mmap 发送，内容相同的只上传一次，索引保存在目录里"""
+    from weixin_client.media import MediaLibrary
+    pool, appid = weixin_pool(args)
+    library = MediaLibrary(args.directory)
+
+    def upload(access_token: str, relpath: str) -> Dict:
+        if args.kind == 'uploadimg':
+            return library.upload_img(pool.client, access_token, relpath, account=appid)
+        # 视频素材必须有标题，默认用文件名
+        title = os.path.splitext(os.path.basename(relpath))[0] if args.type == 'video' else ''
+        return library.add_material(pool.client, access_token, relpath, args.type, title=title, account=appid)
+
+    paths = list(library.iter_paths())
+    out = open_output(args.output)
+    progress = Progress('upload', total=len(paths), quiet=args.quiet)
+    try:
+        def submit(relpath: str) -> Future:
+            # 经过 pool.call：限速，token 失效时刷新后重试一次
+            return pool.submit(appid, upload, relpath)
+
+        for relpath, future in bounded(submit, paths, args.concurrency * 2):
+            try:
+                record = {'path': relpath, **future.result()}
+            except Exception as err:
+                record = {'path': relpath, **error_record(err)}
+            write_record(out, record)
+            out.flush()
+            progress.update(failed='error' in record)
+    finally:
+        progress.close()
+        pool.close()
+        library.close()
+        if out is not sys.stdout:
+            out.close()
+    stats = library.stats()
+    if not args.quiet:
+        print(f'uploaded {stats["uploads"]}, skipped {stats["hits"]} '
+              f'({stats["bytes_skipped"]} bytes already uploaded)', file=sys.stderr)
+    return 1 if progress.failed else 0
+
+
+def cmd_publish(args) -> int:
+    """发布输入中每一行的 media_id（草稿），输出 publish_id"""
+    pool, appid = weixin_pool(args)
+    out = open_output(args.output)
+    progress = Progress('publish', quiet=args.quiet)
+    if args.input and args.input != '-':
+        from weixin_client.archive import iter_archive
+        # 可以是 export 写出的压缩文件，只需要 media_id，不读正文
+        records = iter_archive(args.input, load_content=False)
+    else:
+        records = read_records(sys.stdin)
+    try:
+        def submit(record: Dict) -> Future:
+            # 缺少 media_id 的行交给接口报错，和其他失败一样写进输出
+            return pool.submit(appid, 'publish_article', record.get('media_id'))
+
+        for record, future in bounded(submit, records, args.concurrency * 2):
+            try:
+                result = {'media_id': record.get('media_id'), 'publish_id': future.result()['publish_id']}
+            except Exception as err:
+                result = {'media_id': record.get('media_id'), **error_record(err)}
+            write_record(out, result)
+            out.flush()
+            progress.update(failed='error' in result)
+    finally:
+        progress.close()
+        pool.close()
+        if out is not sys.stdout:
+            out.close()
+    return 1 if progress.failed else 0
+
+
+def cmd_tts(args) -> int:
+    """切分后并发合成，按顺序边收边写；wav 需要合并文件头，最后一次写出"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from baidu_client.client import BaiDuClient
+    from baidu_client.tts import WAV_AUE, concat_wav, iter_text2audio, split_text
+    from requests_clients.ratelimit import RateLimiter
+
+    aue = TTS_FORMATS.get(os.path.splitext(args.output)[1].lower())
+    if aue is None:
+        raise SystemExit(f'输出文件扩展名必须是 {"/".join(TTS_FORMATS)}')
+    client = BaiDuClient(session=make_session(args), debug=False, retries=2)
+    apikey = require(os.getenv('BAIDU_APIKEY') or ('MOCK_APIKEY' if args.mock else None), 'BAIDU_APIKEY')
+    secretkey = require(os.getenv('BAIDU_SECRETKEY') or ('MOCK_SECRETKEY' if args.mock else None), 'BAIDU_SECRETKEY')
+    token = client.get_access_token(apikey, secretkey)['access_token']
+    limiter = RateLimiter(args.rate, burst=max(1, args.concurrency)) if args.rate else None
+
+    pieces = split_text(read_input(args.input))
+    progress = Progress('tts', total=len(pieces), quiet=args.quiet)
+
+    def synthesize(piece: str) -> bytes:
+        if limiter is not None:
+            limiter.acquire()
+        return next(iter_text2audio(client, [piece], token, args.cuid, aue=aue, spd=args.spd))
+
+    size = 0
+    with ThreadPoolExecutor(args.concurrency) as executor, open(args.output, 'wb') as out:
+        chunks = []
+        try:
+            for chunk in executor.map(synthesize, pieces):
+                if aue == WAV_AUE:
+                    chunks.append(chunk)
+                else:
+                    out.write(chunk)
+                    size += len(chunk)
+                progress.update()
+            if aue == WAV_AUE:
+                audio = concat_wav(chunks)
+                out.write(audio)
+                size = len(audio)
+        finally:
+            progress.close()
+    write_record(sys.stdout, {'input': args.input, 'output': args.output, 'pieces': len(pieces), 'bytes': size})
+    return 0
+
+
+### 参数 ###
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--concurrency', type=int, default=4, help='并发请求数，默认 4')
+    common.add_argument('--rate', type=float, help='每秒最多请求数，默认不限速')
+    common.add_argument('--env', help='.env 文件路径，默认当前目录的 .env')
+    common.add_argument('--mock', metavar='URL', help='请求发往本地桩服务，如 http://127.0.0.1:8000')
+    common.add_argument('--http2', action='store_true', help="使用 HTTP/2 transport，需要安装 httpx[http2]")
+    common.add_argument('--quiet', '-q', action='store_true', help='不输出进度')
+
+    weixin = argparse.ArgumentParser(add_help=False, parents=[common])
+    weixin.add_argument('--appid', help='默认读取 WEIXIN_APPID')
+    weixin.add_argument('--secret', help='默认读取 WEIXIN_APPSECRET')
+    weixin.add_argument('--output', '-o', help='NDJSON 输出文件，默认 stdout')
+
+    parser = argparse.ArgumentParser(prog='requests-clients', description='微信公众号 / 百度语音批量操作')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', parents=[weixin], help='导出素材、草稿或已发布文章')
+    export.add_argument('kind', choices=sorted(EXPORTS))
+    export.add_argument('--type', choices=MATERIAL_TYPES, default='news', help='素材类型，export materials 时使用')
+    export.add_argument('--no-content', action='store_true', help='草稿和已发布文章不返回正文')
+    export.add_argument('--blobs', metavar='DIR', help='正文存放目录，默认为 <输出文件名>.blobs')
+    export.add_argument('--inline-content', action='store_true', help='正文写在 NDJSON 里，不单独存放')
+    export.set_defaults(func=cmd_export)
+
+    upload = commands.add_parser('upload', parents=[weixin], help='上传目录下的所有文件')
+    upload.add_argument('directory')
+    upload.add_argument('--type', choices=('image', 'video', 'voice', 'thumb'), default='image', help='永久素材类型')
+    upload.add_argument('--kind', choices=('material', 'uploadimg'), default='material',
+                        help='material：永久素材；uploadimg：图文消息内的图片')
+    upload.set_defaults(func=cmd_upload)
+
+    publish = commands.add_parser('publish', parents=[weixin], help='发布草稿，输入每行一个带 media_id 的 JSON')
+    publish.add_argument('input', nargs='?', help='NDJSON 输入文件（可以是 .gz/.zst），默认 stdin')
+    publish.set_defaults(func=cmd_publish)
+
+    tts = commands.add_parser('tts', parents=[common], help='长文本合成语音')
+    tts.add_argument('input', help='文本文件，- 表示 stdin')
+    tts.add_argument('--output', '-o', required=True, help='音频文件，按扩展名选择格式：mp3/pcm/wav')
+    tts.add_argument('--cuid', default='requests-clients')
+    tts.add_argument('--spd', type=int, default=5, help='语速 0-15')
+    tts.set_defaults(func=cmd_tts)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.concurrency < 1:
+        raise SystemExit('--concurrency 必须大于 0')
+    load_env(args.env)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+整体截止时间
+
+with deadline(...) 内发起的所有请求（包括重试、翻页、多步流程中的每一步）共享同一个时间预算，
+每次请求的 connect/read 超时都会被裁剪到剩余时间以内，预算用完后直接抛出 DeadlineExceeded。
+
+    with deadline(3):
+        media_id = wx_client.add_draft(token, articles)['media_id']
+        wx_client.publish_article(token, media_id)
+
+截止时间保存在 contextvars 中，提交到线程池的任务需要用 contextvars.copy_context().run 才能继承。
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class DeadlineExceeded(TimeoutError):
+    """整体截止时间已到"""
+
+
+class Deadline:
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def check(self) -> float:
+        """返回剩余时间，已超时时抛出 DeadlineExceeded"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'超过截止时间（{self.seconds}s）')
+        return remaining
+
+    def clip(self, timeout: Optional[Timeout]) -> Timeout:
+        """把单次请求的超时裁剪到剩余时间以内"""
+        remaining = self.check()
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return min(connect, remaining), min(read, remaining)
+        return min(timeout, remaining)
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar('deadline', default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[Deadline]:
+    """设置截止时间，嵌套时以更早的为准"""
+    outer = _current.get()
+    new = Deadline(seconds)
+    if outer is not None and outer.expires_at < new.expires_at:
+        new = outer
+    token = _current.set(new)
+    try:
+        yield new
+    finally:
+        _current.reset(token)
+
+
+def endpoint_timeout(url: str, timeouts: Dict[str, Timeout], default: Timeout) -> Timeout:
+    """按接口路径查找超时设置，没有配置时返回默认值"""
+    if not timeouts:
+        return default
+    return timeouts.get(urlsplit(url).path, default)
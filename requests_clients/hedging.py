@@ -0,0 +1,180 @@
+"""
+对冲请求
+
+只用于幂等的读接口：请求发出后超过该接口近期延迟的某个分位数（默认 p95）还没有返回时，
+在另一个连接上再发一份相同的请求，取先返回的结果，另一份如果还没开始就取消，已经返回的响应直接关闭。
+
+    hedger = Hedger(percentile=95)
+    wx_client = WeiXinClient(hedger=hedger)
+    wx_client.stats()['hedger']
+
+客户端只对 HEDGE_PATHS 中的接口对冲，写接口永远不会对冲。
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class EndpointLatency:
+
+    def __init__(self, window: int) -> None:
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.delay: Optional[float] = None
+        self.pending = 0
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped = 0
+
+
+def close_quietly(future: Future) -> None:
+    """输掉的请求返回后关闭响应，释放连接"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    close = getattr(future.result(), 'close', None)
+    if close is not None:
+        close()
+
+
+class Hedger:
+    """
+    :param percentile: 等待多久后发出对冲请求，取该接口近期延迟的分位数
+    :param min_delay: 对冲延迟下限（秒），避免上游很快时几乎每个请求都对冲
+    :param max_delay: 对冲延迟上限（秒）
+    :param min_samples: 样本数达到多少后才开始对冲
+    :param window: 每个接口保留的最近延迟样本数
+    :param max_workers: 发送请求的线程数；线程都在使用时新的请求不对冲，直接在调用方线程执行，
+        避免主请求在线程池里排队超过对冲延迟、进而引发更多对冲
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        min_delay: float = 0.005,
+        max_delay: float = 1.0,
+        min_samples: int = 20,
+        window: int = 200,
+        max_workers: int = 32,
+    ) -> None:
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.max_workers = max_workers
+        # 已经提交或预留的线程数
+        self._inflight = 0
+        self._endpoints: Dict[str, EndpointLatency] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='hedger')
+
+    def _endpoint(self, key: str) -> EndpointLatency:
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            with self._lock:
+                endpoint = self._endpoints.setdefault(key, EndpointLatency(self.window))
+        return endpoint
+
+    def delay(self, key: str) -> Optional[float]:
+        """当前的对冲延迟，样本不足时返回 None（不对冲）"""
+        return self._endpoint(key).delay
+
+    def record(self, key: str, latency: float) -> None:
+        endpoint = self._endpoint(key)
+        with self._lock:
+            endpoint.samples.append(latency)
+            endpoint.pending += 1
+            # 分位数每积累一批样本重算一次，不在每个请求上排序
+            if len(endpoint.samples) < self.min_samples:
+                return
+            if endpoint.delay is not None and endpoint.pending < max(1, self.window // 10):
+                return
+            ordered = sorted(endpoint.samples)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+            endpoint.delay = min(self.max_delay, max(self.min_delay, ordered[index]))
+            endpoint.pending = 0
+
+    def _reserve(self) -> bool:
+        """为主请求和可能的对冲请求预留两个线程，不够时返回 False"""
+        with self._lock:
+            if self._inflight + 2 > self.max_workers:
+                return False
+            self._inflight += 2
+            return True
+
+    def _release(self, future: Optional[Future] = None) -> None:
+        with self._lock:
+            self._inflight -= 1
+
+    def _submit(self, func: Callable[[], T]) -> Future:
+        # 复制上下文，让对冲线程继承调用方的截止时间
+        future = self._executor.submit(contextvars.copy_context().run, func)
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, key: str, func: Callable[[], T]) -> T:
+        """执行 func，超过对冲延迟仍未返回时再执行一次，返回先成功的结果"""
+        endpoint = self._endpoint(key)
+        with self._lock:
+            endpoint.calls += 1
+        delay = endpoint.delay
+        start = time.monotonic()
+        if delay is not None and not self._reserve():
+            with self._lock:
+                endpoint.skipped += 1
+            delay = None
+        if delay is None:
+            result = func()
+            self.record(key, time.monotonic() - start)
+            return result
+
+        primary = self._submit(func)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            # 没有发出对冲请求，归还预留的线程
+            self._release()
+            result = primary.result()
+            self.record(key, time.monotonic() - start)
+            return result
+
+        with self._lock:
+            endpoint.hedged += 1
+        hedge = self._submit(func)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for loser in pending:
+                    if not loser.cancel():
+                        loser.add_done_callback(close_quietly)
+                if future is hedge:
+                    with self._lock:
+                        endpoint.hedge_wins += 1
+                self.record(key, time.monotonic() - start)
+                return future.result()
+        raise error
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            key: {
+                'calls': endpoint.calls,
+                'hedged': endpoint.hedged,
+                'hedge_rate': round(endpoint.hedged / endpoint.calls, 4) if endpoint.calls else 0.0,
+                'hedge_wins': endpoint.hedge_wins,
+                'skipped': endpoint.skipped,
+                'delay_ms': round((endpoint.delay or 0) * 1000, 2),
+            }
+            for key, endpoint in list(self._endpoints.items())
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,170 @@
+"""
+HTTP/2 transport
+
+requests 只支持 HTTP/1.1，每个在途请求占一个 TCP 连接，几百个并发时连接数和临时端口都会成为瓶颈。
+HTTP2Adapter 是 requests 的 transport adapter，底层用 httpx（HTTP/2 由 h2 实现），同一个域名的并发请求复用
+少数几个连接：
+
+    client = WeiXinClient(session=http2_session(max_connections=4))
+
+客户端代码不变，超时、重试、限流、熔断都照常工作；不挂载时仍然是 requests 默认的 HTTP/1.1 transport。
+需要安装 ``pip install 'httpx[http2]'``，只在创建 adapter 时导入。
+
+- httpx 的异常转换成 requests 的异常：连接超时 / 等待连接池超时为 ConnectTimeout（请求没有发出，POST 也可以重试），
+  读超时为 ReadTimeout，其他网络错误为 ConnectionError
+- 请求体分块以 memoryview 交给 httpx，multipart 上传的 mmap 内容不复制
+- verify、cert、proxies 是连接级别的配置，在创建 adapter 时传入，每个请求单独传入的值会被忽略
+"""
+import io
+import threading
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests import PreparedRequest, Response, Session
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# HTTP/2 禁止的逐跳首部，requests 默认会带 Connection: keep-alive
+HOP_BY_HOP_HEADERS = frozenset({'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'})
+BODY_CHUNK_SIZE = 64 * 1024
+
+
+def iter_body(body) -> Iterator[memoryview]:
+    """把可迭代的请求体切成 memoryview，httpcore 按流控窗口切片时不会复制剩余部分"""
+    for chunk in body:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        view = memoryview(chunk).cast('B')
+        for start in range(0, view.nbytes, BODY_CHUNK_SIZE):
+            yield view[start:start + BODY_CHUNK_SIZE]
+
+
+class HTTPXStream:
+    """stream=True 时作为 Response.raw，iter_content 调用 stream()"""
+
+    def __init__(self, response, request: PreparedRequest) -> None:
+        self.response = response
+        self.request = request
+        self._chunks: Optional[Iterator[bytes]] = None
+        self._buffer = b''
+
+    def stream(self, chunk_size: Optional[int] = None, decode_content: bool = True) -> Iterator[bytes]:
+        try:
+            yield from self.response.iter_bytes(chunk_size)
+        except Exception as err:
+            raise convert_error(err, self.request) from err
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if self._chunks is None:
+            self._chunks = self.stream()
+        while amt is None or len(self._buffer) < amt:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self) -> None:
+        self.response.close()
+
+
+def convert_error(err: Exception, request: PreparedRequest) -> Exception:
+    import httpx
+    if isinstance(err, (httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return requests.exceptions.ConnectTimeout(err, request=request)
+    if isinstance(err, httpx.ReadTimeout):
+        return requests.exceptions.ReadTimeout(err, request=request)
+    if isinstance(err, httpx.TimeoutException):
+        return requests.exceptions.Timeout(err, request=request)
+    if isinstance(err, httpx.TransportError):
+        return requests.exceptions.ConnectionError(err, request=request)
+    return err
+
+
+def convert_timeout(timeout):
+    import httpx
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+    return httpx.Timeout(timeout)
+
+
+class HTTP2Adapter(BaseAdapter):
+    """
+    :param max_connections: 每个域名最多的连接数，HTTP/2 下每个连接可以同时处理多个请求
+    :param http1: 服务端不支持 HTTP/2 时是否回退到 HTTP/1.1；为 False 时 http:// 也直接使用 HTTP/2（h2c）
+    :param verify: 同 requests 的 verify，证书校验或 CA 文件路径
+    :param client: 自定义的 httpx.Client，传入时忽略其他参数
+    """
+
+    def __init__(self, max_connections: int = 10, http1: bool = True, verify=True, cert=None,
+                 proxy: Optional[str] = None, client=None) -> None:
+        super().__init__()
+        if client is None:
+            try:
+                import httpx
+            except ImportError:
+                raise ImportError("HTTP2Adapter 需要安装 httpx 和 h2：pip install 'httpx[http2]'") from None
+            limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            client = httpx.Client(http1=http1, http2=True, verify=verify, cert=cert, proxy=proxy, limits=limits,
+                                  follow_redirects=False)
+        self.client = client
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def build_request(self, request: PreparedRequest, timeout):
+        """转换成 httpx.Request，子类可以在这里改写 URL 和首部"""
+        headers = [(key, value) for key, value in request.headers.items() if key.lower() not in HOP_BY_HOP_HEADERS]
+        body = request.body
+        if body is not None and not isinstance(body, (bytes, str)) and not hasattr(body, 'read'):
+            body = iter_body(body)
+        return self.client.build_request(request.method, request.url, headers=headers, content=body,
+                                         timeout=convert_timeout(timeout))
+
+    def send(self, request: PreparedRequest, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        try:
+            response = self.client.send(self.build_request(request, timeout), stream=stream)
+            if not stream:
+                body = response.content
+        except Exception as err:
+            raise convert_error(err, request) from err
+        return self.build_response(request, response, HTTPXStream(response, request) if stream else io.BytesIO(body))
+
+    def build_response(self, request: PreparedRequest, response, raw) -> Response:
+        with self._lock:
+            self._versions[response.http_version] = self._versions.get(response.http_version, 0) + 1
+        resp = Response()
+        resp.status_code = response.status_code
+        resp.headers = CaseInsensitiveDict(response.headers)
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.raw = raw
+        resp.reason = response.reason_phrase
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        return resp
+
+    def stats(self) -> Dict:
+        """各协议的响应数，如 {'HTTP/2': 80}，用来确认是否协商到了 HTTP/2
+
+        httpx 没有公开连接池的状态，连接数只能在服务端统计（见 requests_clients.mock）
+        """
+        with self._lock:
+            return dict(self._versions)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def http2_session(max_connections: int = 10, http1: bool = True, **kwargs) -> Session:
+    """返回 http:// 和 https:// 都走 HTTP2Adapter 的 Session"""
+    session = Session()
+    adapter = HTTP2Adapter(max_connections=max_connections, http1=http1, **kwargs)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
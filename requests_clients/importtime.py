@@ -0,0 +1,54 @@
+"""
+冷启动预算
+
+在新进程中测量导入客户端模块的耗时（``python -X importtime`` 统计的累计时间）和导入的模块数。
+weixin_client/tests/startup.py 用它检查预算，benchmarks/startup.py 用它输出指标。
+
+超出预算时说明新增了顶层导入，改成用到时再导入，或者确实需要时调整预算。
+子进程允许写 .pyc（去掉 PYTHONDONTWRITEBYTECODE），第一次运行预热，和部署环境一致。
+"""
+import os
+import subprocess
+import sys
+from typing import Tuple
+
+# 导入 weixin_client.client 的累计耗时上限（毫秒），目前约 70ms，留出较慢机器的余量
+IMPORT_BUDGET_MS = 250
+# 导入并构造第一个请求新加载的模块数上限，目前约 210 个
+MODULE_BUDGET = 240
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = '''
+import sys, time
+start = time.perf_counter()
+before = len(sys.modules)
+from weixin_client.client import WeiXinClient
+client = WeiXinClient()
+client.prepare_request('GET', 'https://api.weixin.qq.com/cgi-bin/draft/count', params={'access_token': 'TOKEN'})
+print(time.perf_counter() - start, len(sys.modules) - before)
+'''
+
+
+def python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run([sys.executable, *args], cwd=ROOT_DIR, env=env, capture_output=True, text=True,
+                          check=True)
+
+
+def import_time_us(module: str) -> int:
+    """新进程中导入 module 的累计耗时（微秒）"""
+    output = python('-X', 'importtime', '-c', f'import {module}').stderr
+    for line in output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1])
+    raise RuntimeError(f'importtime 输出中没有 {module}')
+
+
+def cold_start() -> Tuple[float, int]:
+    """新进程中导入客户端、构造客户端和第一个请求，返回 (耗时秒数, 新加载的模块数)"""
+    seconds, modules = python('-c', COLD_START).stdout.split()
+    return float(seconds), int(modules)
@@ -0,0 +1,101 @@
+"""
+AIMD 自适应并发限制
+
+每个 key（通常是接口 URL）单独维护一个并发上限：
+- 请求成功且延迟没有明显高于基线时，上限缓慢增加（每轮约 +1）
+- 超时、系统繁忙、频率限制等过载信号出现时，上限乘以 backoff 快速下降，同一轮内只降一次
+
+    limiter = AdaptiveLimiter()
+    wx_client = WeiXinClient(limiter=limiter)
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+
+class LimitTimeout(Exception):
+    """等待并发名额超时"""
+
+
+class EndpointLimit:
+
+    def __init__(self, initial: float) -> None:
+        self.limit = float(initial)
+        self.inflight = 0
+        self.baseline: Optional[float] = None
+        self.last_cut = 0.0
+        self.successes = 0
+        self.overloads = 0
+        self.cond = threading.Condition()
+
+
+class AdaptiveLimiter:
+    """
+    :param initial: 每个接口初始的并发上限
+    :param tolerance: 延迟超过基线的多少倍时停止增加上限
+    :param backoff: 过载时上限乘以的系数
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        tolerance: float = 2.0,
+        backoff: float = 0.5,
+    ) -> None:
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self._limits: Dict[str, EndpointLimit] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> EndpointLimit:
+        endpoint = self._limits.get(key)
+        if endpoint is None:
+            with self._lock:
+                endpoint = self._limits.setdefault(key, EndpointLimit(self.initial))
+        return endpoint
+
+    def acquire(self, key: str, timeout: Optional[float] = None) -> None:
+        endpoint = self.get(key)
+        with endpoint.cond:
+            if not endpoint.cond.wait_for(lambda: endpoint.inflight < int(endpoint.limit), timeout):
+                raise LimitTimeout(f'{key} 并发已满（{int(endpoint.limit)}）')
+            endpoint.inflight += 1
+
+    def release(self, key: str, latency: float, overloaded: bool = False) -> None:
+        endpoint = self.get(key)
+        now = time.monotonic()
+        with endpoint.cond:
+            endpoint.inflight -= 1
+            if overloaded:
+                endpoint.overloads += 1
+                # 同一批并发请求一起失败时只降一次
+                if now - endpoint.last_cut > (endpoint.baseline or latency):
+                    endpoint.limit = max(self.min_limit, endpoint.limit * self.backoff)
+                    endpoint.last_cut = now
+            else:
+                endpoint.successes += 1
+                if endpoint.baseline is None or latency < endpoint.baseline:
+                    endpoint.baseline = latency
+                else:
+                    # 基线缓慢跟随，避免上游整体变慢后一直不再增加
+                    endpoint.baseline += (latency - endpoint.baseline) * 0.01
+                if latency <= endpoint.baseline * self.tolerance:
+                    endpoint.limit = min(self.max_limit, endpoint.limit + 1 / endpoint.limit)
+            endpoint.cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            key: {
+                'limit': int(endpoint.limit),
+                'inflight': endpoint.inflight,
+                'baseline_ms': round((endpoint.baseline or 0) * 1000, 2),
+                'successes': endpoint.successes,
+                'overloads': endpoint.overloads,
+            }
+            for key, endpoint in list(self._limits.items())
+        }
@@ -0,0 +1,33 @@
+"""
+启动本地桩服务
+
+    python -m requests_clients.mock --port 8000 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import time
+
+from requests_clients.mock.app import Faults
+from requests_clients.mock.server import MockServer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m requests_clients.mock', description='微信/百度接口本地桩服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='注入错误的概率，0~1')
+    parser.add_argument('--errcode', type=int, default=-1, help='注入错误时返回的 errcode')
+    args = parser.parse_args(argv)
+
+    faults = Faults(latency=args.latency, error_rate=args.error_rate, errcode=args.errcode)
+    server = MockServer(faults=faults, host=args.host, port=args.port).start()
+    print(f'mock server listening on {server.url}', flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
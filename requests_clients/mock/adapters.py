@@ -0,0 +1,286 @@
+"""
+requests 的 transport adapter：
+
+- RedirectAdapter：把真实域名的请求转发到本地桩服务
+- RedirectHTTP2Adapter：同上，走 HTTP/2（requests_clients.http2，需要 httpx 和 h2）
+- MockAdapter：进程内直接调用 MockApp，不走 socket，适合测客户端自身开销
+- RecordingAdapter / ReplayAdapter：录制真实接口的请求响应（脱敏后）并离线回放
+"""
+import base64
+import io
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests import PreparedRequest, Response, Session
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from requests_clients.http2 import HTTP2Adapter
+from requests_clients.mock.app import MockApp, MockRequest
+
+UPSTREAM_PREFIXES = (
+    'https://api.weixin.qq.com',
+    'http://api.weixin.qq.com',
+    'https://tsn.baidu.com',
+    'https://aip.baidubce.com',
+)
+
+SENSITIVE_KEYS = {'access_token', 'secret', 'appsecret', 'client_id', 'client_secret', 'tok', 'ticket'}
+REDACTED = '<redacted>'
+
+
+def body_bytes(body) -> bytes:
+    if body is None:
+        return b''
+    if isinstance(body, bytes):
+        return body
+    if isinstance(body, str):
+        return body.encode('utf-8')
+    if hasattr(body, 'read'):
+        return body.read()
+    return b''.join(bytes(chunk) for chunk in body)
+
+
+def snapshot_body(request: PreparedRequest) -> bytes:
+    """发送前取出请求体：文件对象读完后回到原位置，一次性的迭代器换成读出的 bytes"""
+    body = request.body
+    if hasattr(body, 'read') and hasattr(body, 'seek'):
+        position = body.tell()
+        data = body_bytes(body)
+        body.seek(position)
+        return data
+    if body is not None and not isinstance(body, (bytes, str)) and iter(body) is body:
+        request.body = body_bytes(body)
+        return request.body
+    return body_bytes(body)
+
+
+def build_response(request: PreparedRequest, status: int, headers: Dict, body: bytes) -> Response:
+    resp = Response()
+    resp.status_code = status
+    resp.headers = CaseInsensitiveDict(headers)
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp.raw = io.BytesIO(body)
+    resp.reason = 'OK' if status < 400 else 'Error'
+    resp.url = request.url
+    resp.request = request
+    return resp
+
+
+class RedirectAdapter(HTTPAdapter):
+    """把请求的 scheme/host 换成本地桩服务的地址，原始域名放在 X-Mock-Original-Host 里"""
+
+    def __init__(self, target_url: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.target = urlsplit(target_url)
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        return super().send(redirect_request(request, self.target), **kwargs)
+
+
+def redirect_request(request: PreparedRequest, target) -> PreparedRequest:
+    request = request.copy()
+    parts = urlsplit(request.url)
+    request.headers['X-Mock-Original-Host'] = parts.netloc
+    request.url = urlunsplit((target.scheme, target.netloc, parts.path, parts.query, ''))
+    return request
+
+
+class RedirectHTTP2Adapter(HTTP2Adapter):
+    """RedirectAdapter 的 HTTP/2 版本"""
+
+    def __init__(self, target_url: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.target = urlsplit(target_url)
+
+    def build_request(self, request: PreparedRequest, timeout):
+        return super().build_request(redirect_request(request, self.target), timeout)
+
+
+def mock_http2_session(target_url: str, max_connections: int = 1, http1: bool = True) -> Session:
+    """返回把上游域名都指向桩服务、走 HTTP/2 的 Session，所有域名共用一个 adapter（连接池）"""
+    session = Session()
+    adapter = RedirectHTTP2Adapter(target_url, max_connections=max_connections, http1=http1)
+    for prefix in UPSTREAM_PREFIXES:
+        session.mount(prefix, adapter)
+    return session
+
+
+class MockAdapter(BaseAdapter):
+    """在进程内调用 MockApp，注入的延迟超过读超时时抛出 ReadTimeout，与真实网络一致"""
+
+    def __init__(self, app: Optional[MockApp] = None) -> None:
+        super().__init__()
+        self.app = app or MockApp()
+
+    def send(self, request: PreparedRequest, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+
+        def sleep(seconds):
+            if read_timeout is not None and seconds > read_timeout:
+                time.sleep(read_timeout)
+                raise requests.exceptions.ReadTimeout(f'mock read timeout ({read_timeout}s)', request=request)
+            time.sleep(seconds)
+
+        mock_request = MockRequest(request.method, request.url, dict(request.headers), body_bytes(request.body))
+        mock_response = self.app.handle(mock_request, sleep=sleep)
+        return build_response(request, mock_response.status, mock_response.headers, mock_response.body)
+
+    def close(self) -> None:
+        pass
+
+
+def mock_session(target: Union[str, MockApp], pool_maxsize: int = 10) -> Session:
+    """返回把上游域名都指向桩服务的 Session
+
+    :param target: 本地桩服务地址（走真实 HTTP），或 MockApp 实例（进程内调用）
+    """
+    session = Session()
+    for prefix in UPSTREAM_PREFIXES:
+        if isinstance(target, str):
+            adapter = RedirectAdapter(target, pool_connections=1, pool_maxsize=pool_maxsize)
+        else:
+            adapter = MockAdapter(target)
+        session.mount(prefix, adapter)
+    return session
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SENSITIVE_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, REDACTED if k in SENSITIVE_KEYS else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def encode_body(body: bytes, content_type: str) -> Dict:
+    if 'json' in content_type or content_type.startswith('text/'):
+        try:
+            return {'json': redact(json.loads(body))}
+        except ValueError:
+            pass
+    if 'x-www-form-urlencoded' in content_type:
+        return {'form': redact(dict(parse_qsl(body.decode('utf-8'), keep_blank_values=True)))}
+    return {'base64': base64.b64encode(body).decode('ascii')}
+
+
+def decode_body(data: Dict) -> bytes:
+    if 'json' in data:
+        return json.dumps(data['json'], ensure_ascii=False).encode('utf-8')
+    if 'form' in data:
+        return urlencode(data['form']).encode('utf-8')
+    return base64.b64decode(data.get('base64', ''))
+
+
+class Cassette:
+    """录制下来的请求/响应，保存为 JSON 文件，access_token、secret 等字段会被脱敏"""
+
+    def __init__(self, exchanges: Optional[List[Dict]] = None) -> None:
+        self.exchanges: List[Dict] = exchanges or []
+        self._lock = threading.Lock()
+
+    def append(self, request: PreparedRequest, response: Response, body: Optional[bytes] = None) -> None:
+        """:param body: 请求体，为空时从 request.body 读取"""
+        if body is None:
+            body = body_bytes(request.body)
+        exchange = {
+            'request': {
+                'method': request.method,
+                'url': redact_url(request.url),
+                'body': encode_body(body, request.headers.get('Content-Type', '')),
+            },
+            'response': {
+                'status': response.status_code,
+                'headers': {k: v for k, v in response.headers.items()
+                            if k.lower() in ('content-type', 'content-disposition')},
+                'body': encode_body(response.content, response.headers.get('Content-Type', '')),
+            },
+        }
+        with self._lock:
+            self.exchanges.append(exchange)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.exchanges, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+
+class RecordingAdapter(BaseAdapter):
+    """把请求交给被包装的 adapter（默认为真实网络），同时把请求响应记录到 cassette"""
+
+    def __init__(self, cassette: Cassette, adapter: Optional[BaseAdapter] = None) -> None:
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter or HTTPAdapter()
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        # 请求体在发送时会被读完，先取出来
+        body = snapshot_body(request)
+        response = self.adapter.send(request, **kwargs)
+        self.cassette.append(request, response, body)
+        return response
+
+    def close(self) -> None:
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """按 method + 脱敏后的 URL 回放录制的响应，同一请求录了多次时按顺序返回，用完后重复最后一次"""
+
+    def __init__(self, cassette: Cassette) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._queues = defaultdict(list)
+        for exchange in cassette.exchanges:
+            key = (exchange['request']['method'], exchange['request']['url'])
+            self._queues[key].append(exchange)
+
+    def send(self, request: PreparedRequest, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        key = (request.method, redact_url(request.url))
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise requests.exceptions.ConnectionError(f'no recorded response for {key[0]} {key[1]}',
+                                                          request=request)
+            exchange = queue.pop(0) if len(queue) > 1 else queue[0]
+        recorded = exchange['response']
+        return build_response(request, recorded['status'], recorded['headers'], decode_body(recorded['body']))
+
+    def close(self) -> None:
+        pass
+
+
+def recording_session(cassette: Cassette, base: Optional[Session] = None) -> Session:
+    """返回会录制上游请求的 Session
+
+    :param base: 实际发送请求用的 Session，为空时走真实网络
+    """
+    session = Session()
+    for prefix in UPSTREAM_PREFIXES:
+        adapter = base.get_adapter(prefix) if base is not None else None
+        session.mount(prefix, RecordingAdapter(cassette, adapter))
+    return session
+
+
+def replay_session(cassette: Cassette) -> Session:
+    session = Session()
+    adapter = ReplayAdapter(cassette)
+    for prefix in UPSTREAM_PREFIXES:
+        session.mount(prefix, adapter)
+    return session
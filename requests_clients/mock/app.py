@@ -0,0 +1,155 @@
+"""
+本地桩服务的核心：请求/响应对象、路由表和故障注入。
+
+同一个 MockApp 既可以挂在真正的 HTTP 服务上（见 server.py），
+也可以通过 adapters.MockAdapter 在进程内直接调用，不走 socket。
+"""
+import random
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from json import dumps as json_dumps, loads as json_loads
+from typing import Callable, Dict, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+
+class MockRequest:
+
+    def __init__(self, method: str, url: str, headers: Optional[Dict] = None, body: bytes = b'') -> None:
+        parts = urlsplit(url)
+        self.method = method.upper()
+        self.url = url
+        self.host = parts.hostname or ''
+        self.path = parts.path
+        self.query: Dict[str, str] = dict(parse_qsl(parts.query, keep_blank_values=True))
+        self.headers = {k.lower(): v for k, v in (headers or {}).items()}
+        self.body = body or b''
+
+    def json(self):
+        if not self.body:
+            return {}
+        return json_loads(self.body)
+
+    def form(self) -> Dict[str, str]:
+        return dict(parse_qsl(self.body.decode('utf-8'), keep_blank_values=True))
+
+    def files(self) -> Dict[str, bytes]:
+        """解析 multipart/form-data，返回 {字段名: 内容}"""
+        content_type = self.headers.get('content-type', '')
+        if not content_type.startswith('multipart/'):
+            return {}
+        raw = b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + self.body
+        message = BytesParser(policy=HTTP).parsebytes(raw)
+        parts = {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            parts[name] = part.get_payload(decode=True)
+        return parts
+
+
+class MockResponse:
+
+    def __init__(self, status: int = 200, body: bytes = b'', headers: Optional[Dict] = None) -> None:
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+def json_response(data, status: int = 200) -> MockResponse:
+    body = json_dumps(data, ensure_ascii=False).encode('utf-8')
+    return MockResponse(status, body, {'Content-Type': 'application/json; encoding=utf-8'})
+
+
+Latency = Union[float, Callable[[random.Random], float]]
+
+
+class Faults:
+    """延迟与错误注入配置
+
+    :param latency: 每个请求的延迟（秒），也可以是 ``f(rng) -> 秒`` 的函数，用来模拟长尾
+    :param error_rate: 返回错误的概率，0~1
+    :param errcode: 注入错误时返回的业务错误码，微信的 -1 表示系统繁忙
+    :param status: 注入错误时返回的 HTTP 状态码，不为空时直接返回该状态码而不是业务错误
+    :param seed: 随机数种子，add() 添加的路径没有单独指定时由它和路径派生
+    """
+
+    def __init__(
+        self,
+        latency: Latency = 0.0,
+        error_rate: float = 0.0,
+        errcode: int = -1,
+        status: Optional[int] = None,
+        seed: Optional[Union[int, str]] = None,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.errcode = errcode
+        self.status = status
+        self.seed = seed
+        self.overrides: Dict[str, 'Faults'] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def add(self, path: str, **kwargs) -> 'Faults':
+        """为某个路径单独设置故障，如 ``faults.add('/cgi-bin/freepublish/get', latency=0.5)``"""
+        if kwargs.get('seed') is None and self.seed is not None:
+            kwargs['seed'] = f'{self.seed}:{path}'
+        self.overrides[path] = Faults(**kwargs)
+        return self.overrides[path]
+
+    def for_path(self, path: str) -> 'Faults':
+        return self.overrides.get(path, self)
+
+    def draw(self) -> Tuple[float, bool]:
+        """返回 (本次延迟, 是否注入错误)"""
+        with self._lock:
+            latency = self.latency(self._rng) if callable(self.latency) else self.latency
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+        return latency, failed
+
+
+Handler = Callable[[object, MockRequest], MockResponse]
+
+
+class MockApp:
+    """按路径分发到微信/百度桩接口
+
+    :param weixin: 微信侧状态，默认新建 ``WeiXinState()``
+    :param baidu: 百度侧状态，默认新建 ``BaiDuState()``
+    :param faults: 故障注入配置
+    """
+
+    def __init__(self, weixin=None, baidu=None, faults: Optional[Faults] = None) -> None:
+        from requests_clients.mock import baidu as baidu_routes
+        from requests_clients.mock import weixin as weixin_routes
+
+        self.weixin = weixin if weixin is not None else weixin_routes.WeiXinState()
+        self.baidu = baidu if baidu is not None else baidu_routes.BaiDuState()
+        self.faults = faults or Faults()
+        self.routes: Dict[Tuple[str, str], Tuple[Handler, object, Callable]] = {}
+        for (method, path), handler in weixin_routes.ROUTES.items():
+            self.routes[(method, path)] = (handler, self.weixin, weixin_routes.error)
+        for (method, path), handler in baidu_routes.ROUTES.items():
+            self.routes[(method, path)] = (handler, self.baidu, baidu_routes.error)
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    def handle(self, request: MockRequest, sleep: Callable[[float], None] = time.sleep) -> MockResponse:
+        with self._count_lock:
+            self.request_count += 1
+
+        route = self.routes.get((request.method, request.path))
+        if route is None:
+            return MockResponse(404, b'not found', {'Content-Type': 'text/plain'})
+        handler, state, error = route
+
+        latency, failed = self.faults.for_path(request.path).draw()
+        if latency > 0:
+            sleep(latency)
+        if failed:
+            faults = self.faults.for_path(request.path)
+            if faults.status is not None:
+                return MockResponse(faults.status, b'injected error', {'Content-Type': 'text/plain'})
+            return error(faults.errcode, 'system error')
+        return handler(state, request)
@@ -0,0 +1,79 @@
+"""
+百度语音接口桩
+
+text2audio 按文本长度返回大小接近真实合成结果的音频数据（mp3 约 16kbps，每个字约 0.25 秒）。
+"""
+import struct
+import threading
+from typing import Dict
+
+from requests_clients.mock.app import MockRequest, MockResponse, json_response
+
+ROUTES: Dict = {}
+
+AUDIO_FORMATS = {
+    3: ('audio/mp3', 500),
+    4: ('audio/basic;codec=pcm;rate=16000;channel=1', 8000),
+    5: ('audio/basic;codec=pcm;rate=8000;channel=1', 4000),
+    6: ('audio/wav', 8000),
+}
+
+
+def route(method, path):
+    def decorator(func):
+        ROUTES[(method, path)] = func
+        return func
+    return decorator
+
+
+def error(err_no, err_msg):
+    return json_response({'err_no': err_no, 'err_msg': err_msg, 'err_subcode': err_no, 'tts_logid': 0})
+
+
+class BaiDuState:
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.synthesized_chars = 0
+
+
+def make_audio(text: str, bytes_per_char: int) -> bytes:
+    """生成一段伪音频，开头带 mp3 帧同步头，长度与文本成正比"""
+    frame = b'\xff\xfb\x90\x64' + bytes(range(4, 256))
+    size = max(1, len(text)) * bytes_per_char
+    return (frame * (size // len(frame) + 1))[:size]
+
+
+def make_wav(pcm: bytes, rate: int = 16000) -> bytes:
+    fmt = struct.pack('<HHIIHH', 1, 1, rate, rate * 2, 2, 16)
+    return b''.join([b'RIFF', struct.pack('<I', 36 + len(pcm)), b'WAVE',
+                     b'fmt ', struct.pack('<I', len(fmt)), fmt, b'data', struct.pack('<I', len(pcm)), pcm])
+
+
+@route('POST', '/oauth/2.0/token')
+def token(state: BaiDuState, request: MockRequest) -> MockResponse:
+    if not request.query.get('client_id') or not request.query.get('client_secret'):
+        return json_response({'error': 'invalid_client', 'error_description': 'unknown client id'}, status=401)
+    return json_response({
+        'access_token': 'MOCK_BAIDU_TOKEN_' + request.query['client_id'],
+        'expires_in': 2592000,
+        'scope': 'audio_tts_post',
+    })
+
+
+@route('POST', '/text2audio')
+def text2audio(state: BaiDuState, request: MockRequest) -> MockResponse:
+    form = request.form()
+    if not form.get('tok'):
+        return error(502, 'access token invalid or no longer valid')
+    text = form.get('tex', '')
+    if not text or len(text.encode('gbk', errors='replace')) > 1024:
+        return error(513, 'text too long or empty')
+    aue = int(form.get('aue', 3))
+    content_type, bytes_per_char = AUDIO_FORMATS.get(aue, AUDIO_FORMATS[3])
+    with state.lock:
+        state.synthesized_chars += len(text)
+    audio = make_audio(text, bytes_per_char)
+    if aue == 6:
+        audio = make_wav(audio)
+    return MockResponse(200, audio, {'Content-Type': content_type})
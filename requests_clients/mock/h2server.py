@@ -0,0 +1,172 @@
+"""
+HTTP/2 桩服务（h2c，明文 HTTP/2，需要安装 h2）
+
+和 MockServer 一样在后台线程运行同一个 MockApp，一个连接上的多个 stream 交给线程池并发处理，
+注入的延迟不会让同一连接上的其他请求排队。用来对比 HTTP/1.1 和 HTTP/2 的连接数和吞吐：
+
+    with H2MockServer(faults=Faults(latency=0.02)) as server:
+        client = WeiXinClient(session=server.session(max_connections=2))
+        ...
+        server.connections      # 累计接受的连接数
+"""
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from requests_clients.mock.app import Faults, MockApp, MockRequest
+
+READ_SIZE = 65536
+
+
+class H2ConnectionHandler:
+    """一个客户端连接：读线程解析帧，响应在线程池里生成，发送时按流控窗口分帧"""
+
+    def __init__(self, server: 'H2MockServer', sock: socket.socket) -> None:
+        import h2.config
+        import h2.connection
+
+        self.server = server
+        self.sock = sock
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+        # 保护 conn 和 socket 写，流控窗口变大时唤醒等待发送的线程
+        self.cond = threading.Condition()
+        self.streams: Dict[int, Dict] = {}
+        self.closed = False
+
+    def flush(self) -> None:
+        data = self.conn.data_to_send()
+        if data:
+            self.sock.sendall(data)
+
+    def run(self) -> None:
+        import h2.events
+
+        with self.cond:
+            self.conn.initiate_connection()
+            self.flush()
+        try:
+            while True:
+                data = self.sock.recv(READ_SIZE)
+                if not data:
+                    break
+                with self.cond:
+                    for event in self.conn.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            self.streams[event.stream_id] = {'headers': dict(event.headers), 'body': []}
+                        elif isinstance(event, h2.events.DataReceived):
+                            self.streams[event.stream_id]['body'].append(event.data)
+                            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            stream = self.streams.pop(event.stream_id)
+                            self.server.executor.submit(self.respond, event.stream_id, stream['headers'],
+                                                        b''.join(stream['body']))
+                        elif isinstance(event, (h2.events.WindowUpdated, h2.events.StreamReset)):
+                            self.cond.notify_all()
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            return
+                    self.flush()
+        except OSError:
+            pass
+        finally:
+            with self.cond:
+                self.closed = True
+                self.cond.notify_all()
+            self.sock.close()
+
+    def respond(self, stream_id: int, headers: Dict[str, str], body: bytes) -> None:
+        host = headers.get('x-mock-original-host') or headers.get(':authority', '')
+        request = MockRequest(headers[':method'], f'http://{host}{headers[":path"]}', headers, body)
+        response = self.server.app.handle(request)
+        response_headers = [(':status', str(response.status)), ('content-length', str(len(response.body)))]
+        response_headers += [(key.lower(), value) for key, value in response.headers.items()]
+        try:
+            with self.cond:
+                self.conn.send_headers(stream_id, response_headers, end_stream=not response.body)
+                self.flush()
+            self.send_body(stream_id, memoryview(response.body))
+        except Exception:
+            # 客户端已经断开或重置了 stream
+            pass
+
+    def send_body(self, stream_id: int, data: memoryview) -> None:
+        while data:
+            with self.cond:
+                while not self.closed and self.conn.local_flow_control_window(stream_id) <= 0:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                size = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size,
+                           len(data))
+                self.conn.send_data(stream_id, data[:size].tobytes(), end_stream=size == len(data))
+                self.flush()
+            data = data[size:]
+
+
+class H2MockServer:
+    """
+    :param app: 桩服务应用，默认新建 MockApp
+    :param max_workers: 处理请求的线程数，即所有连接上同时处理的 stream 数
+    """
+
+    def __init__(self, app: Optional[MockApp] = None, faults: Optional[Faults] = None,
+                 host: str = '127.0.0.1', port: int = 0, max_workers: int = 256) -> None:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            raise ImportError('H2MockServer 需要安装 h2：pip install h2') from None
+        self.app = app or MockApp(faults=faults)
+        self.sock = socket.create_server((host, port))
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='h2-mock')
+        self.connections = 0
+        self._handlers: List[H2ConnectionHandler] = []
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.sock.getsockname()[:2]
+        return f'http://{host}:{port}'
+
+    def serve(self) -> None:
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections += 1
+            handler = H2ConnectionHandler(self, sock)
+            self._handlers.append(handler)
+            threading.Thread(target=handler.run, name='h2-mock-conn', daemon=True).start()
+
+    def start(self) -> 'H2MockServer':
+        self._thread = threading.Thread(target=self.serve, name='h2-mock-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        # 只 close 不会唤醒阻塞在 accept 上的线程
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        for handler in self._handlers:
+            try:
+                handler.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+        self.executor.shutdown(wait=True)
+
+    def session(self, max_connections: int = 1):
+        """上游域名都转发到本服务的 HTTP/2 Session（h2c prior knowledge）"""
+        from requests_clients.mock.adapters import mock_http2_session
+        return mock_http2_session(self.url, max_connections=max_connections, http1=False)
+
+    def __enter__(self) -> 'H2MockServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
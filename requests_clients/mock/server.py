@@ -0,0 +1,108 @@
+"""
+本地 HTTP 桩服务
+
+    with MockServer(faults=Faults(latency=0.05)) as server:
+        client = WeiXinClient(session=server.session())
+        client.get_draft_count('token')
+
+session() 返回的 Session 会把 api.weixin.qq.com / tsn.baidu.com / aip.baidubce.com 的请求转发到本地，
+客户端代码里的 URL 不需要改。
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from requests_clients.mock.app import Faults, MockApp, MockRequest
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def read_body(self) -> bytes:
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def dispatch(self):
+        host = self.headers.get('X-Mock-Original-Host') or self.headers.get('Host', '')
+        request = MockRequest(self.command, f'http://{host}{self.path}', dict(self.headers), self.read_body())
+        response = self.server.app.handle(request)
+        self.send_response(response.status)
+        for key, value in response.headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(response.body)))
+        self.end_headers()
+        self.wfile.write(response.body)
+
+    do_GET = dispatch
+    do_POST = dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingHTTPServer(ThreadingHTTPServer):
+    """记录累计接受的连接数，用来对比 HTTP/1.1 和 HTTP/2 的连接开销"""
+
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+class MockServer:
+    """在后台线程里运行的本地桩服务
+
+    :param app: 桩服务应用，默认新建 MockApp
+    :param faults: 不传 app 时用于新建 MockApp 的故障注入配置
+    :param port: 监听端口，0 表示随机端口
+    """
+
+    def __init__(self, app: Optional[MockApp] = None, faults: Optional[Faults] = None,
+                 host: str = '127.0.0.1', port: int = 0) -> None:
+        self.app = app or MockApp(faults=faults)
+        self.httpd = CountingHTTPServer((host, port), MockRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.app = self.app
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def connections(self) -> int:
+        return self.httpd.connections
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'MockServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def session(self, pool_maxsize: int = 10):
+        from requests_clients.mock.adapters import mock_session
+        return mock_session(self.url, pool_maxsize=pool_maxsize)
+
+    def __enter__(self) -> 'MockServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
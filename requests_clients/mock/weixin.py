@@ -0,0 +1,620 @@
+"""
+微信公众号接口桩
+
+只实现 WeiXinClient 用到的接口，返回结构与官方文档一致，图文内容按真实文章的大小生成。
+"""
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from requests_clients.mock.app import MockRequest, MockResponse, json_response
+
+ROUTES: Dict = {}
+
+PARAGRAPH = (
+    '<p style="margin: 0 0 16px; line-height: 1.75;">'
+    '微信公众平台是运营者通过公众号为微信用户提供资讯和服务的平台，'
+    '公众平台开发接口则是提供服务的基础。</p>'
+)
+
+
+def route(method, path):
+    def decorator(func):
+        ROUTES[(method, path)] = func
+        return func
+    return decorator
+
+
+def error(errcode, errmsg):
+    return json_response({'errcode': errcode, 'errmsg': errmsg})
+
+
+def ok(**kwargs):
+    data = {'errcode': 0, 'errmsg': 'ok'}
+    data.update(kwargs)
+    return json_response(data)
+
+
+def make_content(index: int, size: int) -> str:
+    """生成大约 size 字节的文章 HTML"""
+    head = f'<section><h1>第{index}篇</h1>'
+    paragraph_size = len(PARAGRAPH.encode('utf-8'))
+    return head + PARAGRAPH * max(1, size // paragraph_size) + '</section>'
+
+
+class WeiXinState:
+    """桩服务里的公众号数据
+
+    :param news_count: 预置的草稿和已发布图文数量
+    :param content_size: 每篇文章 content 的大致字节数
+    :param image_size: 预置图片素材的字节数
+    :param follower_count: 关注者数量
+    """
+
+    def __init__(self, news_count: int = 30, content_size: int = 8 * 1024, image_size: int = 64 * 1024,
+                 follower_count: int = 100) -> None:
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.content_size = content_size
+        self.tokens = set()
+        # 被强制刷新作废的 token，请求时返回 40001
+        self.revoked = set()
+        self.stable_tokens: Dict[str, str] = {}
+        self.materials: Dict[str, Dict] = OrderedDict()
+        self.drafts: Dict[str, Dict] = OrderedDict()
+        self.published: Dict[str, Dict] = OrderedDict()
+        self.publish_jobs: Dict[str, Dict] = {}
+        self.mass_messages: Dict[int, Dict] = {}
+        self.followers = [f'o{index:027d}' for index in range(1, follower_count + 1)]
+        self.sent_messages = []
+        self.cards: Dict[str, Dict] = OrderedDict()
+        # code -> {'card_id', 'openid', 'status'}
+        self.card_codes: Dict[str, Dict] = {}
+
+        image = bytes(range(256)) * (image_size // 256)
+        for index in range(3):
+            self.add_material('image', image, f'image{index}.jpg')
+        for index in range(news_count):
+            article = self.make_article(index)
+            self.drafts[self.new_id('DRAFT')] = {'news_item': [article], 'update_time': int(time.time())}
+            self.published[self.new_id('ARTICLE')] = {'news_item': [dict(article, is_deleted=False)],
+                                                      'update_time': int(time.time())}
+
+    def new_id(self, prefix: str) -> str:
+        return f'{prefix}_{next(self.ids):08d}'
+
+    def make_article(self, index: int) -> Dict:
+        return {
+            'title': f'测试文章{index}',
+            'author': '作者',
+            'digest': '摘要',
+            'content': make_content(index, self.content_size),
+            'content_source_url': '',
+            'thumb_media_id': next(iter(self.materials)),
+            'show_cover_pic': 0,
+            'need_open_comment': 0,
+            'only_fans_can_comment': 0,
+            'url': f'http://mp.weixin.qq.com/s?__biz=MOCK&mid={index}',
+        }
+
+    def add_card(self, card: Optional[Dict] = None, codes: int = 0) -> str:
+        """创建卡券并发放 codes 个 code（code 为 <card_id>-<序号>），返回 card_id"""
+        card = card or {'card_type': 'GROUPON', 'groupon': {'base_info': {'title': '测试券'}}}
+        card_id = self.new_id('CARD')
+        card_type = card.get('card_type', 'GROUPON')
+        base_info = card.setdefault(card_type.lower(), {}).setdefault('base_info', {})
+        base_info.setdefault('status', 'CARD_STATUS_VERIFY_OK')
+        base_info['id'] = card_id
+        base_info.setdefault('sku', {'quantity': codes, 'total_quantity': codes})
+        self.cards[card_id] = card
+        for index in range(codes):
+            self.card_codes[f'{card_id}-{index}'] = {
+                'card_id': card_id, 'openid': self.followers[index % len(self.followers)], 'status': 'NORMAL'}
+        return card_id
+
+    def add_material(self, type: str, content: bytes, filename: str = '', description: Dict = None) -> Dict:
+        media_id = self.new_id('MEDIA')
+        digest = hashlib.md5(content).hexdigest()
+        material = {
+            'media_id': media_id,
+            'type': type,
+            'name': filename,
+            'content': content,
+            'description': description or {},
+            'url': f'http://mmbiz.qpic.cn/mmbiz_jpg/{digest}/0',
+            'update_time': int(time.time()),
+        }
+        self.materials[media_id] = material
+        return material
+
+
+def check_token(state: WeiXinState, request: MockRequest):
+    token = request.query.get('access_token')
+    if not token:
+        return error(41001, 'access_token missing')
+    if token in state.revoked:
+        return error(40001, 'invalid credential, access_token is invalid or not latest')
+    return None
+
+
+def page(items, body):
+    offset = int(body.get('offset', 0))
+    count = min(int(body.get('count', 20)), 20)
+    return list(items)[offset:offset + count]
+
+
+@route('GET', '/cgi-bin/token')
+def token(state: WeiXinState, request: MockRequest) -> MockResponse:
+    if not request.query.get('appid') or not request.query.get('secret'):
+        return error(40013, 'invalid appid')
+    access_token = f'MOCK_TOKEN_{next(state.ids)}'
+    state.tokens.add(access_token)
+    return json_response({'access_token': access_token, 'expires_in': 7200})
+
+
+@route('POST', '/cgi-bin/stable_token')
+def stable_token(state: WeiXinState, request: MockRequest) -> MockResponse:
+    body = request.json()
+    if not body.get('appid') or not body.get('secret'):
+        return error(40013, 'invalid appid')
+    appid = body['appid']
+    with state.lock:
+        access_token = state.stable_tokens.get(appid)
+        if access_token is None or body.get('force_refresh'):
+            if access_token is not None:
+                state.revoked.add(access_token)
+                access_token = f'MOCK_STABLE_TOKEN_{appid}_{next(state.ids)}'
+            else:
+                access_token = f'MOCK_STABLE_TOKEN_{appid}'
+            state.stable_tokens[appid] = access_token
+        state.tokens.add(access_token)
+    return json_response({'access_token': access_token, 'expires_in': 7200})
+
+
+@route('GET', '/cgi-bin/ticket/getticket')
+def getticket(state: WeiXinState, request: MockRequest) -> MockResponse:
+    return check_token(state, request) or ok(ticket='MOCK_TICKET_' + request.query['access_token'], expires_in=7200)
+
+
+@route('POST', '/cgi-bin/message/subscribe/bizsend')
+def bizsend(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    body = request.json()
+    if not body.get('touser') or not body.get('template_id'):
+        return error(47003, 'argument invalid!')
+    with state.lock:
+        state.sent_messages.append(body)
+    return ok()
+
+
+@route('GET', '/wxaapi/newtmpl/getcategory')
+def getcategory(state: WeiXinState, request: MockRequest) -> MockResponse:
+    return check_token(state, request) or ok(data=[{'id': 616, 'name': '公交'}, {'id': 627, 'name': '票务'}])
+
+
+@route('GET', '/cgi-bin/user/get')
+def user_get(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    start = 0
+    next_openid = request.query.get('next_openid')
+    if next_openid:
+        # openid 由序号生成，直接换算位置
+        start = int(next_openid[1:])
+    openids = state.followers[start:start + 10000]
+    body = {'total': len(state.followers), 'count': len(openids), 'next_openid': openids[-1] if openids else ''}
+    if openids:
+        body['data'] = {'openid': openids}
+    return json_response(body)
+
+
+@route('POST', '/cgi-bin/user/info/batchget')
+def user_info_batchget(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    user_list = request.json().get('user_list', [])
+    if len(user_list) > 100:
+        return error(45035, 'user_list size out of limit')
+    infos = []
+    for user in user_list:
+        openid = user['openid']
+        index = int(openid[1:])
+        infos.append({
+            'subscribe': 1, 'openid': openid, 'language': user.get('lang', 'zh_CN'),
+            'subscribe_time': 1600000000 + index, 'unionid': f'u{index:027d}', 'remark': '',
+            'groupid': 0, 'tagid_list': [], 'subscribe_scene': 'ADD_SCENE_QR_CODE', 'qr_scene': 0, 'qr_scene_str': '',
+        })
+    return json_response({'user_info_list': infos})
+
+
+@route('POST', '/cgi-bin/material/batchget_material')
+def batchget_material(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    body = request.json()
+    materials = [m for m in state.materials.values() if m['type'] == body.get('type')]
+    items = [{'media_id': m['media_id'], 'name': m['name'], 'url': m['url'], 'update_time': m['update_time']}
+             for m in page(materials, body)]
+    return json_response({'total_count': len(materials), 'item_count': len(items), 'item': items})
+
+
+@route('GET', '/cgi-bin/material/get_materialcount')
+def get_materialcount(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    counts = {'voice_count': 0, 'video_count': 0, 'image_count': 0, 'news_count': 0}
+    for material in state.materials.values():
+        key = f'{material["type"]}_count'
+        if key in counts:
+            counts[key] += 1
+    return json_response(counts)
+
+
+@route('POST', '/cgi-bin/media/uploadimg')
+def uploadimg(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    media = request.files().get('media')
+    if not media:
+        return error(41005, 'media data missing')
+    return json_response({'url': f'http://mmbiz.qpic.cn/mmbiz_jpg/{hashlib.md5(media).hexdigest()}/0'})
+
+
+@route('POST', '/cgi-bin/material/add_material')
+def add_material(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    files = request.files()
+    media = files.get('media')
+    if not media:
+        return error(41005, 'media data missing')
+    with state.lock:
+        material = state.add_material(request.query.get('type', 'image'), media)
+    return json_response({'media_id': material['media_id'], 'url': material['url']})
+
+
+@route('POST', '/cgi-bin/material/get_material')
+def get_material(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    material = state.materials.get(request.json().get('media_id'))
+    if material is None:
+        return error(40007, 'invalid media_id')
+    if material['type'] == 'video':
+        return json_response({
+            'title': material['description'].get('title', ''),
+            'description': material['description'].get('introduction', ''),
+            'down_url': material['url'],
+        })
+    return MockResponse(200, material['content'], {
+        'Content-Type': 'image/jpeg',
+        'Content-disposition': f'attachment; filename="{material["name"] or material["media_id"]}"',
+    })
+
+
+@route('POST', '/cgi-bin/material/del_material')
+def del_material(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    with state.lock:
+        if state.materials.pop(request.json().get('media_id'), None) is None:
+            return error(40007, 'invalid media_id')
+    return ok()
+
+
+@route('POST', '/cgi-bin/draft/add')
+def draft_add(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    articles = request.json().get('articles') or []
+    if not articles:
+        return error(40007, 'invalid media_id')
+    for article in articles:
+        if article.get('thumb_media_id') not in state.materials:
+            return error(40007, 'invalid media_id')
+    with state.lock:
+        media_id = state.new_id('DRAFT')
+        state.drafts[media_id] = {'news_item': articles, 'update_time': int(time.time())}
+    return json_response({'media_id': media_id})
+
+
+@route('POST', '/cgi-bin/draft/get')
+def draft_get(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    draft = state.drafts.get(request.json().get('media_id'))
+    if draft is None:
+        return error(40007, 'invalid media_id')
+    return json_response({'news_item': draft['news_item']})
+
+
+@route('POST', '/cgi-bin/draft/update')
+def draft_update(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    body = request.json()
+    draft = state.drafts.get(body.get('media_id'))
+    if draft is None:
+        return error(40007, 'invalid media_id')
+    index = int(body.get('index', 0))
+    if index >= len(draft['news_item']):
+        return error(53504, 'index out of range')
+    with state.lock:
+        draft['news_item'][index] = body.get('articles')
+        draft['update_time'] = int(time.time())
+    return ok()
+
+
+@route('POST', '/cgi-bin/draft/delete')
+def draft_delete(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    with state.lock:
+        if state.drafts.pop(request.json().get('media_id'), None) is None:
+            return error(40007, 'invalid media_id')
+    return ok()
+
+
+def news_list(items, body, id_key):
+    no_content = int(body.get('no_content', 0))
+    result = []
+    for item_id, item in page(items.items(), body):
+        news_item = item['news_item']
+        if no_content:
+            news_item = [{k: v for k, v in news.items() if k != 'content'} for news in news_item]
+        result.append({id_key: item_id, 'content': {'news_item': news_item}, 'update_time': item['update_time']})
+    return json_response({'total_count': len(items), 'item_count': len(result), 'item': result})
+
+
+@route('POST', '/cgi-bin/draft/batchget')
+def draft_batchget(state: WeiXinState, request: MockRequest) -> MockResponse:
+    return check_token(state, request) or news_list(state.drafts, request.json(), 'media_id')
+
+
+@route('GET', '/cgi-bin/draft/count')
+def draft_count(state: WeiXinState, request: MockRequest) -> MockResponse:
+    return check_token(state, request) or json_response({'total_count': len(state.drafts)})
+
+
+@route('POST', '/cgi-bin/freepublish/submit')
+def freepublish_submit(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    media_id = request.json().get('media_id')
+    with state.lock:
+        draft = state.drafts.pop(media_id, None)
+        if draft is None:
+            return error(40007, 'invalid media_id')
+        publish_id = str(next(state.ids))
+        article_id = state.new_id('ARTICLE')
+        news_item = [dict(article, is_deleted=False) for article in draft['news_item']]
+        state.published[article_id] = {'news_item': news_item, 'update_time': int(time.time())}
+        state.publish_jobs[publish_id] = {'article_id': article_id, 'count': len(news_item)}
+    return ok(publish_id=publish_id, msg_data_id=int(publish_id))
+
+
+@route('POST', '/cgi-bin/freepublish/batchget')
+def freepublish_batchget(state: WeiXinState, request: MockRequest) -> MockResponse:
+    return check_token(state, request) or news_list(state.published, request.json(), 'article_id')
+
+
+@route('POST', '/cgi-bin/freepublish/getarticle')
+def freepublish_getarticle(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    published = state.published.get(request.json().get('article_id'))
+    if published is None:
+        return error(53600, 'Article ID 无效')
+    return json_response({'news_item': published['news_item']})
+
+
+@route('POST', '/cgi-bin/freepublish/delete')
+def freepublish_delete(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    with state.lock:
+        if state.published.pop(request.json().get('article_id'), None) is None:
+            return error(53600, 'Article ID 无效')
+    return ok()
+
+
+@route('POST', '/cgi-bin/freepublish/get')
+def freepublish_get(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    publish_id = str(request.json().get('publish_id'))
+    job = state.publish_jobs.get(publish_id)
+    if job is None:
+        return error(53600, 'publish_id 无效')
+    items = [{'idx': index + 1, 'article_url': f'http://mp.weixin.qq.com/s?__biz=MOCK&idx={index + 1}'}
+             for index in range(job['count'])]
+    return json_response({
+        'publish_id': publish_id,
+        'publish_status': 0,
+        'article_id': job['article_id'],
+        'article_detail': {'count': len(items), 'item': items},
+        'fail_idx': [],
+    })
+
+
+@route('POST', '/cgi-bin/message/mass/preview')
+def mass_preview(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    return ok(msg_id=next(state.ids))
+
+
+@route('POST', '/cgi-bin/message/mass/sendall')
+def mass_sendall(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    with state.lock:
+        msg_id = next(state.ids)
+        state.mass_messages[msg_id] = {'msg_status': 'SEND_SUCCESS', 'body': request.json()}
+    return ok(msg_id=msg_id, msg_data_id=msg_id)
+
+
+@route('POST', '/cgi-bin/message/mass/send')
+def mass_send(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    body = request.json()
+    touser = body.get('touser', [])
+    if not 2 <= len(touser) <= 10000:
+        return error(40130, 'invalid openid list size, at least two openid')
+    with state.lock:
+        clientmsgid = body.get('clientmsgid')
+        for message in state.mass_messages.values():
+            if clientmsgid is not None and message['body'].get('clientmsgid') == clientmsgid:
+                return error(45065, 'clientmsgid exist')
+        msg_id = next(state.ids)
+        # 按 openid 群发需要查询一次后才变成发送成功，用来测试状态轮询
+        state.mass_messages[msg_id] = {'msg_status': 'SENDING', 'pending_polls': 1, 'body': body}
+    return ok(msg_id=msg_id, msg_data_id=msg_id)
+
+
+@route('POST', '/cgi-bin/message/mass/get')
+def mass_get(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    msg_id = request.json().get('msg_id')
+    message = state.mass_messages.get(msg_id)
+    if message is None:
+        return error(40007, 'invalid msg_id')
+    with state.lock:
+        if message.get('pending_polls'):
+            message['pending_polls'] -= 1
+        elif message['msg_status'] == 'SENDING':
+            message['msg_status'] = 'SEND_SUCCESS'
+    return json_response({'msg_id': msg_id, 'msg_status': message['msg_status']})
+
+
+@route('POST', '/cgi-bin/poi/addpoi')
+def addpoi(state: WeiXinState, request: MockRequest) -> MockResponse:
+    return check_token(state, request) or ok(poi_id=next(state.ids))
+
+
+@route('POST', '/card/create')
+def card_create(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    with state.lock:
+        card_id = state.add_card(request.json().get('card'))
+    return ok(card_id=card_id)
+
+
+@route('POST', '/card/batchget')
+def card_batchget(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    body = request.json()
+    status_list = body.get('status_list')
+    card_ids = [
+        card_id for card_id, card in state.cards.items()
+        if not status_list or card[card['card_type'].lower()]['base_info']['status'] in status_list
+    ]
+    offset, count = int(body.get('offset', 0)), min(int(body.get('count', 10)), 50)
+    return ok(card_id_list=card_ids[offset:offset + count], total_num=len(card_ids))
+
+
+@route('POST', '/card/get')
+def card_get(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    card = state.cards.get(request.json().get('card_id'))
+    if card is None:
+        return error(40073, 'invalid card id')
+    return ok(card=card)
+
+
+def find_code(state: WeiXinState, body: Dict):
+    code = state.card_codes.get(body.get('code'))
+    if code is None or (body.get('card_id') and body['card_id'] != code['card_id']):
+        return None
+    return code
+
+
+@route('POST', '/card/code/get')
+def card_code_get(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    body = request.json()
+    code = find_code(state, body)
+    if code is None:
+        return error(40056, 'invalid serial code')
+    can_consume = code['status'] == 'NORMAL'
+    if body.get('check_consume', True) and not can_consume:
+        return error(40099, 'invalid code, this code has consumed.')
+    return ok(card={'card_id': code['card_id']}, openid=code['openid'], can_consume=can_consume,
+              user_card_status=code['status'])
+
+
+@route('POST', '/card/code/consume')
+def card_code_consume(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    with state.lock:
+        code = find_code(state, request.json())
+        if code is None:
+            return error(40056, 'invalid serial code')
+        if code['status'] == 'CONSUMED':
+            return error(40099, 'invalid code, this code has consumed.')
+        if code['status'] != 'NORMAL':
+            return error(40127, 'invalid user-card status')
+        code['status'] = 'CONSUMED'
+    return ok(card={'card_id': code['card_id']}, openid=code['openid'])
+
+
+@route('POST', '/card/code/unavailable')
+def card_code_unavailable(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    with state.lock:
+        code = find_code(state, request.json())
+        if code is None:
+            return error(40056, 'invalid serial code')
+        code['status'] = 'UNAVAILABLE'
+    return ok()
+
+
+@route('POST', '/card/delete')
+def card_delete(state: WeiXinState, request: MockRequest) -> MockResponse:
+    failed = check_token(state, request)
+    if failed:
+        return failed
+    card = state.cards.get(request.json().get('card_id'))
+    if card is None:
+        return error(40073, 'invalid card id')
+    card[card['card_type'].lower()]['base_info']['status'] = 'CARD_STATUS_DELETE'
+    return ok()
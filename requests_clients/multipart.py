@@ -0,0 +1,168 @@
+"""
+不拼接的 multipart/form-data 请求体
+
+requests 的 files= 会把所有字段编码成一个新的 bytes，上传 16MB 的素材时内存里至少有两份。
+MultipartBody 只生成每个字段的头部，内容按原样（memoryview）逐段交给 socket.sendall：
+
+    body = MultipartBody({'media': ('a.mp4', mmap_obj), 'description': '{"title": "..."}'})
+    requests.post(url, data=body, headers={'Content-Type': body.content_type})
+
+字段值可以是：
+
+- str：普通表单字段
+- bytes / bytearray / memoryview / mmap / io.BytesIO：文件内容，从 BytesIO 当前位置开始，不复制
+- 有 fileno() 的文件对象、文件描述符（int）：从当前位置到文件末尾，发送时用 mmap 映射，不读进内存
+- 其他有 read() 的对象：构造时整个读出来
+- (文件名, 内容) 或 (文件名, 内容, Content-Type)，内容为以上任意一种
+
+没有给文件名时和 requests 一样用字段名。长度在构造时确定，请求带 Content-Length 而不是分块传输；
+可以重复迭代，重试时会重新发送。文件和 BytesIO 在请求结束前不能修改或关闭。
+"""
+import io
+import mimetypes
+import mmap
+import os
+import secrets
+import stat
+from typing import Dict, Iterator, List, Optional, Tuple
+
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+READ_SIZE = 64 * 1024
+
+
+class FileRange:
+    """文件描述符上的一段，发送时映射"""
+
+    def __init__(self, fd: int, offset: int, size: int) -> None:
+        self.fd = fd
+        self.offset = offset
+        self.size = size
+
+    def __iter__(self) -> Iterator[memoryview]:
+        if self.size <= 0:
+            return
+        # 映射随最后一个切片一起释放，调用方持有切片时不能主动 close
+        mapped = mmap.mmap(self.fd, self.offset + self.size, access=mmap.ACCESS_READ)
+        yield memoryview(mapped)[self.offset:self.offset + self.size]
+
+
+def escape_name(value: str) -> str:
+    """按 HTML5 的规则转义 Content-Disposition 里的名字"""
+    return value.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+
+
+def guess_filename(value) -> Optional[str]:
+    name = getattr(value, 'name', None)
+    if isinstance(name, str) and name and not (name.startswith('<') and name.endswith('>')):
+        return os.path.basename(name)
+    return None
+
+
+def is_regular_file(fd: int) -> bool:
+    return stat.S_ISREG(os.fstat(fd).st_mode)
+
+
+def read_fd(fd: int) -> bytes:
+    chunks = []
+    while True:
+        chunk = os.read(fd, READ_SIZE)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+
+def content_source(value) -> Tuple[object, int]:
+    """把字段内容转换成 (可以发送的来源, 长度)"""
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    # 发送时才取 memoryview，请求结束后调用方可以正常关闭 mmap、修改 BytesIO
+    if isinstance(value, memoryview):
+        return value, value.nbytes
+    if isinstance(value, BUFFER_TYPES):
+        return value, len(value)
+    if isinstance(value, io.BytesIO):
+        return (value, value.tell()), len(value.getbuffer()) - value.tell()
+    if isinstance(value, int):
+        if not is_regular_file(value):
+            # 管道、socket 没有长度也不能按偏移读，只能先读出来
+            return content_source(read_fd(value))
+        offset = os.lseek(value, 0, os.SEEK_CUR)
+        size = max(0, os.fstat(value).st_size - offset)
+        return FileRange(value, offset, size), size
+    if hasattr(value, 'fileno'):
+        try:
+            fd = value.fileno()
+            if is_regular_file(fd):
+                offset = value.tell()
+                size = max(0, os.fstat(fd).st_size - offset)
+                return FileRange(fd, offset, size), size
+        except (OSError, io.UnsupportedOperation):
+            pass
+    if hasattr(value, 'read'):
+        return content_source(value.read())
+    raise TypeError(f'不支持的字段类型：{type(value).__name__}')
+
+
+def iter_source(source, size: int) -> Iterator:
+    if size <= 0:
+        return
+    if isinstance(source, FileRange):
+        yield from source
+    elif isinstance(source, tuple):
+        buffer, offset = source
+        yield buffer.getbuffer()[offset:offset + size]
+    else:
+        yield source
+
+
+class MultipartBody:
+    """
+    :param fields: {字段名: 字段值}，字段值的类型见模块说明
+    :param boundary: 分隔符，默认随机生成
+    """
+
+    def __init__(self, fields: Dict, boundary: Optional[str] = None) -> None:
+        self.boundary = boundary or secrets.token_hex(16)
+        # (头部, 内容来源, 内容长度)
+        self.parts: List[Tuple[bytes, object, int]] = []
+        for index, (name, value) in enumerate(fields.items()):
+            filename, content_type = None, None
+            if isinstance(value, (tuple, list)):
+                filename, value, content_type = (tuple(value) + (None,))[:3]
+            elif not isinstance(value, str):
+                filename = guess_filename(value) or name
+            if filename is not None and content_type is None:
+                content_type = mimetypes.guess_type(filename)[0] or DEFAULT_CONTENT_TYPE
+            source, size = content_source(value)
+            header = self.part_header(name, filename, content_type, first=index == 0)
+            self.parts.append((header, source, size))
+        self.closing = f'\r\n--{self.boundary}--\r\n'.encode('ascii')
+        self.length = sum(len(header) + size for header, _, size in self.parts) + len(self.closing)
+
+    def part_header(self, name: str, filename: Optional[str], content_type: Optional[str], first: bool) -> bytes:
+        disposition = f'form-data; name="{escape_name(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{escape_name(filename)}"'
+        lines = [f'--{self.boundary}', f'Content-Disposition: {disposition}']
+        if content_type is not None:
+            lines.append(f'Content-Type: {content_type}')
+        # 上一个字段内容后面的换行合并到下一个字段的头部，少一次发送
+        return (('' if first else '\r\n') + '\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator:
+        for header, source, size in self.parts:
+            yield header
+            yield from iter_source(source, size)
+        yield self.closing
+
+    def to_bytes(self) -> bytes:
+        """拼接成完整的请求体，会复制内容，只用于调试和测试"""
+        return b''.join(self)
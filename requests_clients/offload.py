@@ -0,0 +1,238 @@
+"""
+CPU 密集的前后处理放到进程池
+
+HTML 解析改写、wav 拼接等纯 Python 计算会持有 GIL，和网络线程抢同一个解释器。处理函数用 register_stage 注册，
+配置了 Offloader 时在子进程中执行，网络请求仍然留在线程里：
+
+    offloader = Offloader(max_workers=4)
+    content = localize_images(wx_client, token, content, offloader=offloader)
+    audio = text2audio_long(bd_client, text, token, cuid, aue=6, offloader=offloader)
+
+大于 shm_threshold 的 bytes 参数和返回值通过共享内存传递，不经过 pickle 和管道；输入小于 inline_below 的调用
+直接在当前线程执行，进程间通信的开销比计算本身还大。asyncio 中可以用 ``asyncio.wrap_future(offloader.submit(...))``。
+
+hashlib 计算大于 2KB 的数据时会释放 GIL，在线程里算就行，不需要注册成阶段。
+阶段函数必须是模块级函数（子进程按名字导入），不能保留对输入 buffer 的引用。
+
+注册阶段只需要导入本模块，multiprocessing 和进程池在创建 Offloader 时才导入，不使用时不影响启动时间。
+"""
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from multiprocessing.shared_memory import SharedMemory
+
+# 阶段名 -> 函数
+STAGES: Dict[str, Callable] = {}
+
+BYTES_TYPES = (bytes, bytearray, memoryview)
+
+
+def register_stage(name: str, func: Optional[Callable] = None):
+    """注册可以放到进程池执行的处理函数，也可以作为装饰器 ``@register_stage('name')``"""
+    if func is None:
+        return lambda f: register_stage(name, f)
+    STAGES[name] = func
+    return func
+
+
+def run_stage(offloader: Optional['Offloader'], name: str, *args, **kwargs):
+    """offloader 为空时直接调用，否则交给 offloader"""
+    if offloader is None:
+        return STAGES[name](*args, **kwargs)
+    return offloader.run(name, *args, **kwargs)
+
+
+class SharedBuffer(NamedTuple):
+    """共享内存中一段数据的句柄，可以跨进程传递"""
+    name: str
+    size: int
+
+
+def to_shared(data) -> 'SharedMemory':
+    from multiprocessing.shared_memory import SharedMemory
+    shm = SharedMemory(create=True, size=max(1, len(data)))
+    shm.buf[:len(data)] = data
+    return shm
+
+
+def payload_size(value) -> int:
+    if isinstance(value, BYTES_TYPES):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(payload_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(payload_size(item) for item in value.values())
+    return 0
+
+
+def pack(value, threshold: int, segments: List['SharedMemory']):
+    """把较大的 bytes（包括列表里的）换成共享内存句柄"""
+    if isinstance(value, BYTES_TYPES) and len(value) >= threshold:
+        shm = to_shared(value)
+        segments.append(shm)
+        return SharedBuffer(shm.name, len(value))
+    if isinstance(value, list):
+        return [pack(item, threshold, segments) for item in value]
+    if isinstance(value, tuple) and not isinstance(value, SharedBuffer):
+        return tuple(pack(item, threshold, segments) for item in value)
+    return value
+
+
+def unpack(value, segments: List['SharedMemory'], views: List[memoryview]):
+    """把共享内存句柄换成 memoryview，不复制"""
+    if isinstance(value, SharedBuffer):
+        from multiprocessing.shared_memory import SharedMemory
+        shm = SharedMemory(name=value.name)
+        segments.append(shm)
+        view = shm.buf[:value.size]
+        views.append(view)
+        return view
+    if isinstance(value, list):
+        return [unpack(item, segments, views) for item in value]
+    if isinstance(value, tuple):
+        return tuple(unpack(item, segments, views) for item in value)
+    return value
+
+
+def execute_stage(func: Callable, args: tuple, kwargs: dict, threshold: int):
+    """在子进程中执行"""
+    segments: List['SharedMemory'] = []
+    views: List[memoryview] = []
+    try:
+        result = func(*unpack(args, segments, views), **kwargs)
+        if isinstance(result, memoryview):
+            result = bytes(result)
+    finally:
+        for view in views:
+            view.release()
+        for shm in segments:
+            try:
+                shm.close()
+            except BufferError:
+                # 异常的 traceback 还引用着切片，映射随异常一起回收，名字由父进程 unlink
+                pass
+    if isinstance(result, BYTES_TYPES) and len(result) >= threshold:
+        shm = to_shared(result)
+        shm.close()
+        return SharedBuffer(shm.name, len(result))
+    return result
+
+
+def take_shared(handle: SharedBuffer) -> bytes:
+    """复制出共享内存中的结果并释放"""
+    from multiprocessing.shared_memory import SharedMemory
+    shm = SharedMemory(name=handle.name)
+    try:
+        return bytes(shm.buf[:handle.size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def release(segments: Iterable['SharedMemory']) -> None:
+    for shm in segments:
+        shm.close()
+        shm.unlink()
+
+
+class Offloader:
+    """
+    :param max_workers: 进程数，默认为 CPU 核数
+    :param stages: 放到进程池执行的阶段名，为空时所有注册的阶段都放到进程池
+    :param shm_threshold: 大于等于这个字节数的 bytes 参数和返回值走共享内存
+    :param inline_below: 参数总大小小于这个值时在当前线程执行
+    :param mp_context: multiprocessing 上下文，默认 spawn，调用方有网络线程时 fork 不安全
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        stages: Optional[Iterable[str]] = None,
+        shm_threshold: int = 64 * 1024,
+        inline_below: int = 16 * 1024,
+        mp_context=None,
+    ) -> None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.stages = None if stages is None else frozenset(stages)
+        self.shm_threshold = shm_threshold
+        self.inline_below = inline_below
+        self.executor = ProcessPoolExecutor(max_workers, mp_context=mp_context or multiprocessing.get_context('spawn'))
+        self._lock = threading.Lock()
+        self._counters = {'offloaded': 0, 'inline': 0, 'shm_bytes': 0}
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def offloaded(self, name: str) -> bool:
+        return name in STAGES and (self.stages is None or name in self.stages)
+
+    def submit(self, name: str, *args, **kwargs) -> Future:
+        func = STAGES.get(name)
+        if func is None:
+            raise KeyError(f'阶段 {name} 没有注册，需要先导入定义它的模块')
+        if not self.offloaded(name) or payload_size(args) < self.inline_below:
+            self._count('inline')
+            future = Future()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as err:
+                future.set_exception(err)
+            return future
+
+        segments: List['SharedMemory'] = []
+        try:
+            packed = pack(args, self.shm_threshold, segments)
+            inner = self.executor.submit(execute_stage, func, packed, kwargs, self.shm_threshold)
+        except BaseException:
+            release(segments)
+            raise
+        self._count('offloaded')
+        self._count('shm_bytes', sum(shm.size for shm in segments))
+
+        outer = Future()
+
+        def done(inner: Future) -> None:
+            release(segments)
+            if inner.cancelled():
+                outer.cancel()
+                return
+            error = inner.exception()
+            if error is not None:
+                outer.set_exception(error)
+                return
+            result = inner.result()
+            try:
+                outer.set_result(take_shared(result) if isinstance(result, SharedBuffer) else result)
+            except Exception as err:
+                outer.set_exception(err)
+
+        inner.add_done_callback(done)
+        return outer
+
+    def run(self, name: str, *args, **kwargs):
+        return self.submit(name, *args, **kwargs).result()
+
+    def map(self, name: str, items: Iterable) -> List:
+        """对每个元素执行阶段，全部提交后按顺序返回结果"""
+        futures = [self.submit(name, item) for item in items]
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'Offloader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,60 @@
+"""
+令牌桶限速
+
+按固定速率发放令牌，最多攒 burst 个，acquire 拿不到令牌时等待。用于批量任务控制对上游的请求频率：
+
+    limiter = RateLimiter(rate=10, burst=10)
+    for chunk in chunks:
+        limiter.acquire()
+        wx_client.mass_send(token, chunk, 'text', {'content': '...'})
+"""
+import threading
+import time
+from typing import Optional
+
+
+class RateLimitTimeout(Exception):
+    """等待令牌超时"""
+
+
+class RateLimiter:
+    """
+    :param rate: 每秒发放的令牌数
+    :param burst: 桶容量，空闲后最多可以连续发出的请求数
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        if rate <= 0:
+            raise ValueError('rate 必须大于 0')
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> None:
+        """取得令牌，需要等待时 sleep，timeout 秒内拿不到抛出 RateLimitTimeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise RateLimitTimeout(f'{timeout}s 内没有拿到令牌')
+            time.sleep(wait)
@@ -0,0 +1,125 @@
+"""
+按 key 公平调度的线程池
+
+每个 key（如公众号 appid）一个队列，空闲线程按 key 轮转取任务，每个 key 同时最多 per_key_limit 个任务在执行。
+某个 key 一次提交了大量任务，其他 key 新提交的任务也只需要等一轮，而不是排在它后面：
+
+    scheduler = FairScheduler(max_workers=32, per_key_limit=4)
+    future = scheduler.submit(appid, func, *args)
+
+任务在提交时的 contextvars 上下文中执行，deadline 等上下文会传到线程里。
+"""
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Set
+
+
+class FairScheduler:
+    """
+    :param max_workers: 线程数
+    :param per_key_limit: 每个 key 同时执行的任务数上限，为空时不限制
+    """
+
+    def __init__(self, max_workers: int = 16, per_key_limit: Optional[int] = None,
+                 thread_name_prefix: str = 'fair') -> None:
+        self.max_workers = max_workers
+        self.per_key_limit = per_key_limit
+        self._queues: Dict[Hashable, Deque] = {}
+        self._inflight: Dict[Hashable, int] = {}
+        # 有任务可以执行的 key，按轮转顺序排列
+        self._ready: Deque[Hashable] = deque()
+        self._in_ready: Set[Hashable] = set()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads: List[threading.Thread] = []
+        self._thread_name_prefix = thread_name_prefix
+
+    def submit(self, key: Hashable, func: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        context = contextvars.copy_context()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError('scheduler 已关闭')
+            self._queues.setdefault(key, deque()).append((future, context, func, args, kwargs))
+            self._inflight.setdefault(key, 0)
+            self._mark_ready(key)
+            self._cond.notify()
+            if len(self._threads) < self.max_workers:
+                self._start_thread()
+        return future
+
+    def _start_thread(self) -> None:
+        thread = threading.Thread(target=self._work, name=f'{self._thread_name_prefix}-{len(self._threads)}',
+                                  daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _mark_ready(self, key: Hashable) -> None:
+        """key 还有排队的任务且没有达到并发上限时排到轮转队尾"""
+        if key in self._in_ready or not self._queues.get(key):
+            return
+        if self.per_key_limit is not None and self._inflight[key] >= self.per_key_limit:
+            return
+        self._ready.append(key)
+        self._in_ready.add(key)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._ready and not self._shutdown:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                key = self._ready.popleft()
+                self._in_ready.discard(key)
+                future, context, func, args, kwargs = self._queues[key].popleft()
+                self._inflight[key] += 1
+                self._mark_ready(key)
+
+            result = error = None
+            running = future.set_running_or_notify_cancel()
+            if running:
+                try:
+                    result = context.run(func, *args, **kwargs)
+                except BaseException as err:
+                    error = err
+
+            # 先更新计数再设置结果，Future 完成时 busy() 已经反映这个任务结束
+            with self._cond:
+                self._inflight[key] -= 1
+                if not self._inflight[key] and not self._queues[key]:
+                    # key 空闲后不再占用内存
+                    del self._inflight[key], self._queues[key]
+                else:
+                    self._mark_ready(key)
+                    self._cond.notify()
+            if running:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def busy(self, key: Hashable) -> bool:
+        """key 是否还有排队或执行中的任务"""
+        with self._cond:
+            return key in self._inflight
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'keys': len(self._queues),
+                'queued': sum(len(queue) for queue in self._queues.values()),
+                'inflight': sum(self._inflight.values()),
+                'threads': len(self._threads),
+            }
+
+    def close(self, wait: bool = True) -> None:
+        """不再接受新任务，已经提交的任务执行完后线程退出"""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
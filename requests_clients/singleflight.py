@@ -0,0 +1,202 @@
+"""
+相同请求合并（single-flight）
+
+同一时刻多个线程发起完全相同的读请求时，只有第一个真正请求上游，其余线程等待并拿到同一个结果（或同一个异常）。
+请求结束后立即移除，之后的调用会重新请求，不起缓存作用。
+
+    flight = SingleFlight()
+    wx_client = WeiXinClient(singleflight=flight)
+
+流式下载用 stream()：上游只读一次，每个调用方各自得到一个迭代器，从第一块开始读，读得快的线程负责从上游拉取。
+所有读者都读过的块立即丢弃；已经丢弃过块的下载不再接纳新的读者，之后的调用会新开一个上游流。
+"""
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+from typing import Callable, Deque, Dict, Hashable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class Broadcast:
+    """把一个分块的迭代器分发给多个读者，块在所有读者都读过之后丢弃，内存占用取决于最快和最慢读者的差距
+
+    :param open_stream: 第一个读者开始读时才调用，让上游请求发生在读者线程里
+    :param on_done: 上游读完、出错或者所有读者都提前退出时调用
+    """
+
+    def __init__(self, open_stream: Callable[[], Iterable[bytes]],
+                 on_done: Optional[Callable[[], None]] = None) -> None:
+        self.open_stream = open_stream
+        self.source: Optional[Iterator[bytes]] = None
+        self.chunks: Deque[bytes] = deque()
+        # chunks[0] 的序号
+        self.base = 0
+        # 读者 -> 下一个要读的块的序号
+        self.positions: Dict[int, int] = {}
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.on_done = on_done
+        self._ids = itertools.count()
+        # 读者被垃圾回收时会在任意位置调用 leave()，用可重入锁避免同一线程死锁
+        self._lock = threading.RLock()
+        self._fetch_lock = threading.RLock()
+
+    def join(self) -> Optional['BroadcastReader']:
+        """新增一个从第一块开始读的读者，已经有块被丢弃或者已经结束时返回 None"""
+        with self._lock:
+            if self.done or self.base > 0:
+                return None
+            reader_id = next(self._ids)
+            self.positions[reader_id] = 0
+        return BroadcastReader(self, reader_id)
+
+    def _trim(self) -> None:
+        # 持有 _lock 时调用
+        oldest = min(self.positions.values(), default=self.base + len(self.chunks))
+        while self.base < oldest and self.chunks:
+            self.chunks.popleft()
+            self.base += 1
+
+    def _buffered(self, reader_id: int) -> Optional[bytes]:
+        with self._lock:
+            index = self.positions[reader_id]
+            if index >= self.base + len(self.chunks):
+                return None
+            chunk = self.chunks[index - self.base]
+            self.positions[reader_id] = index + 1
+            if index == self.base:
+                self._trim()
+            return chunk
+
+    def _pull(self) -> None:
+        # 持有 _fetch_lock 时调用
+        try:
+            if self.source is None:
+                self.source = iter(self.open_stream())
+            chunk = next(self.source)
+        except StopIteration:
+            self._finish()
+            return
+        except BaseException as err:
+            self.error = err
+            self._finish()
+            return
+        with self._lock:
+            self.chunks.append(chunk)
+
+    def _finish(self) -> None:
+        if self.done:
+            return
+        self.done = True
+        if self.on_done is not None:
+            self.on_done()
+
+    def next_chunk(self, reader_id: int) -> bytes:
+        while True:
+            # 落后的读者直接读已缓存的块，不需要等待上游
+            chunk = self._buffered(reader_id)
+            if chunk is not None:
+                return chunk
+            with self._fetch_lock:
+                if reader_id not in self.positions:
+                    raise StopIteration
+                if self.positions[reader_id] < self.base + len(self.chunks):
+                    continue
+                if self.done:
+                    self.leave(reader_id)
+                    if self.error is not None:
+                        raise self.error
+                    raise StopIteration
+                self._pull()
+
+    def leave(self, reader_id: int) -> None:
+        """读者结束，最后一个读者提前退出时关闭上游"""
+        with self._lock:
+            if self.positions.pop(reader_id, None) is None:
+                return
+            self._trim()
+            abandoned = not self.positions and not self.done
+        if abandoned:
+            with self._fetch_lock:
+                close = getattr(self.source, 'close', None)
+                if close is not None:
+                    close()
+                self._finish()
+
+
+class BroadcastReader:
+    """Broadcast 的一个读者，读完、调用 close() 或者被回收时退出"""
+
+    def __init__(self, broadcast: Broadcast, reader_id: int) -> None:
+        self.broadcast = broadcast
+        self.reader_id = reader_id
+
+    def __iter__(self) -> 'BroadcastReader':
+        return self
+
+    def __next__(self) -> bytes:
+        return self.broadcast.next_chunk(self.reader_id)
+
+    def close(self) -> None:
+        self.broadcast.leave(self.reader_id)
+
+    def __del__(self) -> None:
+        self.close()
+
+
+class SingleFlight:
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, Future] = {}
+        self._streams: Dict[Hashable, Broadcast] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """执行 func，key 相同的调用正在进行时等待并共享它的结果"""
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(func())
+        except BaseException as err:
+            future.set_exception(err)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    def stream(self, key: Hashable, open_stream: Callable[[], Iterable[bytes]]) -> Iterator[bytes]:
+        """返回分块迭代器，key 相同的下载正在进行时共享同一个上游流"""
+        with self._lock:
+            self.calls += 1
+            broadcast = self._streams.get(key)
+            reader = None if broadcast is None else broadcast.join()
+            if reader is None:
+                # 没有进行中的下载，或者已经开始丢弃读过的块，新开一个上游流
+                broadcast = self._streams[key] = Broadcast(open_stream)
+                broadcast.on_done = partial(self._finish_stream, key, broadcast)
+                reader = broadcast.join()
+            else:
+                self.shared += 1
+        return reader
+
+    def _finish_stream(self, key: Hashable, broadcast: Broadcast) -> None:
+        with self._lock:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {'calls': self.calls, 'shared': self.shared, 'inflight': len(self._calls) + len(self._streams)}
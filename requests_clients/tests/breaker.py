@@ -0,0 +1,127 @@
+"""
+pytest requests_clients/tests/breaker.py -s
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from baidu_client.client import BaiDuClient
+from requests_clients.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from requests_clients.deadline import DeadlineExceeded, deadline
+from requests_clients.limiter import AdaptiveLimiter, LimitTimeout
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import Faults, MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.errors import WeiXinClientError
+
+URL = 'https://api.weixin.qq.com/cgi-bin/draft/count'
+
+
+def test_state_transitions():
+    """
+    pytest requests_clients/tests/breaker.py::test_state_transitions -s
+    """
+    changes = []
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05,
+                             on_state_change=lambda *args: changes.append(args[1:]))
+    for _ in range(2):
+        breaker.before(URL)
+        breaker.record(URL, False)
+    assert breaker.state(URL) == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before(URL)
+
+    time.sleep(0.06)
+    breaker.before(URL)
+    assert breaker.state(URL) == HALF_OPEN
+    # half_open 只放行一个探测请求
+    with pytest.raises(CircuitOpenError):
+        breaker.before(URL)
+    breaker.record(URL, False)
+    assert breaker.state(URL) == OPEN
+
+    time.sleep(0.06)
+    breaker.before(URL)
+    breaker.record(URL, True)
+    assert breaker.state(URL) == CLOSED
+    assert changes == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+    assert breaker.stats()[URL]['rejected'] == 2
+
+
+def test_host_scope():
+    """
+    pytest requests_clients/tests/breaker.py::test_host_scope -s
+    """
+    breaker = CircuitBreaker(failure_threshold=1, scope='host')
+    breaker.record(URL, False)
+    with pytest.raises(CircuitOpenError):
+        breaker.before('https://api.weixin.qq.com/cgi-bin/material/get_materialcount')
+    breaker.before('https://tsn.baidu.com/text2audio')
+
+
+def test_probe_released_when_not_sent():
+    """等待并发名额超时的请求没有发出，不能占住 half_open 的探测名额
+
+    pytest requests_clients/tests/breaker.py::test_probe_released_when_not_sent -s
+    """
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+    wx_client = WeiXinClient(session=mock_session(MockApp()), breaker=breaker, limiter=limiter)
+    breaker.record(URL, False)
+    time.sleep(0.02)
+
+    limiter.acquire(URL)
+    with pytest.raises((LimitTimeout, DeadlineExceeded)):
+        with deadline(0.05):
+            wx_client.get_draft_count('token')
+    assert breaker.state(URL) == HALF_OPEN
+    limiter.release(URL, 0.01)
+
+    wx_client.get_draft_count('token')
+    assert breaker.state(URL) == CLOSED
+
+
+def test_weixin_client_fails_fast():
+    """
+    pytest requests_clients/tests/breaker.py::test_weixin_client_fails_fast -s
+    """
+    faults = Faults()
+    faults.add('/cgi-bin/draft/count', latency=0.2)
+    faults.add('/cgi-bin/material/get_materialcount', error_rate=1, errcode=-1)
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    wx_client = WeiXinClient(timeout=0.05, session=mock_session(MockApp(faults=faults)), breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            wx_client.get_draft_count('token')
+        with pytest.raises(WeiXinClientError):
+            wx_client.get_material_count('token')
+
+    start = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        wx_client.get_draft_count('token')
+    assert time.perf_counter() - start < 0.01
+    with pytest.raises(CircuitOpenError):
+        wx_client.get_material_count('token')
+
+    wx_client.get_category('token')
+    assert wx_client.stats()['breaker'][URL]['state'] == OPEN
+
+
+def test_baidu_client_fails_fast():
+    """
+    pytest requests_clients/tests/breaker.py::test_baidu_client_fails_fast -s
+    """
+    faults = Faults()
+    faults.add('/text2audio', error_rate=1, status=502)
+    breaker = CircuitBreaker(failure_threshold=3)
+    client = BaiDuClient(session=mock_session(MockApp(faults=faults)), debug=False, breaker=breaker)
+    for _ in range(3):
+        assert client.text2audio('你好', token='token', cuid='test').status_code == 502
+    with pytest.raises(CircuitOpenError):
+        client.text2audio('你好', token='token', cuid='test')
+    assert client.stats()['breaker']['https://tsn.baidu.com/text2audio']['state'] == OPEN
@@ -0,0 +1,92 @@
+"""
+pytest requests_clients/tests/cache.py -s
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.cache import ResponseCache
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.errors import WeiXinClientError
+from weixin_client.schemas import make_article
+
+URL = 'https://api.weixin.qq.com/cgi-bin/draft/count'
+
+
+def test_ttl_and_lru():
+    """
+    pytest requests_clients/tests/cache.py::test_ttl_and_lru -s
+    """
+    cache = ResponseCache({'/cgi-bin/draft/count': 0.05, '/cgi-bin/draft/get': 60}, maxsize=2)
+    # access_token 不参与 key，参数顺序不影响 key
+    assert cache.key('get', URL, {'access_token': 'a'}) == cache.key('GET', URL, {'access_token': 'b'})
+    assert cache.key('post', URL, json={'a': 1, 'b': 2}) == cache.key('post', URL, json={'b': 2, 'a': 1})
+    assert cache.key('post', 'https://api.weixin.qq.com/cgi-bin/draft/add') is None
+
+    key = cache.key('get', URL)
+    assert cache.fetch(key, lambda: 1) == 1
+    assert cache.fetch(key, lambda: 2) == 1
+    time.sleep(0.06)
+    assert cache.fetch(key, lambda: 3) == 3
+
+    # 不可缓存的结果不写入
+    draft_url = 'https://api.weixin.qq.com/cgi-bin/draft/get'
+    keys = [cache.key('post', draft_url, json={'media_id': i}) for i in range(3)]
+    assert cache.fetch(keys[0], lambda: 'error', cacheable=lambda value: False) == 'error'
+    for index, key in enumerate(keys):
+        cache.fetch(key, lambda: index)
+    stats = cache.stats()
+    assert stats['size'] == 2 and stats['evictions'] == 2
+    assert cache.fetch(keys[0], lambda: 'reloaded') == 'reloaded'
+
+
+def test_stale_while_revalidate():
+    """
+    pytest requests_clients/tests/cache.py::test_stale_while_revalidate -s
+    """
+    cache = ResponseCache({'/cgi-bin/draft/count': 0.2}, stale_ttl=10)
+    key = cache.key('get', URL)
+    cache.fetch(key, lambda: 'old')
+    time.sleep(0.21)
+
+    def slow_loader():
+        time.sleep(0.05)
+        return 'new'
+
+    start = time.monotonic()
+    assert cache.fetch(key, slow_loader) == 'old'
+    assert time.monotonic() - start < 0.04
+    time.sleep(0.1)
+    assert cache.fetch(key, lambda: 'unused') == 'new'
+    assert cache.stats()['stale_hits'] == 1
+
+
+def test_client_cache_and_invalidation():
+    """
+    pytest requests_clients/tests/cache.py::test_client_cache_and_invalidation -s
+    """
+    app = MockApp()
+    client = WeiXinClient(session=mock_session(app), cache=WeiXinClient.make_cache())
+
+    count = client.get_draft_count('token1')['total_count']
+    # token 变了也命中缓存
+    assert client.get_draft_count('token2')['total_count'] == count
+    assert app.request_count == 1
+
+    client.add_draft('token', [make_article('标题', '<p>内容</p>', 'MEDIA_00000001')])
+    assert client.get_draft_count('token')['total_count'] == count + 1
+    assert app.request_count == 3
+
+    # 错误响应不缓存
+    with pytest.raises(WeiXinClientError):
+        client.get_category('')
+    client.get_category('token')
+    client.get_category('token')
+    assert app.request_count == 5
+    assert client.stats()['cache']['hits'] == 2
@@ -0,0 +1,138 @@
+"""
+pytest requests_clients/tests/cli.py -s
+"""
+import io
+import json
+import os
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from baidu_client.client import BaiDuClient
+from baidu_client.tts import text2audio_long
+from requests_clients.cli import bounded, main
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from requests_clients.mock.server import MockServer
+from weixin_client.client import WeiXinClient
+
+
+@pytest.fixture()
+def server():
+    with MockServer(MockApp()) as server:
+        yield server
+
+
+def run(server, *argv) -> int:
+    return main([*argv, '--mock', server.url, '--quiet'] + (['--appid', 'wx1', '--secret', 's']
+                                                            if argv[0] != 'tts' else []))
+
+
+def read_ndjson(path):
+    with open(path, encoding='utf-8') as fp:
+        return [json.loads(line) for line in fp]
+
+
+def test_bounded_ordered():
+    """
+    pytest requests_clients/tests/cli.py::test_bounded_ordered -s
+    """
+    inflight, peak = set(), []
+
+    def submit(item):
+        inflight.add(item)
+        peak.append(len(inflight))
+        future = Future()
+        future.add_done_callback(lambda _: inflight.discard(item))
+        return future
+
+    results = []
+    for item, future in bounded(submit, range(10), 3, ordered=True):
+        # 最前面的任务没有完成时不会继续提交
+        assert min(inflight) == item
+        future.set_result(item)
+        results.append(item)
+    assert results == list(range(10))
+    assert max(peak) <= 3
+
+
+def test_export_publish(server, tmp_path):
+    """
+    pytest requests_clients/tests/cli.py::test_export_publish -s
+    """
+    client = WeiXinClient(session=mock_session(server.app))
+    published_before = len(server.app.weixin.published)
+    media_id = server.app.weixin.add_material('image', b'x')['media_id']
+    for index in range(45):
+        client.add_draft('token', [{'title': f't{index}', 'content': 'c', 'thumb_media_id': media_id}])
+
+    drafts = tmp_path / 'drafts.ndjson'
+    assert run(server, 'export', 'drafts', '--no-content', '-o', str(drafts), '--concurrency', '3') == 0
+    items = read_ndjson(drafts)
+    # 并发翻页，输出仍然按顺序
+    assert [item['media_id'] for item in items] == list(server.app.weixin.drafts)
+    assert 'content' not in items[0]['content']['news_item'][0]
+
+    published = tmp_path / 'published.ndjson'
+    total = len(items)
+    with open(drafts, 'a', encoding='utf-8') as fp:
+        fp.write('\n{"media_id": "MISSING"}\n')
+    assert run(server, 'publish', str(drafts), '-o', str(published), '--rate', '200') == 1
+    results = {result['media_id']: result for result in read_ndjson(published)}
+    assert results['MISSING']['errcode'] == 40007
+    assert sum('publish_id' in result for result in results.values()) == total
+    assert len(server.app.weixin.published) - published_before == total and not server.app.weixin.drafts
+
+
+def test_upload(server, tmp_path):
+    """
+    pytest requests_clients/tests/cli.py::test_upload -s
+    """
+    assets = tmp_path / 'assets'
+    assets.mkdir()
+    for index in range(5):
+        (assets / f'{index}.jpg').write_bytes(b'image-%d' % (index % 3))
+    output = tmp_path / 'uploaded.ndjson'
+    materials_before = len(server.app.weixin.materials)
+
+    assert run(server, 'upload', str(assets), '-o', str(output)) == 0
+    records = read_ndjson(output)
+    assert sorted(record['path'] for record in records) == [f'{index}.jpg' for index in range(5)]
+    # 内容相同的文件共用一个 media_id，只上传 3 次
+    assert len({record['media_id'] for record in records}) == 3
+    assert len(server.app.weixin.materials) - materials_before == 3
+
+    # 再次运行全部命中索引
+    assert run(server, 'upload', str(assets), '-o', str(output)) == 0
+    assert len(server.app.weixin.materials) - materials_before == 3
+
+
+@pytest.mark.parametrize('suffix', ['.mp3', '.wav'])
+def test_tts(server, tmp_path, suffix):
+    """
+    pytest requests_clients/tests/cli.py::test_tts -s
+    """
+    text = '今天天气很好，我们去公园散步。' * 200
+    source = tmp_path / 'article.txt'
+    source.write_text(text, encoding='utf-8')
+    output = tmp_path / f'article{suffix}'
+    assert run(server, 'tts', str(source), '-o', str(output), '--concurrency', '4') == 0
+
+    client = BaiDuClient(session=mock_session(server.app), debug=False)
+    expected = text2audio_long(client, text, 'token', 'cuid', aue=6 if suffix == '.wav' else 3)
+    assert output.read_bytes() == expected
+
+
+def test_tts_stdin(server, tmp_path, monkeypatch):
+    """从 stdin 读入时不关闭 stdin
+
+    pytest requests_clients/tests/cli.py::test_tts_stdin -s
+    """
+    stdin = io.StringIO('今天天气很好。')
+    monkeypatch.setattr(sys, 'stdin', stdin)
+    output = tmp_path / 'stdin.mp3'
+    assert run(server, 'tts', '-', '-o', str(output)) == 0
+    assert output.stat().st_size > 0 and not stdin.closed
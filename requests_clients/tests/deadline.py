@@ -0,0 +1,132 @@
+"""
+pytest requests_clients/tests/deadline.py -s
+"""
+import os
+import sys
+import time
+
+import pytest
+import requests
+
+sys.path.append(os.getcwd())
+
+from baidu_client.client import BaiDuClient, ClientError
+from requests_clients.deadline import Deadline, DeadlineExceeded, current_deadline, deadline
+from requests_clients.mock.adapters import MockAdapter, mock_session
+from requests_clients.mock.app import Faults, MockApp
+from weixin_client.client import WeiXinClient
+
+
+class FlakyAdapter(MockAdapter):
+    """前 failures 次请求抛出 ConnectTimeout，记录每次收到的超时"""
+
+    def __init__(self, app, failures=0):
+        super().__init__(app)
+        self.failures = failures
+        self.timeouts = []
+
+    def send(self, request, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        if len(self.timeouts) <= self.failures:
+            raise requests.exceptions.ConnectTimeout('mock connect timeout', request=request)
+        return super().send(request, timeout=timeout, **kwargs)
+
+
+def flaky_session(failures=0, faults=None):
+    adapter = FlakyAdapter(MockApp(faults=faults), failures)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    return session, adapter
+
+
+def test_clip_and_nesting():
+    """
+    pytest requests_clients/tests/deadline.py::test_clip_and_nesting -s
+    """
+    d = Deadline(1)
+    connect, read = d.clip((3, 10))
+    assert connect <= 1 and read <= 1
+    assert d.clip((0.1, 0.2)) == (0.1, 0.2)
+
+    assert current_deadline() is None
+    with deadline(0.5) as outer:
+        # 嵌套时不会延长外层的截止时间
+        with deadline(10) as inner:
+            assert inner is outer
+        with deadline(0.1) as inner:
+            assert inner.expires_at < outer.expires_at
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+    expired = Deadline(0)
+    with pytest.raises(DeadlineExceeded):
+        expired.clip(10)
+
+
+def test_endpoint_timeouts():
+    """
+    pytest requests_clients/tests/deadline.py::test_endpoint_timeouts -s
+    """
+    session, adapter = flaky_session()
+    client = WeiXinClient(timeout=(2, 5), session=session, timeouts={'/cgi-bin/draft/count': (1, 3)})
+    client.get_draft_count('token')
+    client.get_material_count('token')
+    assert adapter.timeouts == [(1, 3), (2, 5)]
+    # 上传类接口默认放宽读超时
+    assert client.timeouts['/cgi-bin/material/add_material'][1] > 10
+
+
+def test_deadline_bounds_slow_call():
+    """
+    pytest requests_clients/tests/deadline.py::test_deadline_bounds_slow_call -s
+    """
+    faults = Faults()
+    faults.add('/cgi-bin/draft/count', latency=1)
+    client = WeiXinClient(session=mock_session(MockApp(faults=faults)))
+
+    start = time.monotonic()
+    with deadline(0.1):
+        client.get_material_count('token')
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            client.get_draft_count('token')
+        # 预算已经用完，后续步骤直接失败而不是再等一个完整的超时
+        with pytest.raises(DeadlineExceeded):
+            client.get_material_count('token')
+    assert time.monotonic() - start < 0.5
+
+
+def test_retries_share_budget():
+    """
+    pytest requests_clients/tests/deadline.py::test_retries_share_budget -s
+    """
+    session, adapter = flaky_session(failures=2)
+    client = WeiXinClient(timeout=(5, 10), session=session, retries=3, retry_backoff=0.05)
+    with deadline(1):
+        client.get_draft_count('token')
+    assert len(adapter.timeouts) == 3
+    # 每次重试的超时随剩余预算递减
+    reads = [read for _, read in adapter.timeouts]
+    assert reads == sorted(reads, reverse=True) and reads[0] <= 1
+
+    # 重试耗尽预算后抛出 DeadlineExceeded
+    session, adapter = flaky_session(failures=10)
+    client = WeiXinClient(session=session, retries=10, retry_backoff=0.05)
+    with pytest.raises(DeadlineExceeded):
+        with deadline(0.2):
+            client.get_draft_count('token')
+    assert len(adapter.timeouts) < 10
+
+
+def test_baidu_retries():
+    """
+    pytest requests_clients/tests/deadline.py::test_baidu_retries -s
+    """
+    session, adapter = flaky_session(failures=1)
+    client = BaiDuClient(session=session, debug=False, retry_backoff=0)
+    with pytest.raises(ClientError):
+        client.get_access_token('apikey', 'secretkey')
+
+    adapter.timeouts.clear()
+    client.retries = 1
+    client.get_access_token('apikey', 'secretkey')
+    assert len(adapter.timeouts) == 2
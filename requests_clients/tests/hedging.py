@@ -0,0 +1,121 @@
+"""
+pytest requests_clients/tests/hedging.py -s
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.hedging import Hedger
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import Faults, MockApp
+from weixin_client.client import WeiXinClient
+
+KEY = 'https://api.weixin.qq.com/cgi-bin/material/get_materialcount'
+
+
+def warm_up(hedger, key=KEY, latency=0.001):
+    for _ in range(hedger.min_samples):
+        hedger.record(key, latency)
+
+
+def test_hedge_slow_call():
+    """
+    pytest requests_clients/tests/hedging.py::test_hedge_slow_call -s
+    """
+    hedger = Hedger(min_delay=0.02)
+    calls = itertools.count()
+
+    def func():
+        # 第一次调用很慢，对冲的第二次很快
+        n = next(calls)
+        time.sleep(0.5 if n == 0 else 0.001)
+        return n
+
+    # 样本不足时不对冲
+    assert hedger.run(KEY, lambda: 'direct') == 'direct'
+    warm_up(hedger)
+    assert hedger.delay(KEY) == 0.02
+
+    start = time.monotonic()
+    assert hedger.run(KEY, func) == 1
+    assert time.monotonic() - start < 0.2
+    stats = hedger.stats()[KEY]
+    assert stats['calls'] == 2 and stats['hedged'] == 1 and stats['hedge_wins'] == 1
+    hedger.close()
+
+
+def test_hedge_errors():
+    """
+    pytest requests_clients/tests/hedging.py::test_hedge_errors -s
+    """
+    hedger = Hedger(min_delay=0.01)
+    warm_up(hedger)
+    calls = itertools.count()
+
+    def func():
+        # 第一次调用慢且失败，对冲成功
+        if next(calls) == 0:
+            time.sleep(0.05)
+            raise ValueError('slow failure')
+        time.sleep(0.1)
+        return 'ok'
+
+    assert hedger.run(KEY, func) == 'ok'
+
+    def fail():
+        time.sleep(0.02)
+        raise ValueError('failure')
+
+    with pytest.raises(ValueError):
+        hedger.run(KEY, fail)
+    hedger.close()
+
+
+def test_skip_when_saturated():
+    """线程池用满时新的请求在调用方线程执行，不对冲
+
+    pytest requests_clients/tests/hedging.py::test_skip_when_saturated -s
+    """
+    hedger = Hedger(min_delay=0.01, max_workers=3)
+    warm_up(hedger)
+    slow = threading.Thread(target=hedger.run, args=(KEY, lambda: time.sleep(0.2)))
+    slow.start()
+    time.sleep(0.05)
+
+    assert hedger.run(KEY, threading.current_thread) is threading.current_thread()
+    slow.join()
+    stats = hedger.stats()[KEY]
+    assert stats['skipped'] == 1 and stats['hedged'] == 1
+    # 线程归还后恢复对冲
+    assert hedger.run(KEY, threading.current_thread) is not threading.current_thread()
+    hedger.close()
+
+
+def test_client_only_hedges_reads():
+    """
+    pytest requests_clients/tests/hedging.py::test_client_only_hedges_reads -s
+    """
+    faults = Faults()
+    faults.add('/cgi-bin/material/get_materialcount', latency=lambda rng: 0.3 if rng.random() < 0.1 else 0.002)
+    app = MockApp(faults=faults)
+    hedger = Hedger(min_delay=0.01)
+    client = WeiXinClient(session=mock_session(app), hedger=hedger)
+
+    assert client.hedge_key('https://api.weixin.qq.com/cgi-bin/draft/add?access_token=x') is None
+    assert client.hedge_key(KEY + '?access_token=x') == KEY
+
+    warm_up(hedger, latency=0.002)
+    for _ in range(30):
+        assert 'voice_count' in client.get_material_count('token')
+    stats = client.stats()['hedger']
+    assert list(stats) == [KEY]
+    assert stats[KEY]['calls'] == 30
+    # 慢请求都被对冲
+    assert app.request_count == 30 + stats[KEY]['hedged']
+    hedger.close()
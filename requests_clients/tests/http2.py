@@ -0,0 +1,79 @@
+"""
+pytest requests_clients/tests/http2.py -s
+"""
+import os
+import socket
+import sys
+import threading
+
+import pytest
+import requests
+
+sys.path.append(os.getcwd())
+
+pytest.importorskip('httpx')
+pytest.importorskip('h2')
+
+from requests_clients.mock.adapters import mock_http2_session
+from requests_clients.mock.app import Faults, MockApp
+from requests_clients.mock.h2server import H2MockServer
+from requests_clients.mock.server import MockServer
+from weixin_client.client import WeiXinClient
+
+TOKEN = 'MOCK_TOKEN'
+
+
+def test_multiplexing():
+    """
+    pytest requests_clients/tests/http2.py::test_multiplexing -s
+    """
+    with H2MockServer(faults=Faults(latency=0.01)) as server:
+        client = WeiXinClient(session=server.session(max_connections=1))
+        payload = os.urandom(3 * 1024 * 1024 + 17)
+        uploaded = client.add_material_by_content(TOKEN, 'image', ('a.jpg', payload), '', '')
+        assert server.app.weixin.materials[uploaded['media_id']]['content'] == payload
+        assert b''.join(client.iter_material(TOKEN, uploaded['media_id'])) == payload
+
+        results = []
+
+        def worker():
+            for _ in range(5):
+                results.append(client.get_draft_count(TOKEN)['total_count'])
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 80
+        # 所有请求复用同一个连接
+        assert server.connections == 1
+        assert client.session.get_adapter('https://api.weixin.qq.com').stats() == {'HTTP/2': 82}
+
+
+def test_errors():
+    """
+    pytest requests_clients/tests/http2.py::test_errors -s
+    """
+    with H2MockServer() as server:
+        server.app.faults.add('/cgi-bin/draft/count', latency=0.5)
+        client = WeiXinClient(session=server.session(), timeout=(1, 0.1))
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            client.get_draft_count(TOKEN)
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    client = WeiXinClient(session=mock_http2_session(f'http://127.0.0.1:{port}', http1=False))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get_draft_count(TOKEN)
+
+
+def test_http1_fallback():
+    """
+    pytest requests_clients/tests/http2.py::test_http1_fallback -s
+    """
+    with MockServer(MockApp()) as server:
+        client = WeiXinClient(session=mock_http2_session(server.url))
+        assert client.get_draft_count(TOKEN)['total_count'] == len(server.app.weixin.drafts)
+        assert client.session.get_adapter('https://api.weixin.qq.com').stats() == {'HTTP/1.1': 1}
@@ -0,0 +1,81 @@
+"""
+pytest requests_clients/tests/limiter.py -s
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.limiter import AdaptiveLimiter, LimitTimeout
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import Faults, MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.errors import WeiXinClientError
+
+
+def test_additive_increase_multiplicative_decrease():
+    """
+    pytest requests_clients/tests/limiter.py::test_additive_increase_multiplicative_decrease -s
+    """
+    limiter = AdaptiveLimiter(initial=4, max_limit=16)
+    for _ in range(40):
+        limiter.acquire('a')
+        limiter.release('a', 0.01)
+    assert limiter.stats()['a']['limit'] > 8
+
+    # 延迟明显升高时不再增加
+    limit = limiter.stats()['a']['limit']
+    for _ in range(20):
+        limiter.acquire('a')
+        limiter.release('a', 0.5)
+    assert limiter.stats()['a']['limit'] == limit
+
+    limiter.acquire('a')
+    limiter.release('a', 0.01, overloaded=True)
+    assert limiter.stats()['a']['limit'] == limit // 2
+    # 紧接着的过载属于同一批，不重复降低
+    limiter.acquire('a')
+    limiter.release('a', 0.01, overloaded=True)
+    assert limiter.stats()['a']['limit'] == limit // 2
+    assert 'b' not in limiter.stats()
+
+
+def test_acquire_blocks_at_limit():
+    """
+    pytest requests_clients/tests/limiter.py::test_acquire_blocks_at_limit -s
+    """
+    limiter = AdaptiveLimiter(initial=2)
+    limiter.acquire('a')
+    limiter.acquire('a')
+    limiter.acquire('b')
+    with pytest.raises(LimitTimeout):
+        limiter.acquire('a', timeout=0.05)
+    limiter.release('a', 0.01)
+    limiter.acquire('a', timeout=0.05)
+
+
+def test_client_backs_off_on_system_busy():
+    """
+    pytest requests_clients/tests/limiter.py::test_client_backs_off_on_system_busy -s
+    """
+    faults = Faults()
+    faults.add('/cgi-bin/material/get_materialcount', error_rate=1, errcode=-1)
+    limiter = AdaptiveLimiter(initial=8)
+    wx_client = WeiXinClient(session=mock_session(MockApp(faults=faults)), limiter=limiter)
+
+    def call(_):
+        wx_client.get_draft_count('token')
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(call, range(200)))
+
+    with pytest.raises(WeiXinClientError):
+        wx_client.get_material_count('token')
+
+    stats = wx_client.stats()['limiter']
+    assert stats['https://api.weixin.qq.com/cgi-bin/draft/count']['limit'] > 8
+    assert stats['https://api.weixin.qq.com/cgi-bin/material/get_materialcount']['limit'] == 4
+    assert stats['https://api.weixin.qq.com/cgi-bin/material/get_materialcount']['inflight'] == 0
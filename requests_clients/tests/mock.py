@@ -0,0 +1,126 @@
+"""
+pytest requests_clients/tests/mock.py -s
+"""
+import base64
+import io
+import os
+import sys
+
+import pytest
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.getcwd())
+
+from baidu_client.client import BaiDuClient
+from requests_clients.mock.adapters import Cassette, mock_session, recording_session, replay_session
+from requests_clients.mock.app import Faults, MockApp
+from requests_clients.mock.server import MockServer
+from weixin_client.client import WeiXinClient
+from weixin_client.errors import InvaildMaterialError, WeiXinClientError
+from weixin_client.schemas import make_article
+
+
+def test_weixin_draft_flow_in_process():
+    """
+    pytest requests_clients/tests/mock.py::test_weixin_draft_flow_in_process -s
+    """
+    wx_client = WeiXinClient(session=mock_session(MockApp()))
+    token = wx_client.get_stable_token('appid', 'secret')['access_token']
+
+    media_path = os.path.join(BASE_DIR, '..', '..', 'weixin_client', 'tests', 'weixin.jpg')
+    media_id = wx_client.add_material(token, 'image', media_path, '微信图标', '微信图标')['media_id']
+    total = wx_client.get_draft_count(token)['total_count']
+
+    draft_id = wx_client.add_draft(token, [make_article('标题', '内容', media_id)])['media_id']
+    assert wx_client.get_draft_count(token)['total_count'] == total + 1
+    assert wx_client.get_draft(token, draft_id)['news_item'][0]['title'] == '标题'
+
+    publish_id = wx_client.publish_article(token, draft_id)['publish_id']
+    assert wx_client.query_publish_status(token, publish_id)['publish_status'] == 0
+
+
+def test_weixin_errors():
+    """
+    pytest requests_clients/tests/mock.py::test_weixin_errors -s
+    """
+    wx_client = WeiXinClient(session=mock_session(MockApp()))
+    with pytest.raises(InvaildMaterialError):
+        wx_client.get_material('token', 'invaild_media_id')
+    with pytest.raises(WeiXinClientError) as exc_info:
+        wx_client.get_draft_count('')
+    assert exc_info.value.errcode == 41001
+
+
+def test_fault_injection():
+    """
+    pytest requests_clients/tests/mock.py::test_fault_injection -s
+    """
+    faults = Faults(error_rate=1, errcode=45009)
+    faults.add('/cgi-bin/draft/count', latency=0.5)
+    wx_client = WeiXinClient(timeout=0.1, session=mock_session(MockApp(faults=faults)))
+
+    with pytest.raises(WeiXinClientError) as exc_info:
+        wx_client.get_material_count('token')
+    assert exc_info.value.errcode == 45009
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        wx_client.get_draft_count('token')
+
+
+def test_seeded_faults():
+    """
+    pytest requests_clients/tests/mock.py::test_seeded_faults -s
+    """
+    def draws():
+        faults = Faults(seed=7)
+        path_faults = faults.add('/cgi-bin/draft/count', error_rate=0.5)
+        return [path_faults.draw()[1] for _ in range(32)]
+
+    assert draws() == draws()
+
+
+def test_http_server():
+    """
+    pytest requests_clients/tests/mock.py::test_http_server -s
+    """
+    with MockServer() as server:
+        wx_client = WeiXinClient(session=server.session())
+        token = wx_client.get_access_token('appid', 'secret')['access_token']
+        resp_json = wx_client.get_draft_list(token)
+        assert resp_json['item_count'] == 20
+        assert len(resp_json['item'][0]['content']['news_item'][0]['content']) > 4000
+
+        baidu_client = BaiDuClient(session=server.session())
+        token = baidu_client.get_access_token('apikey', 'secretkey')['access_token']
+        resp = baidu_client.text2audio('你好', token=token, cuid='test', aue=6)
+        assert resp.headers['Content-Type'] == 'audio/wav'
+        assert server.app.request_count == 4
+
+
+def test_record_and_replay(tmp_path):
+    """
+    pytest requests_clients/tests/mock.py::test_record_and_replay -s
+    """
+    cassette = Cassette()
+    with MockServer() as server:
+        wx_client = WeiXinClient(session=recording_session(cassette, base=server.session()))
+        recorded = wx_client.get_draft_count('secret-token')
+
+    path = tmp_path / 'cassette.json'
+    cassette.save(str(path))
+    assert 'secret-token' not in path.read_text(encoding='utf-8')
+
+    wx_client = WeiXinClient(session=replay_session(Cassette.load(str(path))))
+    assert wx_client.get_draft_count('another-token') == recorded
+
+
+def test_record_file_body():
+    """
+    pytest requests_clients/tests/mock.py::test_record_file_body -s
+    """
+    cassette = Cassette()
+    session = recording_session(cassette, base=mock_session(MockApp()))
+    session.post('https://api.weixin.qq.com/upload', data=io.BytesIO(b'file content'),
+                 headers={'Content-Type': 'application/octet-stream'})
+    assert cassette.exchanges[0]['request']['body'] == {'base64': base64.b64encode(b'file content').decode('ascii')}
@@ -0,0 +1,123 @@
+"""
+pytest requests_clients/tests/multipart.py -s
+"""
+import io
+import json
+import mmap
+import os
+import subprocess
+import sys
+
+import requests
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.app import MockApp, MockRequest
+from requests_clients.mock.server import MockServer
+from requests_clients.multipart import MultipartBody
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 子进程里上传，桩服务在测试进程里，服务端解析请求体的内存不计入
+UPLOAD_SCRIPT = """
+import json, resource, sys, tracemalloc
+from requests_clients.mock.adapters import mock_session
+from weixin_client.client import WeiXinClient
+
+size = int(sys.argv[2])
+payload = bytes(range(256)) * (size // 256)
+client = WeiXinClient(session=mock_session(sys.argv[1]))
+client.get_material_count('MOCK_TOKEN')
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+tracemalloc.start()
+client.add_material_by_content('MOCK_TOKEN', 'video', payload, 'title', 'intro')
+_, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'peak': peak, 'rss_delta': (rss_after - rss_before) * 1024}))
+"""
+
+
+def parse(body: bytes, content_type: str):
+    return MockRequest('POST', 'http://localhost/', {'Content-Type': content_type}, body).files()
+
+
+def test_multipart_body(tmp_path):
+    """
+    pytest requests_clients/tests/multipart.py::test_multipart_body -s
+    """
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'v' * 10000)
+    with open(path, 'rb') as fp, open(path, 'rb') as mapped_fp:
+        mapped = mmap.mmap(mapped_fp.fileno(), 0, access=mmap.ACCESS_READ)
+        fd = os.open(path, os.O_RDONLY)
+        fields = {
+            'bytes': b'a' * 100,
+            'memoryview': memoryview(b'b' * 100),
+            'mmap': ('video.mp4', mapped, 'video/mp4'),
+            'file': fp,
+            'fd': fd,
+            'bytesio': io.BytesIO(b'c' * 100),
+            'description': json.dumps({'title': '标题'}, ensure_ascii=False),
+        }
+        body = MultipartBody(fields)
+        data = body.to_bytes()
+        assert len(body) == len(data)
+        # 可以重复迭代（重试）
+        assert body.to_bytes() == data
+        os.close(fd)
+        mapped.close()
+
+    parts = parse(data, body.content_type)
+    assert parts['bytes'] == b'a' * 100
+    assert parts['memoryview'] == b'b' * 100
+    assert parts['mmap'] == parts['file'] == parts['fd'] == b'v' * 10000
+    assert parts['bytesio'] == b'c' * 100
+    assert json.loads(parts['description']) == {'title': '标题'}
+    assert b'name="file"; filename="video.mp4"\r\nContent-Type: video/mp4' in data
+    # 字符串是普通表单字段，没有文件名
+    assert b'name="description"\r\n\r\n' in data
+
+    # 与 requests 的 files= 编码结果解析出来的内容一致
+    fields = {'media': ('a.jpg', b'x' * 100), 'description': '{}'}
+    prepared = requests.Request('POST', 'http://localhost/', files=fields).prepare()
+    expected = parse(prepared.body, prepared.headers['Content-Type'])
+    body = MultipartBody(fields)
+    assert parse(body.to_bytes(), body.content_type) == expected
+
+
+def test_pipe_source():
+    """管道不是普通文件，读出全部内容后发送
+
+    pytest requests_clients/tests/multipart.py::test_pipe_source -s
+    """
+    def pipe(data):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, data)
+        os.close(write_fd)
+        return read_fd
+
+    read_fd = pipe(b'piped' * 100)
+    body = MultipartBody({'media': ('a.bin', read_fd)})
+    os.close(read_fd)
+    assert parse(body.to_bytes(), body.content_type)['media'] == b'piped' * 100
+
+    with os.fdopen(pipe(b'file object'), 'rb') as fp:
+        body = MultipartBody({'media': ('a.bin', fp)})
+    assert parse(body.to_bytes(), body.content_type)['media'] == b'file object'
+
+
+def test_upload_memory():
+    """
+    pytest requests_clients/tests/multipart.py::test_upload_memory -s
+    """
+    size = 32 * 1024 * 1024
+    app = MockApp()
+    with MockServer(app) as server:
+        output = subprocess.check_output([sys.executable, '-c', UPLOAD_SCRIPT, server.url, str(size)], cwd=ROOT_DIR)
+    result = json.loads(output)
+    print(result)
+    # 请求体没有被复制：Python 分配的峰值和 RSS 增量都远小于素材大小
+    assert result['peak'] < size * 0.1
+    assert result['rss_delta'] < size * 0.5
+    assert len(list(app.weixin.materials.values())[-1]['content']) == size
@@ -0,0 +1,69 @@
+"""
+pytest requests_clients/tests/offload.py -s
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from baidu_client.tts import concat_wav
+from requests_clients.mock.baidu import make_wav
+from requests_clients.offload import Offloader, run_stage
+from weixin_client.images import collect_images, rewrite_images
+
+
+def shm_segments():
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+
+@pytest.fixture(scope='module')
+def offloader():
+    offloader = Offloader(max_workers=2)
+    yield offloader
+    offloader.close()
+
+
+def test_shared_memory_stage(offloader):
+    """
+    pytest requests_clients/tests/offload.py::test_shared_memory_stage -s
+    """
+    before = shm_segments()
+    chunks = [make_wav(bytes([index]) * 200_000) for index in range(4)]
+    # 大的 wav 通过共享内存传给子进程，结果也通过共享内存返回
+    assert offloader.run('tts.concat_wav', chunks) == concat_wav(chunks)
+    stats = offloader.stats()
+    assert stats['offloaded'] == 1 and stats['shm_bytes'] >= 800_000
+    # 子进程里的异常原样抛出
+    with pytest.raises(ValueError):
+        offloader.run('tts.concat_wav', [b'\0' * 100_000])
+    assert shm_segments() == before
+
+
+def test_html_stages(offloader):
+    """
+    pytest requests_clients/tests/offload.py::test_html_stages -s
+    """
+    content = ''.join(f'<p>{"文字" * 100}</p><img src="https://example.com/{index}.jpg">' for index in range(100))
+    urls = run_stage(offloader, 'html.collect_images', content)
+    assert urls == collect_images(content)
+    mapping = {url: url.replace('example.com', 'mmbiz.qpic.cn') for url in urls}
+    assert run_stage(offloader, 'html.rewrite_images', content, mapping) == rewrite_images(content, mapping)
+
+    # 小输入在当前线程执行
+    inline = offloader.stats()['inline']
+    assert run_stage(offloader, 'html.collect_images', '<img src="https://example.com/a.jpg">') == [
+        'https://example.com/a.jpg']
+    assert offloader.stats()['inline'] == inline + 1
+    assert run_stage(None, 'html.collect_images', content) == urls
+
+
+def test_stage_selection():
+    """
+    pytest requests_clients/tests/offload.py::test_stage_selection -s
+    """
+    with Offloader(max_workers=1, stages=['tts.concat_wav']) as offloader:
+        content = '<img src="https://example.com/a.jpg">' + 'x' * 100_000
+        offloader.run('html.collect_images', content)
+        assert offloader.stats() == {'offloaded': 0, 'inline': 1, 'shm_bytes': 0}
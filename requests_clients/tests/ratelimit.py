@@ -0,0 +1,32 @@
+"""
+pytest requests_clients/tests/ratelimit.py -s
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.ratelimit import RateLimiter, RateLimitTimeout
+
+
+def test_rate_limiter():
+    """
+    pytest requests_clients/tests/ratelimit.py::test_rate_limiter -s
+    """
+    limiter = RateLimiter(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    # 桶里的令牌用完前不等待
+    assert time.monotonic() - start < 0.01
+    assert not limiter.try_acquire()
+
+    for _ in range(5):
+        limiter.acquire()
+    assert 0.08 < time.monotonic() - start < 0.2
+
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(tokens=5, timeout=0.01)
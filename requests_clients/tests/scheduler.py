@@ -0,0 +1,73 @@
+"""
+pytest requests_clients/tests/scheduler.py -s
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.getcwd())
+
+from requests_clients.scheduler import FairScheduler
+
+
+def test_fair_order():
+    """
+    pytest requests_clients/tests/scheduler.py::test_fair_order -s
+    """
+    scheduler = FairScheduler(max_workers=2)
+    finished = []
+
+    def task(key):
+        time.sleep(0.005)
+        finished.append(key)
+
+    futures = [scheduler.submit('noisy', task, 'noisy') for _ in range(100)]
+    futures += [scheduler.submit('quiet', task, 'quiet') for _ in range(3)]
+    for future in futures:
+        future.result()
+    # quiet 的任务不用排在 noisy 的 100 个任务后面
+    assert max(index for index, key in enumerate(finished) if key == 'quiet') < 10
+    assert scheduler.stats() == {'keys': 0, 'queued': 0, 'inflight': 0, 'threads': 2}
+    scheduler.close()
+
+
+def test_per_key_limit():
+    """
+    pytest requests_clients/tests/scheduler.py::test_per_key_limit -s
+    """
+    scheduler = FairScheduler(max_workers=8, per_key_limit=2)
+    lock = threading.Lock()
+    running = {'a': 0, 'b': 0}
+    peak = {'a': 0, 'b': 0}
+
+    def task(key):
+        with lock:
+            running[key] += 1
+            peak[key] = max(peak[key], running[key])
+        time.sleep(0.005)
+        with lock:
+            running[key] -= 1
+
+    futures = [scheduler.submit(key, task, key) for _ in range(20) for key in 'ab']
+    for future in futures:
+        future.result()
+    assert peak == {'a': 2, 'b': 2}
+    scheduler.close()
+
+
+def test_context_and_errors():
+    """
+    pytest requests_clients/tests/scheduler.py::test_context_and_errors -s
+    """
+    var = contextvars.ContextVar('var', default=None)
+    scheduler = FairScheduler(max_workers=1)
+    var.set('value')
+    assert scheduler.submit('a', var.get).result() == 'value'
+    future = scheduler.submit('a', lambda: 1 / 0)
+    assert isinstance(future.exception(), ZeroDivisionError)
+    # 关闭前提交的任务会执行完
+    futures = [scheduler.submit('a', time.sleep, 0.001) for _ in range(5)]
+    scheduler.close()
+    assert all(future.done() for future in futures)
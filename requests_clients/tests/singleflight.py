@@ -0,0 +1,136 @@
+"""
+pytest requests_clients/tests/singleflight.py -s
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import Faults, MockApp
+from requests_clients.singleflight import SingleFlight
+from weixin_client.client import WeiXinClient
+
+TOKEN = 'MOCK_TOKEN'
+
+
+def run_together(n, func):
+    barrier = threading.Barrier(n)
+
+    def call(_):
+        barrier.wait()
+        return func()
+
+    with ThreadPoolExecutor(n) as executor:
+        return list(executor.map(call, range(n)))
+
+
+def test_do():
+    """
+    pytest requests_clients/tests/singleflight.py::test_do -s
+    """
+    flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(1)
+        time.sleep(0.1)
+        return object()
+
+    results = run_together(8, lambda: flight.do('key', func))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {'calls': 8, 'shared': 7, 'inflight': 0}
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError('upstream error')
+
+    errors = run_together(4, lambda: pytest.raises(ValueError, flight.do, 'key', fail))
+    assert len(errors) == 4
+    # 结束后不再共享
+    assert flight.do('key', lambda: 'again') == 'again'
+
+
+def test_stream_fan_out():
+    """
+    pytest requests_clients/tests/singleflight.py::test_stream_fan_out -s
+    """
+    flight = SingleFlight()
+    opened = []
+    chunks = [bytes([i]) * 1024 for i in range(20)]
+
+    def open_stream():
+        opened.append(1)
+        for chunk in chunks:
+            time.sleep(0.005)
+            yield chunk
+
+    results = run_together(5, lambda: b''.join(flight.stream('key', open_stream)))
+    assert len(opened) == 1
+    assert all(result == b''.join(chunks) for result in results)
+    assert flight.stats()['inflight'] == 0
+
+
+def test_stream_memory_and_early_exit():
+    """
+    pytest requests_clients/tests/singleflight.py::test_stream_memory_and_early_exit -s
+    """
+    flight = SingleFlight()
+    closed = []
+
+    def open_stream():
+        try:
+            for i in range(100):
+                yield bytes([i]) * 1024
+        finally:
+            closed.append(1)
+
+    # 只有一个读者时读过的块立即丢弃
+    reader = flight.stream('key', open_stream)
+    for _ in reader:
+        assert len(reader.broadcast.chunks) <= 1
+    assert closed == [1] and flight.stats()['inflight'] == 0
+
+    # 所有读者提前退出时关闭上游并移除 key
+    first, second = flight.stream('key', open_stream), flight.stream('key', open_stream)
+    next(first), next(second), next(first)
+    first.close()
+    second.close()
+    assert closed == [1, 1] and flight.stats()['inflight'] == 0
+
+    # 已经丢弃过块的下载不再接纳新读者
+    first = flight.stream('key', open_stream)
+    next(first), next(first)
+    assert b''.join(flight.stream('key', open_stream)) == b''.join(bytes([i]) * 1024 for i in range(100))
+    del first
+    assert flight.stats()['inflight'] == 0
+
+
+def test_client():
+    """
+    pytest requests_clients/tests/singleflight.py::test_client -s
+    """
+    faults = Faults()
+    faults.add('/cgi-bin/material/get_materialcount', latency=0.1)
+    faults.add('/cgi-bin/material/get_material', latency=0.1)
+    app = MockApp(faults=faults)
+    client = WeiXinClient(session=mock_session(app), singleflight=SingleFlight())
+    payload = os.urandom(256 * 1024)
+    media_id = client.add_material_by_content(TOKEN, 'image', payload, 'title', 'intro')['media_id']
+    start_count = app.request_count
+
+    counts = run_together(8, lambda: client.get_material_count(TOKEN))
+    assert all(count == counts[0] for count in counts)
+    assert app.request_count == start_count + 1
+
+    contents = run_together(4, lambda: b''.join(client.iter_material(TOKEN, media_id, chunk_size=16 * 1024)))
+    assert all(content == payload for content in contents)
+    assert app.request_count == start_count + 2
+    # 写接口不合并
+    assert WeiXinClient.SINGLEFLIGHT_PATHS.isdisjoint(WeiXinClient.CACHE_INVALIDATIONS)
@@ -0,0 +1,252 @@
+"""
+素材、草稿、已发布文章的 NDJSON 导出 / 导入
+
+每页返回后立即写出，一行一个条目，读回时逐行解析，内存占用只和一页有关：
+
+    export_archive(wx_client, token, 'drafts', 'drafts.ndjson.gz')
+    for result in import_drafts(wx_client, other_token, 'drafts.ndjson.gz', thumb_map=thumb_map):
+        print(result['source'], '->', result['media_id'])
+
+1. 文件名以 .gz 结尾时用 gzip 压缩，以 .zst 结尾时用 zstd 压缩（需要安装 zstandard）
+2. 文章正文（content）不小于 blob_threshold 时存到 blob 目录（默认 <文件名>.blobs/），条目里只保留
+   content_blob（md5）和 content_size，只看标题、作者等元数据时不用解析正文；相同的正文只存一份
+3. 导出图片、语音、缩略图素材时 download=True 会把文件内容流式下载到 blob 目录（条目里是 blob 和 size），
+   import_materials 上传时直接打开 blob 文件发送，不读进内存。视频素材的接口只返回 down_url 而且上传需要标题，
+   不支持下载
+
+iter_archive(path, load_content=False) 只读元数据，正文保持引用。
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from typing import IO, Dict, Iterable, Iterator, Optional, Tuple
+
+# 导出类型 -> (列表接口, 条目 id 字段)
+EXPORTS = {
+    'materials': ('get_material_list', 'media_id'),
+    'drafts': ('get_draft_list', 'media_id'),
+    'published': ('get_success_publish_list', 'article_id'),
+}
+# 重新导入时 add_draft 接受的文章字段
+ARTICLE_FIELDS = ('title', 'author', 'digest', 'content', 'content_source_url', 'thumb_media_id',
+                  'need_open_comment', 'only_fans_can_comment')
+PAGE_SIZE = 20
+DEFAULT_BLOB_THRESHOLD = 4096
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+# get_material 直接返回文件内容的素材类型，视频返回的是包含 down_url 的 JSON
+DOWNLOAD_TYPES = frozenset({'image', 'voice', 'thumb'})
+
+
+def open_ndjson(path: str, mode: str = 'r') -> IO[str]:
+    """按扩展名选择压缩方式，以文本方式打开"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('读写 .zst 文件需要安装 zstandard') from None
+        return zstandard.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def default_blob_dir(path: str) -> str:
+    """drafts.ndjson.gz -> drafts.blobs"""
+    base = path
+    for suffix in COMPRESSED_SUFFIXES:
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    return os.path.splitext(base)[0] + '.blobs'
+
+
+class BlobStore:
+    """按内容 md5 存放文件，<目录>/<md5 前两位>/<md5>"""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data: bytes) -> str:
+        return self.put_chunks([data])[0]
+
+    def put_chunks(self, chunks: Iterable[bytes]) -> Tuple[str, int]:
+        """边写临时文件边计算 md5，写完再改名，返回 (md5, 字节数)；内容已经存在时丢弃临时文件"""
+        os.makedirs(self.root, exist_ok=True)
+        md5, size = hashlib.md5(), 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                for chunk in chunks:
+                    md5.update(chunk)
+                    fp.write(chunk)
+                    size += len(chunk)
+            digest = md5.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest, size
+
+    def open(self, digest: str) -> IO[bytes]:
+        return open(self.path(digest), 'rb')
+
+    def read_text(self, digest: str) -> str:
+        with self.open(digest) as fp:
+            return fp.read().decode('utf-8')
+
+
+class ArchiveWriter:
+    """逐条写出，较大的正文存到 BlobStore
+
+    :param path: 输出文件，扩展名决定压缩方式
+    :param blob_dir: blob 目录，默认为 <文件名>.blobs
+    :param blob_threshold: 正文 UTF-8 字节数不小于这个值时存到 blob，为 None 时全部内联
+    """
+
+    def __init__(self, path: str, blob_dir: Optional[str] = None,
+                 blob_threshold: Optional[int] = DEFAULT_BLOB_THRESHOLD) -> None:
+        self.path = path
+        self.blobs = BlobStore(blob_dir or default_blob_dir(path))
+        self.blob_threshold = blob_threshold
+        self.count = 0
+        self._fp = open_ndjson(path, 'w')
+
+    def detach_content(self, item: Dict) -> Dict:
+        """返回正文换成 blob 引用后的条目，不修改传入的 item"""
+        news_items = (item.get('content') or {}).get('news_item')
+        if self.blob_threshold is None or not news_items:
+            return item
+        detached = []
+        for news in news_items:
+            content = news.get('content')
+            if isinstance(content, str):
+                data = content.encode('utf-8')
+                if len(data) >= self.blob_threshold:
+                    news = {key: value for key, value in news.items() if key != 'content'}
+                    news['content_blob'], news['content_size'] = self.blobs.put(data), len(data)
+            detached.append(news)
+        return dict(item, content=dict(item['content'], news_item=detached))
+
+    def write(self, item: Dict) -> None:
+        self._fp.write(json.dumps(self.detach_content(item), ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def write_many(self, items: Iterable[Dict]) -> None:
+        for item in items:
+            self.write(item)
+        self._fp.flush()
+
+    def close(self) -> None:
+        self._fp.close()
+
+    def __enter__(self) -> 'ArchiveWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def iter_archive(path: str, blob_dir: Optional[str] = None, load_content: bool = True) -> Iterator[Dict]:
+    """逐行读回导出的条目
+
+    :param load_content: 为 False 时正文保持 content_blob 引用，只读元数据
+    """
+    blobs = BlobStore(blob_dir or default_blob_dir(path))
+    with open_ndjson(path) as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if load_content:
+                for news in (item.get('content') or {}).get('news_item') or ():
+                    digest = news.pop('content_blob', None)
+                    if digest is not None:
+                        news.pop('content_size', None)
+                        news['content'] = blobs.read_text(digest)
+            yield item
+
+
+def iter_pages(client, access_token: str, kind: str, page_size: int = PAGE_SIZE, **options) -> Iterator[Dict]:
+    """按 offset 翻页，逐页返回接口的结果"""
+    method = getattr(client, EXPORTS[kind][0])
+    offset = 0
+    while True:
+        resp_json = method(access_token, offset=offset, count=page_size, **options)
+        yield resp_json
+        items = resp_json.get('item') or []
+        offset += len(items)
+        if not items or offset >= resp_json.get('total_count', 0):
+            return
+
+
+def export_archive(client, access_token: str, kind: str, path: str, blob_dir: Optional[str] = None,
+                   no_content: bool = False, type: str = 'news', download: bool = False,
+                   blob_threshold: Optional[int] = DEFAULT_BLOB_THRESHOLD, page_size: int = PAGE_SIZE) -> int:
+    """导出 kind（materials / drafts / published）的全部条目，返回条目数
+
+    :param type: 导出素材时的素材类型
+    :param download: 导出图片、语音、缩略图素材时同时下载文件内容到 blob 目录
+    """
+    if download and kind == 'materials' and type not in DOWNLOAD_TYPES:
+        raise ValueError(f'只能下载 {"/".join(sorted(DOWNLOAD_TYPES))} 素材，不支持 {type}')
+    options = {'type': type} if kind == 'materials' else {'no_content': int(no_content)}
+    with ArchiveWriter(path, blob_dir, blob_threshold) as writer:
+        for resp_json in iter_pages(client, access_token, kind, page_size, **options):
+            items = resp_json.get('item') or []
+            if download and kind == 'materials':
+                items = [dict(item, **download_blob(client, access_token, item['media_id'], writer.blobs))
+                         for item in items]
+            writer.write_many(items)
+        return writer.count
+
+
+def download_blob(client, access_token: str, media_id: str, blobs: BlobStore) -> Dict:
+    digest, size = blobs.put_chunks(client.iter_material(access_token, media_id))
+    return {'blob': digest, 'size': size}
+
+
+def draft_articles(item: Dict, thumb_map: Optional[Dict[str, str]] = None) -> list:
+    """把导出的草稿 / 已发布文章转换成 add_draft 的 articles，thumb_map 替换封面的 media_id"""
+    articles = []
+    for news in item['content']['news_item']:
+        article = {key: news[key] for key in ARTICLE_FIELDS if key in news}
+        if thumb_map and article.get('thumb_media_id') in thumb_map:
+            article['thumb_media_id'] = thumb_map[article['thumb_media_id']]
+        articles.append(article)
+    return articles
+
+
+def import_drafts(client, access_token: str, path: str, blob_dir: Optional[str] = None,
+                  thumb_map: Optional[Dict[str, str]] = None) -> Iterator[Dict]:
+    """把导出的草稿或已发布文章逐条新建为草稿，返回 {'source': 原 id, 'media_id': 新草稿 id}
+
+    :param thumb_map: 原封面 media_id -> 新 media_id，导入到其他公众号时用 import_materials 的结果生成
+    """
+    for item in iter_archive(path, blob_dir):
+        source = item.get('media_id') or item.get('article_id')
+        resp_json = client.add_draft(access_token, draft_articles(item, thumb_map))
+        yield {'source': source, 'media_id': resp_json['media_id']}
+
+
+def import_materials(client, access_token: str, path: str, type: str, blob_dir: Optional[str] = None) -> Iterator[Dict]:
+    """上传用 download=True 导出的素材，返回 {'source', 'media_id', 'url'}；没有下载内容的条目跳过"""
+    if type not in DOWNLOAD_TYPES:
+        raise ValueError(f'只能导入 {"/".join(sorted(DOWNLOAD_TYPES))} 素材，不支持 {type}')
+    blobs = BlobStore(blob_dir or default_blob_dir(path))
+    for item in iter_archive(path, blob_dir, load_content=False):
+        if 'blob' not in item:
+            continue
+        with blobs.open(item['blob']) as fp:
+            resp_json = client.add_material_by_content(access_token, type, (item.get('name') or item['blob'], fp),
+                                                       '', '')
+        yield {'source': item['media_id'], 'media_id': resp_json['media_id'], 'url': resp_json.get('url')}
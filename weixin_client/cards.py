@@ -0,0 +1,230 @@
+"""
+卡券批量操作
+
+1. RedemptionQueue：并发核销 code。同一个幂等 key 只会核销一次，请求超时等结果未知时先用 get_card_code 确认，
+   已经核销成功就不再重试，不会重复核销
+2. sync_cards：batchget_card 翻页拿到全部 card_id，再并发 get_card，构建本地卡券索引
+
+    queue = RedemptionQueue(wx_client, token, max_workers=16)
+    results = queue.consume_all(codes)
+    [r for r in results if r.status != CONSUMED]
+
+    index = sync_cards(wx_client, token)
+    index.by_status('CARD_STATUS_VERIFY_OK')
+"""
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import requests
+
+from requests_clients.deadline import DeadlineExceeded
+from requests_clients.ratelimit import RateLimiter
+from weixin_client import result_code
+from weixin_client.errors import WeiXinClientError
+
+PENDING = 'pending'
+CONSUMED = 'consumed'
+FAILED = 'failed'
+# 重试次数用完时仍然无法确认是否核销成功，需要人工核对
+UNKNOWN = 'unknown'
+
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_KEYS = 100000
+BATCHGET_PAGE_SIZE = 50
+
+# 请求可能已经到达微信，结果未知
+AMBIGUOUS_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError, DeadlineExceeded)
+
+CodeItem = Union[str, Tuple[str, Optional[str]]]
+
+
+@dataclass(slots=True)
+class Redemption:
+    key: str
+    code: str
+    card_id: Optional[str] = None
+    status: str = PENDING
+    openid: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+class RedemptionQueue:
+    """
+    :param rate: 每秒最多核销请求数，为空时不限速
+    :param retries: 结果未知（超时、连接断开）时最多重试的次数
+    :param max_keys: 最多保留多少个已完成的 key 用于去重，超过时淘汰最早完成的
+    """
+
+    def __init__(self, client, access_token: str, max_workers: int = DEFAULT_WORKERS, rate: Optional[float] = None,
+                 retries: int = 2, max_keys: int = DEFAULT_MAX_KEYS) -> None:
+        self.client = client
+        self.access_token = access_token
+        self.max_workers = max_workers
+        self.retries = retries
+        self.max_keys = max_keys
+        self.limiter = RateLimiter(rate, burst=max_workers) if rate else None
+        self._pending: Dict[str, Future] = {}
+        self._finished: 'OrderedDict[str, Future]' = OrderedDict()
+        self._counts: Dict[str, int] = {'submitted': 0}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='redeem')
+
+    def submit(self, code: str, card_id: Optional[str] = None, key: Optional[str] = None) -> Future:
+        """提交核销，返回 Future[Redemption]；key 默认为 card_id:code，相同 key 返回同一个 Future"""
+        key = key or f'{card_id or ""}:{code}'
+        with self._lock:
+            future = self._pending.get(key) or self._finished.get(key)
+            if future is None:
+                redemption = Redemption(key=key, code=code, card_id=card_id)
+                future = self._pending[key] = self._executor.submit(self._run, redemption)
+                self._counts['submitted'] += 1
+        return future
+
+    def _run(self, redemption: Redemption) -> Redemption:
+        try:
+            return self.redeem(redemption)
+        finally:
+            with self._lock:
+                self._finished[redemption.key] = self._pending.pop(redemption.key)
+                self._counts[redemption.status] = self._counts.get(redemption.status, 0) + 1
+                while len(self._finished) > self.max_keys:
+                    self._finished.popitem(last=False)
+
+    def consume_all(self, items: Iterable[CodeItem]) -> List[Redemption]:
+        """核销全部 code（code 或 (code, card_id)），在途的任务数有上限，按提交顺序返回结果"""
+        results = []
+        pending = deque()
+        for item in items:
+            code, card_id = (item, None) if isinstance(item, str) else item
+            pending.append(self.submit(code, card_id))
+            if len(pending) >= self.max_workers * 4:
+                results.append(pending.popleft().result())
+        results.extend(future.result() for future in pending)
+        return results
+
+    def redeem(self, redemption: Redemption) -> Redemption:
+        ambiguous = False
+        while True:
+            redemption.attempts += 1
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                resp_json = self.client.consume_card(self.access_token, redemption.code, card_id=redemption.card_id)
+            except WeiXinClientError as err:
+                if ambiguous and err.errcode == result_code.CODE_CONSUMED:
+                    # 之前结果未知的那次请求其实已经核销成功
+                    redemption.status = CONSUMED
+                    return redemption
+                redemption.status, redemption.error = FAILED, str(err)
+                return redemption
+            except AMBIGUOUS_ERRORS as err:
+                ambiguous = True
+                redemption.error = repr(err)
+                if self.confirm_consumed(redemption):
+                    return redemption
+                if redemption.attempts > self.retries:
+                    redemption.status = UNKNOWN
+                    return redemption
+                continue
+            except Exception as err:
+                # 熔断、等待并发名额超时等，请求没有发出，只记为这一条失败，不影响其他 code
+                redemption.status = UNKNOWN if ambiguous else FAILED
+                redemption.error = repr(err)
+                return redemption
+            redemption.status, redemption.error = CONSUMED, None
+            redemption.openid = resp_json.get('openid')
+            return redemption
+
+    def confirm_consumed(self, redemption: Redemption) -> bool:
+        """查询 code 状态，已经核销时更新 redemption 并返回 True，查询失败也返回 False"""
+        try:
+            resp_json = self.client.get_card_code(self.access_token, redemption.code, card_id=redemption.card_id,
+                                                  check_consume=False)
+        except Exception:
+            return False
+        if resp_json.get('user_card_status') != 'CONSUMED':
+            return False
+        redemption.status, redemption.error = CONSUMED, None
+        redemption.openid = resp_json.get('openid')
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts, **{PENDING: len(self._pending)})
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+@dataclass(slots=True)
+class CardInfo:
+    card_id: str
+    card_type: str
+    title: str
+    status: str
+    quantity: int = 0
+    total_quantity: int = 0
+
+    @classmethod
+    def from_card(cls, card: Dict) -> 'CardInfo':
+        card_type = card.get('card_type', '')
+        base_info = card.get(card_type.lower(), {}).get('base_info', {})
+        sku = base_info.get('sku', {})
+        return cls(
+            card_id=base_info.get('id', ''),
+            card_type=card_type,
+            title=base_info.get('title', ''),
+            status=base_info.get('status', ''),
+            quantity=sku.get('quantity', 0),
+            total_quantity=sku.get('total_quantity', 0),
+        )
+
+
+class CardIndex:
+
+    def __init__(self) -> None:
+        self.cards: Dict[str, CardInfo] = {}
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __contains__(self, card_id: str) -> bool:
+        return card_id in self.cards
+
+    def get(self, card_id: str) -> Optional[CardInfo]:
+        return self.cards.get(card_id)
+
+    def by_status(self, status: str) -> List[CardInfo]:
+        return [card for card in self.cards.values() if card.status == status]
+
+
+def iter_card_ids(client, access_token: str, status_list: Optional[List[str]] = None,
+                  page_size: int = BATCHGET_PAGE_SIZE) -> Iterable[str]:
+    offset = 0
+    while True:
+        resp_json = client.batchget_card(access_token, offset=offset, count=page_size, status_list=status_list)
+        card_ids = resp_json.get('card_id_list', [])
+        yield from card_ids
+        offset += len(card_ids)
+        if not card_ids or offset >= resp_json.get('total_num', 0):
+            return
+
+
+def sync_cards(client, access_token: str, index: Optional[CardIndex] = None, status_list: Optional[List[str]] = None,
+               max_workers: int = 8) -> CardIndex:
+    """拉取全部卡券详情更新到 index（为空时新建），不再出现在列表里的卡券会被移除"""
+    if index is None:
+        index = CardIndex()
+    card_ids = list(iter_card_ids(client, access_token, status_list=status_list))
+
+    def fetch(card_id: str) -> CardInfo:
+        return CardInfo.from_card(client.get_card(access_token, card_id)['card'])
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        cards = {card.card_id: card for card in executor.map(fetch, card_ids)}
+    index.cards = cards
+    return index
@@ -1,39 +1,273 @@
 import json
+import re
+import time
 from json import dumps as json_dumps
 from typing import Dict, List, Optional
-from urllib3.util import Retry
+from urllib.parse import urlsplit
 from requests import Request, Session
 import requests
+from requests_clients.deadline import current_deadline, endpoint_timeout
 from weixin_client.utils import pretty_print_POST
+from weixin_client.prepared import RequestTemplate
+from weixin_client.schemas import MAX_ARTICLES_PER_DRAFT, build_drafts
 
 from weixin_client.errors import WeiXinClientError
 from weixin_client import result_code
-# from weixin_client.errors import result_code_mapping
+from weixin_client.errors import result_code_mapping
 
+ERRCODE_RE = re.compile(rb'"errcode"\s*:\s*(-?\d+)')
 
-class WeiXinClient:
 
-    def __init__(self, timeout=10) -> None:
-        self.timeout: int = timeout
+def response_errcode(resp) -> Optional[int]:
+    """从响应开头取出 errcode，不解析整个 JSON，没有时返回 None"""
+    content_type = resp.headers.get('Content-Type', '')
+    if 'json' not in content_type and not content_type.startswith('text/'):
+        return None
+    match = ERRCODE_RE.search(resp.content[:128])
+    return None if match is None else int(match.group(1))
+
 
-    def do_request(self, method, url, params=None, json=None, headers=None, files=None):
-        req = Request(method=method, url=url, params=params, json=json, headers=headers, files=files)
+class WeiXinClient:
+
+    # 幂等的读接口，配置了 hedger 时可以对冲，写接口不能加入
+    HEDGE_PATHS = frozenset({
+        '/cgi-bin/material/get_materialcount',
+        '/cgi-bin/draft/count',
+        '/cgi-bin/draft/get',
+        '/cgi-bin/freepublish/get',
+        '/cgi-bin/freepublish/getarticle',
+    })
+
+    # 配置了 singleflight 时合并相同并发请求的读接口
+    SINGLEFLIGHT_PATHS = HEDGE_PATHS | {
+        '/cgi-bin/material/get_material',
+        '/wxaapi/newtmpl/getcategory',
+        '/cgi-bin/ticket/getticket',
+    }
+
+    # 配置了 cache 时缓存的读接口和缓存秒数
+    # getticket 不缓存：缓存的响应里 expires_in 不会减少，JsapiSigner 会把过期的 ticket 当成有效
+    CACHE_TTLS = {
+        '/wxaapi/newtmpl/getcategory': 3600,
+        '/cgi-bin/material/get_materialcount': 60,
+        '/cgi-bin/draft/count': 60,
+        '/cgi-bin/draft/get': 60,
+        '/cgi-bin/freepublish/getarticle': 300,
+        '/card/get': 300,
+    }
+    # 写接口 -> 调用后需要清空的读接口
+    CACHE_INVALIDATIONS = {
+        '/cgi-bin/material/add_material': ('/cgi-bin/material/get_materialcount',),
+        '/cgi-bin/material/del_material': ('/cgi-bin/material/get_materialcount',),
+        '/cgi-bin/draft/add': ('/cgi-bin/draft/count',),
+        '/cgi-bin/draft/update': ('/cgi-bin/draft/get',),
+        '/cgi-bin/draft/delete': ('/cgi-bin/draft/count', '/cgi-bin/draft/get'),
+        '/cgi-bin/freepublish/submit': ('/cgi-bin/draft/count', '/cgi-bin/draft/get'),
+        '/cgi-bin/freepublish/delete': ('/cgi-bin/freepublish/getarticle',),
+        '/card/update': ('/card/get',),
+        '/card/delete': ('/card/get',),
+    }
+
+    # 上传类接口传输时间长，单独放宽读超时，(connect, read)
+    DEFAULT_TIMEOUTS = {
+        '/cgi-bin/material/add_material': (5, 120),
+        '/cgi-bin/media/uploadimg': (5, 60),
+    }
+
+    def __init__(self, timeout=10, session: Optional[Session] = None, limiter=None, breaker=None,
+                 timeouts: Optional[Dict] = None, retries=0, retry_backoff=0.2, hedger=None,
+                 cache=None, singleflight=None) -> None:
+        """
+        :param timeout: 默认超时，可以是秒数或 (connect, read) 元组
+        :param timeouts: 按接口路径覆盖超时，如 ``{'/cgi-bin/message/mass/get': (3, 5)}``
+        :param retries: 连接失败时的重试次数，POST 只在连接超时（请求未发出）时重试
+        :param session: 自定义的 requests.Session，可挂载 adapter（如本地桩服务），为空时第一次请求时新建，之后复用连接
+        :param limiter: 并发限制器（如 requests_clients.limiter.AdaptiveLimiter），按接口分别限制在途请求数
+        :param breaker: 熔断器（requests_clients.breaker.CircuitBreaker），上游不可用时快速失败
+        :param hedger: 对冲（requests_clients.hedging.Hedger），只作用于 HEDGE_PATHS 中的读接口
+        :param cache: 响应缓存（requests_clients.cache.ResponseCache），一般用 WeiXinClient.make_cache() 创建
+        :param singleflight: 相同请求合并（requests_clients.singleflight.SingleFlight），只作用于 SINGLEFLIGHT_PATHS
+        """
+        self.timeout = timeout
+        self.timeouts: Dict = {**self.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.session: Optional[Session] = session
+        self._default_session: Optional[Session] = None
+        self.limiter = limiter
+        self.breaker = breaker
+        self.hedger = hedger
+        self.cache = cache
+        self.singleflight = singleflight
+        # (method, url, 是否 JSON) -> RequestTemplate
+        self._templates: Dict = {}
+
+    def prepare_request(self, method, url, params=None, json=None, headers=None, files=None):
+        if headers is None and files is None:
+            return self.prepare_from_template(method, url, params=params, json=json)
+
+        if files is not None:
+            from requests_clients.multipart import MultipartBody
+            # 文件内容直接交给 socket，不像 requests 的 files= 那样编码成新的 bytes
+            body = MultipartBody(files)
+            prepared = Request(method=method, url=url, params=params, headers=headers, data=body).prepare()
+            prepared.headers['Content-Type'] = body.content_type
+            return prepared
+
+        req = Request(method=method, url=url, params=params, json=json, headers=headers)
         prepared = req.prepare()
 
         if json:
             prepared.body = json_dumps(json, ensure_ascii=False, allow_nan=False).encode('utf-8')
             prepared.prepare_content_length(prepared.body)
+        return prepared
+
+    def prepare_from_template(self, method, url, params=None, json=None):
+        """没有自定义 headers 和文件的请求走模板缓存，结果与 Request.prepare() 一致"""
+        key = (method, url, json is not None)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._templates[key] = RequestTemplate(method, url, json=json is not None)
+        body = None
+        if json is not None:
+            body = json_dumps(json, ensure_ascii=False, allow_nan=False).encode('utf-8')
+        return template.build(params, body)
+
+    @classmethod
+    def make_cache(cls, maxsize=1024, stale_ttl=0.0):
+        """按 CACHE_TTLS 和 CACHE_INVALIDATIONS 创建响应缓存"""
+        from requests_clients.cache import ResponseCache
+        return ResponseCache(cls.CACHE_TTLS, maxsize=maxsize, stale_ttl=stale_ttl,
+                             invalidations=cls.CACHE_INVALIDATIONS)
+
+    def do_request(self, method, url, params=None, json=None, headers=None, files=None, stream=False):
+        if self.cache is None:
+            return self.perform_request(method, url, params=params, json=json, headers=headers, files=files,
+                                        stream=stream)
+
+        key = None if files is not None or stream else self.cache.key(method, url, params, json)
+        if key is None:
+            try:
+                return self.perform_request(method, url, params=params, json=json, headers=headers, files=files,
+                                            stream=stream)
+            finally:
+                self.cache.invalidate_for(url)
+        return self.cache.fetch(
+            key,
+            lambda: self.perform_request(method, url, params=params, json=json, headers=headers),
+            self.is_cacheable,
+        )
+
+    def is_cacheable(self, resp) -> bool:
+        """只缓存成功的响应"""
+        return resp.status_code == 200 and response_errcode(resp) in (None, 0)
+
+    def perform_request(self, method, url, params=None, json=None, headers=None, files=None, stream=False):
+        prepared = self.prepare_request(method, url, params=params, json=json, headers=headers, files=files)
         # pretty_print_POST(prepared)
-
+        if self.singleflight is None or stream or urlsplit(url).path not in self.SINGLEFLIGHT_PATHS:
+            return self.send_with_retries(method, url, prepared, stream)
+        key = (prepared.method, prepared.url, prepared.body)
+        return self.singleflight.do(key, lambda: self.send_with_retries(method, url, prepared))
+
+    def send_with_retries(self, method, url, prepared, stream=False):
+        timeout = endpoint_timeout(url, self.timeouts, self.timeout)
+        hedge_key = None if stream else self.hedge_key(url)
+
+        attempt = 0
+        while True:
+            try:
+                if hedge_key is None:
+                    return self.request_once(url, prepared, timeout, stream)
+                return self.hedger.run(hedge_key, lambda: self.request_once(url, prepared, timeout))
+            except requests.exceptions.ConnectionError as err:
+                if attempt >= self.retries or not self.should_retry(method, err):
+                    raise
+            attempt += 1
+            delay = self.retry_backoff * 2 ** (attempt - 1)
+            deadline = current_deadline()
+            if deadline is not None:
+                delay = min(delay, deadline.check())
+            time.sleep(delay)
+
+    def should_retry(self, method, err) -> bool:
+        """连接超时说明请求没有发出，任何方法都可以重试；其他连接错误只重试 GET"""
+        return isinstance(err, requests.exceptions.ConnectTimeout) or method.lower() == 'get'
+
+    def hedge_key(self, url) -> Optional[str]:
+        """可以对冲时返回对冲统计用的 key（不含查询参数的 URL），否则返回 None"""
+        if self.hedger is None:
+            return None
+        key = url.split('?', 1)[0]
+        return key if urlsplit(key).path in self.HEDGE_PATHS else None
+
+    def request_once(self, url, prepared, timeout, stream=False):
+        """发送一次请求，超时会被当前截止时间裁剪"""
+        deadline = current_deadline()
+        if deadline is not None:
+            timeout = deadline.clip(timeout)
+
+        if self.limiter is None and self.breaker is None:
+            return self.send(prepared, timeout, stream)
+
+        if self.breaker is not None:
+            self.breaker.before(url)
+        if self.limiter is not None:
+            try:
+                self.limiter.acquire(url, None if deadline is None else deadline.check())
+            except BaseException:
+                # 请求没有发出，归还熔断器的探测名额
+                if self.breaker is not None:
+                    self.breaker.cancel(url)
+                raise
+        start = time.monotonic()
+        resp = None
         try:
-            s = Session()
+            resp = self.send(prepared, timeout, stream)
+            return resp
+        finally:
+            self.after_request(url, resp, time.monotonic() - start)
+
+    def after_request(self, url, resp, latency):
+        """把请求结果反馈给并发限制器和熔断器，resp 为 None 表示请求异常（超时、连接失败等）"""
+        errcode = None if resp is None else response_errcode(resp)
+        if self.limiter is not None:
+            self.limiter.release(url, latency, resp is None or errcode in result_code.OVERLOAD_CODES)
+        if self.breaker is not None:
+            failed = resp is None or resp.status_code >= 500 or errcode == result_code.SYSTEM_BUSY
+            self.breaker.record(url, not failed)
+
+    def default_session(self) -> Session:
+        """没有传入 session 时用的 Session，延迟到第一次请求创建；并发创建时多建一个也没关系"""
+        if self._default_session is None:
+            self._default_session = Session()
+        return self._default_session
+
+    def send(self, prepared, timeout=None, stream=False):
+        try:
+            s = self.session or self.default_session()
             # s.mount('http://', HTTPAdapter(max_retries=self.retries))
-            return s.send(prepared, timeout=self.timeout)
+            return s.send(prepared, timeout=self.timeout if timeout is None else timeout, stream=stream)
         except requests.exceptions.ReadTimeout as err:
             raise
         except requests.exceptions.ConnectionError as err:
             raise
 
+    def stats(self) -> Dict:
+        """运行状态，便于接入监控"""
+        stats = {}
+        if self.limiter is not None:
+            stats['limiter'] = self.limiter.stats()
+        if self.breaker is not None:
+            stats['breaker'] = self.breaker.stats()
+        if self.hedger is not None:
+            stats['hedger'] = self.hedger.stats()
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        if self.singleflight is not None:
+            stats['singleflight'] = self.singleflight.stats()
+        return stats
+
     def do_get(self, url, params=None, headers=None):
         return self.do_request('get', url, params=params, headers=headers)
 
@@ -56,7 +290,8 @@ class WeiXinClient:
             return
 
         if errcode != 0:
-            raise WeiXinClientError(errcode, errmsg)
+            error_class = result_code_mapping.get(errcode, WeiXinClientError)
+            raise error_class(errcode, errmsg)
 
     def get_access_token(self, appid: str, appsecret: str, grant_type='client_credential'):
         """获取access token"""
@@ -153,7 +388,10 @@ class WeiXinClient:
         # return resp.json()
 
     def get_user_list(self, access_token, next_openid=None):
-        pass
+        """获取关注者列表，一次最多 10000 个 openid，用 next_openid 翻页
+
+        完整导出见 weixin_client.followers
+        """
         url = 'https://api.weixin.qq.com/cgi-bin/user/get'
         params = {
             'access_token': access_token,
@@ -164,6 +402,22 @@ class WeiXinClient:
         resp_json = self.handle_response(resp)
         return resp.json()
 
+    def batchget_user_info(self, access_token, openids: List[str], lang='zh_CN'):
+        """批量获取用户基本信息，一次最多 100 个
+
+        ref: https://developers.weixin.qq.com/doc/offiaccount/User_Management/Get_users_basic_information_UnionID.html
+        """
+        url = 'https://api.weixin.qq.com/cgi-bin/user/info/batchget'
+        params = {
+            'access_token': access_token,
+        }
+        body = {
+            'user_list': [{'openid': openid, 'lang': lang} for openid in openids],
+        }
+        resp = self.do_post(url, params=params, json=body)
+        self.handle_response(resp)
+        return resp.json()
+
     def add_poi(self, access_token, json):
         """创建门店
 
@@ -199,13 +453,13 @@ class WeiXinClient:
         resp_json = self.handle_response(resp)
         return resp.json()
 
-    def set_card_testwhitelist(self, openid_list: List):
+    def set_card_testwhitelist(self, access_token, openid_list: List):
         """设置卡券测试白名单
 
         """
-        url = self.base_url + "/card/testwhitelist/set"
+        url = 'https://api.weixin.qq.com/card/testwhitelist/set'
         params = {
-            "access_token": self.token,
+            "access_token": access_token,
         }
         body = {'openid': []}
         for openid in openid_list:
@@ -214,34 +468,34 @@ class WeiXinClient:
         resp_json = self.handle_response(resp)
         return resp.json()
 
-    def get_card_code(self, code, card_id=None, check_consume=None):
+    def get_card_code(self, access_token, code, card_id=None, check_consume=None):
         """
         查询当前code是否可以被核销并检查code状态
 
         参考资料：https://developers.weixin.qq.com/doc/offiaccount/Cards_and_Offer/Managing_Coupons_Vouchers_and_Cards.html#0
         """
-        url = self.base_url + "/card/code/get"
+        url = 'https://api.weixin.qq.com/card/code/get'
         params = {
-            "access_token": self.token,
+            "access_token": access_token,
         }
         body = {
             'code': code,
         }
         if card_id:
             body['card_id'] = card_id
-        if check_consume:
+        if check_consume is not None:
             body['check_consume'] = check_consume
         resp = self.do_post(url, params=params, json=body)
         resp_json = self.handle_response(resp)
         return resp.json()
 
-    def get_card(self, card_id):
+    def get_card(self, access_token, card_id):
         """ 查看卡券详情
         :param card_id: 卡券ID
         """
-        url = self.base_url + "/card/get"
+        url = 'https://api.weixin.qq.com/card/get'
         params = {
-            "access_token": self.token,
+            "access_token": access_token,
         }
         body = {
             'card_id': card_id,
@@ -279,11 +533,11 @@ class WeiXinClient:
         resp_json = self.handle_response(resp)
         return resp.json()
 
-    def unavailable_card(self, card_id, code, reason=None):
+    def unavailable_card(self, access_token, card_id, code, reason=None):
         """设置卡券失效"""
-        url = self.base_url + "/card/code/unavailable"
+        url = 'https://api.weixin.qq.com/card/code/unavailable'
         params = {
-            "access_token": self.token,
+            "access_token": access_token,
         }
         body = {
             'card_id': card_id,
@@ -295,11 +549,14 @@ class WeiXinClient:
         resp_json = self.handle_response(resp)
         return resp.json()
 
-    def get_card_bizuininfo(self, begin_date, end_date, cond_source):
-        """拉取卡券概况数据"""
-        url = self.base_url + "/card/code/unavailable"
+    def get_card_bizuininfo(self, access_token, begin_date, end_date, cond_source):
+        """拉取卡券概况数据
+
+        参考资料：https://developers.weixin.qq.com/doc/offiaccount/Analytics/Card_Analysis.html
+        """
+        url = 'https://api.weixin.qq.com/datacube/getcardbizuininfo'
         params = {
-            "access_token": self.token,
+            "access_token": access_token,
         }
         body = {
             'begin_date': begin_date,
@@ -310,19 +567,20 @@ class WeiXinClient:
         resp_json = self.handle_response(resp)
         return resp.json()
 
-    def consume_card(self, code, card_id=None):
+    def consume_card(self, access_token, code, card_id=None):
         """线下核销卡券
 
         :params code: 需要核销的卡券code
         :params card_id: 需要核销的卡券id。卡券ID。创建卡券时use_custom_code填写true时必填。非自定义Code不必填写。
 
         消耗code接口是核销卡券的唯一接口,开发者可以调用当前接口将用户的优惠券进行核销，该过程不可逆。
+        批量核销、超时重试不重复核销见 weixin_client.cards.RedemptionQueue
 
         参考资料：https://developers.weixin.qq.com/doc/offiaccount/Cards_and_Offer/Redeeming_a_coupon_voucher_or_card.html#_1-2-%E6%A0%B8%E9%94%80Code%E6%8E%A5%E5%8F%A3
         """
-        url = self.base_url + "/card/code/consume"
+        url = 'https://api.weixin.qq.com/card/code/consume'
         params = {
-            "access_token": self.token,
+            "access_token": access_token,
         }
         body = {
             'code': code,
@@ -333,26 +591,26 @@ class WeiXinClient:
         resp_json = self.handle_response(resp)
         return resp.json()
 
-    def update_card(self, data):
+    def update_card(self, access_token, data):
         """更改卡券信息
         TODO
 
         参考资料：https://developers.weixin.qq.com/doc/offiaccount/Cards_and_Offer/Managing_Coupons_Vouchers_and_Cards.html#4
         """
-        url = self.base_url + "/card/update"
+        url = 'https://api.weixin.qq.com/card/update'
         params = {
-            "access_token": self.token,
+            "access_token": access_token,
         }
         body = data
         resp = self.do_post(url, params=params, json=body)
         resp_json = self.handle_response(resp)
         return resp.json()
 
-    def delete_card(self, card_id):
+    def delete_card(self, access_token, card_id):
         """删除卡券"""
-        url = self.base_url + "/card/delete"
+        url = 'https://api.weixin.qq.com/card/delete'
         params = {
-            "access_token": self.token,
+            "access_token": access_token,
         }
         body = {'card_id': card_id}
         resp = self.do_post(url, params=params, json=body)
@@ -447,6 +705,9 @@ class WeiXinClient:
     def upload_img_content(self, access_token, content):
         """上传图文消息内的图片获取URL
 
+        :param content: 图片内容，也可以是 (文件名, 图片内容)；可以是 bytes、memoryview、mmap、文件对象或文件描述符，
+            直接发送，不会复制成新的请求体（见 requests_clients.multipart）
+
         return:
 
         {
@@ -501,6 +762,7 @@ class WeiXinClient:
         """新增其他类型永久素材
 
         :param type: 媒体文件类型，分别有图片（image）、语音（voice）、视频（video）和缩略图（thumb）
+        :param content: 素材内容，类型同 upload_img_content
         :param title: 视频素材的标题
         :param intro: 视频素材的描述
 
@@ -575,6 +837,40 @@ class WeiXinClient:
         return resp
         # return resp.content
 
+    def iter_material(self, access_token, media_id, chunk_size=64 * 1024):
+        """流式下载永久素材，按块返回内容，不把整个文件读进内存
+
+        图文、视频素材返回的是 JSON，整体作为一块返回。
+        配置了 singleflight 时，同时下载同一个素材的调用共享一次上游请求。
+        """
+        url = 'https://api.weixin.qq.com/cgi-bin/material/get_material'
+        params = {
+            "access_token": access_token,
+        }
+        body = {
+            'media_id': media_id,
+        }
+
+        def open_stream():
+            resp = self.do_request('post', url, params=params, json=body, stream=True)
+            if 'json' in resp.headers.get('Content-Type', ''):
+                self.handle_response(resp)
+                return [resp.content]
+            return iter_response(resp)
+
+        def iter_response(resp):
+            # 调用方提前停止读取时关闭响应，释放连接
+            try:
+                yield from resp.iter_content(chunk_size)
+            finally:
+                resp.close()
+
+        if self.singleflight is None:
+            def chunks():
+                yield from open_stream()
+            return chunks()
+        return self.singleflight.stream(('stream', url, access_token, media_id), open_stream)
+
     def del_material(self, access_token, media_id):
         """删除永久素材
 
@@ -617,6 +913,18 @@ class WeiXinClient:
         resp_json = self.handle_response(resp)
         return resp.json()
 
+    def add_drafts(self, access_token, articles: list, media_ids=None, per_draft=MAX_ARTICLES_PER_DRAFT) -> List[Dict]:
+        """批量新建草稿
+
+        先在本地校验所有文章（任何一篇不合法都会抛出 ArticleValidationError 并列出全部错误，不发起请求），
+        再按每个草稿 per_draft 篇分组调用 add_draft。
+
+        :param media_ids: 已知的永久素材 media_id 集合，传入时校验 thumb_media_id
+        :return: 每个草稿的 add_draft 返回
+        """
+        drafts = build_drafts(articles, media_ids=media_ids, per_draft=per_draft)
+        return [self.add_draft(access_token, draft_articles) for draft_articles in drafts]
+
     def get_draft(self, access_token, media_id):
         """获取草稿
 
@@ -643,7 +951,7 @@ class WeiXinClient:
 
         ref: https://developers.weixin.qq.com/doc/offiaccount/Draft_Box/Get_draft.html
         """
-        url = 'https://api.weixin.qq.com/cgi-bin/draft/add'
+        url = 'https://api.weixin.qq.com/cgi-bin/draft/get'
         params = {
             "access_token": access_token,
         }
@@ -981,6 +1289,34 @@ class WeiXinClient:
         msgtype_data = {"media_id": media_id}
         return self.mass_sendall(access_token, msgtype, msgtype_data, is_to_all=is_to_all, tag_id=tag_id, send_ignore_reprint=send_ignore_reprint)
 
+    def mass_send(self, access_token, openids: List[str], msgtype, msgtype_data, send_ignore_reprint=0,
+                  clientmsgid=None):
+        """
+        根据 openid 列表群发，每次 2 ~ 10000 个 openid，大批量发送见 weixin_client.mass
+
+        :param clientmsgid: 开发者侧群发 id，24 小时内相同的 clientmsgid 不会重复发送
+
+        ref: https://developers.weixin.qq.com/doc/offiaccount/Message_Management/Batch_Sends_and_Originality_Checks.html
+        """
+        if msgtype not in ('mpnews', 'text', 'voice', 'image', 'mpvideo', 'wxcard'):
+            raise ValueError('msgtype不合法')
+
+        url = 'https://api.weixin.qq.com/cgi-bin/message/mass/send'
+        params = {
+            "access_token": access_token,
+        }
+        payload = {
+            "touser": openids,
+            "msgtype": msgtype,
+            msgtype: msgtype_data,
+            "send_ignore_reprint": send_ignore_reprint,
+        }
+        if clientmsgid is not None:
+            payload['clientmsgid'] = clientmsgid
+        resp = self.do_post(url, params=params, json=payload)
+        self.handle_response(resp)
+        return resp.json()
+
     def mass_get(self, access_token, msg_id):
         """查询群发消息发送状态
 
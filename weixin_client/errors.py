@@ -1,8 +1,38 @@
+from weixin_client import result_code
+
 
 class ClientError(Exception):
     def __init__(self, detail, *args, **kwargs):
         self.detail = detail
 
 
-class InvaildMaterialError(ClientError):
+class WeiXinClientError(ClientError):
+    """微信接口返回 errcode != 0 时抛出"""
+
+    def __init__(self, errcode, errmsg, *args, **kwargs):
+        super().__init__(errmsg, *args, **kwargs)
+        self.errcode = errcode
+        self.errmsg = errmsg
+
+    def __str__(self):
+        return f'{self.errcode}: {self.errmsg}'
+
+
+class InvaildMaterialError(WeiXinClientError):
     pass
+
+
+class ArticleValidationError(ClientError):
+    """批量校验文章失败，errors 为 [(文章序号, 字段, 说明), ...]，包含所有不合法的字段"""
+
+    def __init__(self, errors, *args, **kwargs):
+        super().__init__(errors, *args, **kwargs)
+        self.errors = errors
+
+    def __str__(self):
+        return '; '.join(f'articles[{index}].{field}: {message}' for index, field, message in self.errors)
+
+
+result_code_mapping = {
+    result_code.INVALID_MEDIA: InvaildMaterialError,
+}
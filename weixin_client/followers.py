@@ -0,0 +1,148 @@
+"""
+关注者导出
+
+1. export_openids：用 get_user_list 按 next_openid 翻页，每页追加写入文本文件（一行一个 openid）
+2. enrich_followers：从 openid 文件按 100 个一批调用 batchget_user_info，有限的线程并发，按顺序写成 NDJSON
+
+    export_openids(wx_client, token, 'openids.txt')
+    enrich_followers(wx_client, token, 'openids.txt', 'followers.ndjson')
+
+两步都把进度写在 <文件名>.progress 里，进程中断后再次调用会截掉未确认的部分并从断点继续，
+同一个文件里不会出现重复或缺失。内存占用只和一页 / 在途批次数有关，和关注者总数无关。
+access_token 可以传函数，导出时间超过 token 有效期时每次请求都会重新取。
+"""
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+BATCH_SIZE = 100
+DEFAULT_WORKERS = 8
+
+Token = Union[str, Callable[[], str]]
+
+
+def get_token(access_token: Token) -> str:
+    return access_token() if callable(access_token) else access_token
+
+
+def progress_path(path: str) -> str:
+    return path + '.progress'
+
+
+def load_progress(path: str) -> Optional[Dict]:
+    try:
+        with open(progress_path(path), encoding='utf-8') as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return None
+
+
+def save_progress(path: str, progress: Dict) -> None:
+    """先写临时文件再替换，中途崩溃也不会留下半个进度文件"""
+    tmp_path = progress_path(path) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fp:
+        json.dump(progress, fp)
+    os.replace(tmp_path, progress_path(path))
+
+
+def open_for_resume(path: str, offset: int):
+    """打开输出文件并截到上次确认的位置"""
+    fp = open(path, 'ab')
+    fp.truncate(offset)
+    fp.seek(offset)
+    return fp
+
+
+def iter_openid_pages(client, access_token: Token,
+                      next_openid: Optional[str] = None) -> Iterator[Tuple[List[str], str]]:
+    """逐页返回 (openid 列表, next_openid)"""
+    while True:
+        resp_json = client.get_user_list(get_token(access_token), next_openid=next_openid)
+        openids = resp_json.get('data', {}).get('openid', [])
+        if not openids:
+            return
+        next_openid = resp_json.get('next_openid', '')
+        yield openids, next_openid
+        if not next_openid:
+            return
+
+
+def export_openids(client, access_token: Token, path: str) -> int:
+    """把全部关注者 openid 写入 path，返回文件里的 openid 总数，可断点续传"""
+    progress = load_progress(path) or {'next_openid': None, 'offset': 0, 'count': 0, 'done': False}
+    if progress['done']:
+        return progress['count']
+
+    with open_for_resume(path, progress['offset']) as fp:
+        for openids, next_openid in iter_openid_pages(client, access_token, progress['next_openid']):
+            fp.write(('\n'.join(openids) + '\n').encode('utf-8'))
+            fp.flush()
+            progress.update(next_openid=next_openid, offset=fp.tell(), count=progress['count'] + len(openids))
+            save_progress(path, progress)
+    progress['done'] = True
+    save_progress(path, progress)
+    return progress['count']
+
+
+def iter_openids(path: str) -> Iterator[str]:
+    """逐行读取 openid 文件"""
+    with open(path, encoding='utf-8') as fp:
+        for line in fp:
+            openid = line.strip()
+            if openid:
+                yield openid
+
+
+def iter_batches(openids: Iterator[str], size: int = BATCH_SIZE) -> Iterator[List[str]]:
+    while True:
+        batch = list(islice(openids, size))
+        if not batch:
+            return
+        yield batch
+
+
+def enrich_followers(
+    client,
+    access_token: Token,
+    openid_path: str,
+    output_path: str,
+    max_workers: int = DEFAULT_WORKERS,
+    lang: str = 'zh_CN',
+) -> int:
+    """批量获取用户信息写成 NDJSON（一行一个用户），返回写入的用户数，可断点续传
+
+    最多 max_workers 个批次在途，结果按 openid 文件的顺序写入。
+    """
+    progress = load_progress(output_path) or {'batches': 0, 'offset': 0, 'count': 0}
+    openids = iter_openids(openid_path)
+    # 跳过已经写完的批次
+    for _ in islice(iter_batches(openids), progress['batches']):
+        pass
+
+    def fetch(batch: List[str]) -> List[Dict]:
+        return client.batchget_user_info(get_token(access_token), batch, lang=lang)['user_info_list']
+
+    def write(fp, users: List[Dict]) -> None:
+        fp.write(''.join(json.dumps(user, ensure_ascii=False) + '\n' for user in users).encode('utf-8'))
+        fp.flush()
+        progress.update(batches=progress['batches'] + 1, offset=fp.tell(), count=progress['count'] + len(users))
+        save_progress(output_path, progress)
+
+    with open_for_resume(output_path, progress['offset']) as fp, ThreadPoolExecutor(max_workers) as executor:
+        pending = deque()
+        try:
+            for batch in iter_batches(openids):
+                pending.append(executor.submit(fetch, batch))
+                if len(pending) >= max_workers:
+                    write(fp, pending.popleft().result())
+            while pending:
+                write(fp, pending.popleft().result())
+        except BaseException:
+            # 出错时不再等待还没开始的批次，下次从最后写入的批次继续
+            for future in pending:
+                future.cancel()
+            raise
+    return progress['count']
@@ -0,0 +1,171 @@
+"""
+文章 HTML 图片本地化
+
+图文消息 content 里的外部图片会被微信过滤，必须先通过 upload_img 上传换成 mmbiz.qpic.cn 的地址。
+localize_images 一次完成：解析 HTML 收集外部图片 -> 并发下载并上传（相同 URL、相同内容只传一次）-> 单遍替换地址。
+
+    content = localize_images(wx_client, token, content)
+    wx_client.add_draft(token, [make_article(title, content, thumb_media_id)])
+"""
+import contextvars
+import hashlib
+import html
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+
+from requests_clients.offload import register_stage, run_stage
+
+# 已经是微信图片服务器的地址，不需要再上传
+WEIXIN_IMAGE_HOSTS = ('mmbiz.qpic.cn', 'mmbiz.qlogo.cn')
+IMAGE_ATTRS = ('src', 'data-src')
+DEFAULT_WORKERS = 64
+
+IMG_TAG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+IMAGE_ATTR_RE = re.compile(r'(\s(?:data-)?src\s*=\s*)(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))', re.IGNORECASE)
+
+Fetch = Callable[[str], Tuple[str, bytes]]
+
+
+def is_external(src: str) -> bool:
+    parts = urlsplit(src)
+    if parts.scheme not in ('http', 'https', ''):
+        return False
+    if not parts.netloc:
+        # 相对地址、data: 等无法上传
+        return src.startswith('//')
+    return not parts.hostname.endswith(WEIXIN_IMAGE_HOSTS)
+
+
+class ImageCollector(HTMLParser):
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.sources: Dict[str, None] = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'img':
+            return
+        for name, value in attrs:
+            if name in IMAGE_ATTRS and value and is_external(value):
+                self.sources.setdefault(value.strip(), None)
+
+    handle_startendtag = handle_starttag
+
+
+def collect_images(content: Union[str, Iterable[str]]) -> List[str]:
+    """收集 HTML 中需要上传的外部图片地址（去重，保持出现顺序），content 可以是分块的 HTML"""
+    collector = ImageCollector()
+    for chunk in ([content] if isinstance(content, str) else content):
+        collector.feed(chunk)
+    collector.close()
+    return list(collector.sources)
+
+
+def rewrite_images(content: str, mapping: Dict[str, str]) -> str:
+    """单遍替换 img 的 src / data-src，不在 mapping 中的地址保持不变"""
+    def replace_attr(match):
+        prefix, double, single, bare = match.groups()
+        value = next(v for v in (double, single, bare) if v is not None)
+        new_value = mapping.get(html.unescape(value).strip())
+        if new_value is None:
+            return match.group(0)
+        return f'{prefix}"{html.escape(new_value, quote=True)}"'
+
+    def replace_tag(match):
+        return IMAGE_ATTR_RE.sub(replace_attr, match.group(0))
+
+    return IMG_TAG_RE.sub(replace_tag, content)
+
+
+class ImageUploader:
+    """并发下载并上传图片，按 URL 和内容 md5 去重，可在多篇文章之间复用以共享去重结果
+
+    :param fetch: ``fetch(url) -> (文件名, 图片内容)``，默认用 client.session 或 requests 下载
+    """
+
+    def __init__(self, client, access_token, fetch: Optional[Fetch] = None, max_workers: int = DEFAULT_WORKERS) -> None:
+        self.client = client
+        self.access_token = access_token
+        self.fetch = fetch or self.default_fetch
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._by_url: Dict[str, Future] = {}
+        self._by_digest: Dict[str, Future] = {}
+
+    def default_fetch(self, url: str) -> Tuple[str, bytes]:
+        if url.startswith('//'):
+            url = 'https:' + url
+        session = self.client.session or requests
+        resp = session.get(url, timeout=self.client.timeout)
+        resp.raise_for_status()
+        filename = os.path.basename(urlsplit(url).path) or 'image.jpg'
+        return filename, resp.content
+
+    def _forget_on_error(self, futures: Dict[str, Future], key: str, future: Future) -> None:
+        """失败的结果不缓存，下次遇到同一个地址或内容时重新上传"""
+        def done(future: Future) -> None:
+            if future.exception() is not None:
+                with self._lock:
+                    if futures.get(key) is future:
+                        del futures[key]
+        future.add_done_callback(done)
+
+    def upload_one(self, url: str) -> str:
+        filename, content = self.fetch(url)
+        digest = hashlib.md5(content).hexdigest()
+        with self._lock:
+            future = self._by_digest.get(digest)
+            owner = future is None
+            if owner:
+                future = self._by_digest[digest] = Future()
+                self._forget_on_error(self._by_digest, digest, future)
+        if not owner:
+            return future.result()
+        try:
+            resp_json = self.client.upload_img_content(self.access_token, (filename, content))
+            future.set_result(resp_json['url'])
+        except BaseException as err:
+            future.set_exception(err)
+        return future.result()
+
+    def upload(self, urls: Iterable[str]) -> Dict[str, str]:
+        """上传所有图片，返回 {原地址: 微信图片地址}，任何一张失败都会抛出异常"""
+        futures = {}
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for url in urls:
+                with self._lock:
+                    future = self._by_url.get(url)
+                    submitted = future is None
+                    if submitted:
+                        # 复制上下文，让线程里的请求继承调用方的截止时间
+                        context = contextvars.copy_context()
+                        future = self._by_url[url] = executor.submit(context.run, self.upload_one, url)
+                if submitted:
+                    # 已经完成的 future 会立即调用回调，不能在持有锁时注册
+                    self._forget_on_error(self._by_url, url, future)
+                futures[url] = future
+            return {url: future.result() for url, future in futures.items()}
+
+
+register_stage('html.collect_images', collect_images)
+register_stage('html.rewrite_images', rewrite_images)
+
+
+def localize_images(client, access_token, content: str, fetch: Optional[Fetch] = None,
+                    max_workers: int = DEFAULT_WORKERS, offloader=None) -> str:
+    """把文章 HTML 中的外部图片上传到微信并替换地址
+
+    :param offloader: requests_clients.offload.Offloader，HTML 解析和替换放到进程池执行
+    """
+    urls = run_stage(offloader, 'html.collect_images', content)
+    if not urls:
+        return content
+    mapping = ImageUploader(client, access_token, fetch=fetch, max_workers=max_workers).upload(urls)
+    return run_stage(offloader, 'html.rewrite_images', content, mapping)
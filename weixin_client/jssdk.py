@@ -0,0 +1,110 @@
+"""
+JS-SDK 签名
+
+    signer = JsapiSigner(wx_client, access_token, appid=APPID)
+    config = signer.sign('https://example.com/page?id=1#top')
+    # {'appId': ..., 'timestamp': ..., 'nonceStr': ..., 'signature': ...}
+
+jsapi_ticket 缓存到过期前 refresh_margin 秒，多个线程同时发现过期时只有一个去刷新。
+memoize=True 时同一个 URL 在 ticket 有效期内复用同一份签名。
+
+ref: https://developers.weixin.qq.com/doc/offiaccount/OA_Web_Apps/JS-SDK.html#62
+"""
+import hashlib
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, Union
+
+DEFAULT_MEMO_SIZE = 10000
+
+
+def normalize_url(url: str) -> str:
+    """签名用的 URL 不包含 # 及其后面的部分"""
+    return url.split('#', 1)[0]
+
+
+def make_signature(jsapi_ticket: str, noncestr: str, timestamp: int, url: str) -> str:
+    raw = f'jsapi_ticket={jsapi_ticket}&noncestr={noncestr}&timestamp={timestamp}&url={url}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class JsapiSigner:
+    """
+    :param access_token: access_token，或者返回 access_token 的函数（token 会刷新时传函数）
+    :param appid: 不为空时返回结果里带上 appId，可以直接传给 wx.config
+    :param refresh_margin: ticket 过期前多少秒刷新
+    :param memoize: 是否按 URL 缓存签名
+    """
+
+    def __init__(
+        self,
+        client,
+        access_token: Union[str, Callable[[], str]],
+        appid: Optional[str] = None,
+        refresh_margin: float = 300,
+        memoize: bool = False,
+        memo_size: int = DEFAULT_MEMO_SIZE,
+    ) -> None:
+        self.client = client
+        self.access_token = access_token
+        self.appid = appid
+        self.refresh_margin = refresh_margin
+        self.memoize = memoize
+        self.memo_size = memo_size
+        # (ticket, 该 ticket 的签名缓存)，放在一起替换，读取时不会拿到不匹配的一对
+        self._state: Tuple[Optional[str], Dict[str, Dict]] = (None, {})
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_access_token(self) -> str:
+        return self.access_token() if callable(self.access_token) else self.access_token
+
+    def _current(self) -> Tuple[str, Dict[str, Dict]]:
+        """返回有效的 (ticket, 签名缓存)，快过期时刷新"""
+        if time.monotonic() < self._expires_at:
+            return self._state
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                self._refresh()
+            return self._state
+
+    def ticket(self) -> str:
+        """返回有效的 jsapi_ticket，快过期时刷新"""
+        return self._current()[0]
+
+    def _refresh(self) -> None:
+        resp_json = self.client.get_jsapi_ticket(self.get_access_token())
+        self._state = (resp_json['ticket'], {})
+        self._expires_at = time.monotonic() + int(resp_json.get('expires_in', 7200)) - self.refresh_margin
+
+    def invalidate(self) -> None:
+        """ticket 被提前作废（如 access_token 重置）时调用，下次签名时重新获取"""
+        with self._lock:
+            self._expires_at = 0.0
+
+    def signature(self, url: str, noncestr: str, timestamp: int) -> str:
+        return make_signature(self.ticket(), noncestr, timestamp, url)
+
+    def sign(self, url: str) -> Dict:
+        """返回 wx.config 需要的 timestamp、nonceStr、signature（以及 appId）"""
+        url = normalize_url(url)
+        ticket, memo = self._current()
+        if self.memoize:
+            config = memo.get(url)
+            if config is not None:
+                return dict(config)
+
+        noncestr = secrets.token_hex(8)
+        timestamp = int(time.time())
+        config = {'timestamp': timestamp, 'nonceStr': noncestr,
+                  'signature': make_signature(ticket, noncestr, timestamp, url)}
+        if self.appid is not None:
+            config['appId'] = self.appid
+
+        # 签名期间 ticket 被刷新时不缓存，旧 ticket 的签名不能进入新 ticket 的缓存
+        if self.memoize and self._state[1] is memo:
+            if len(memo) >= self.memo_size:
+                memo.clear()
+            memo[url] = dict(config)
+        return config
@@ -0,0 +1,173 @@
+"""
+按 openid 列表大批量群发
+
+openid 可以是任意长度的可迭代对象（如 followers.iter_openids 读出的文件），按接口上限切成每块最多 10000 个，
+有限并发、限速地发送，收集每块的 msg_id，再轮询 mass_get 汇总发送状态。
+
+    chunks = mass_send_openids(wx_client, token, iter_openids('openids.txt'), 'mpnews', {'media_id': media_id},
+                               campaign_id='2024-spring')
+    report = track_mass_status(wx_client, token, chunks)
+    report.recipients  # {'SEND_SUCCESS': 123456, 'SEND_FAIL': 0, ...}
+
+指定 campaign_id 时每块带上 clientmsgid=<campaign_id>-<块序号>，中断后用同一个 campaign_id 重新发送，
+已经发出的块会被微信拒绝（45065）而不会重复发送。
+"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from requests_clients.ratelimit import RateLimiter
+from weixin_client import result_code
+from weixin_client.errors import WeiXinClientError
+
+MAX_OPENIDS_PER_SEND = 10000
+MIN_OPENIDS_PER_SEND = 2
+DEFAULT_WORKERS = 4
+
+SENDING = 'SENDING'
+SEND_SUCCESS = 'SEND_SUCCESS'
+SEND_FAIL = 'SEND_FAIL'
+DELETE = 'DELETE'
+# 本地状态：接口调用失败 / clientmsgid 已发送过
+ERROR = 'ERROR'
+DUPLICATE = 'DUPLICATE'
+FINAL_STATUSES = (SEND_SUCCESS, SEND_FAIL, DELETE, ERROR, DUPLICATE)
+
+
+@dataclass(slots=True)
+class MassChunk:
+    index: int
+    recipients: int
+    msg_id: Optional[int] = None
+    status: str = SENDING
+    error: Optional[str] = None
+    # 只有发送失败的块保留 openid，便于重试
+    openids: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class MassReport:
+    chunks: List[MassChunk]
+    # 状态 -> 块数 / 接收人数
+    counts: Dict[str, int]
+    recipients: Dict[str, int]
+
+    @property
+    def done(self) -> bool:
+        return SENDING not in self.counts
+
+    @property
+    def failed(self) -> List[MassChunk]:
+        return [chunk for chunk in self.chunks if chunk.status == ERROR]
+
+
+def chunk_openids(openids: Iterable[str], size: int = MAX_OPENIDS_PER_SEND) -> Iterator[List[str]]:
+    """按 size 切块，最后一块不足 2 个时从上一块借一个（接口要求至少 2 个 openid）"""
+    if size < MIN_OPENIDS_PER_SEND * 2:
+        raise ValueError(f'size 至少为 {MIN_OPENIDS_PER_SEND * 2}')
+    if size > MAX_OPENIDS_PER_SEND:
+        raise ValueError(f'size 最多为 {MAX_OPENIDS_PER_SEND}')
+    iterator = iter(openids)
+    previous = list(islice(iterator, size))
+    if 0 < len(previous) < MIN_OPENIDS_PER_SEND:
+        raise ValueError('按 openid 群发至少需要 2 个 openid')
+    while previous:
+        current = list(islice(iterator, size))
+        if 0 < len(current) < MIN_OPENIDS_PER_SEND:
+            current.insert(0, previous.pop())
+        yield previous
+        previous = current
+
+
+def mass_send_openids(
+    client,
+    access_token: str,
+    openids: Iterable[str],
+    msgtype: str,
+    msgtype_data: Dict,
+    send_ignore_reprint: int = 0,
+    campaign_id: Optional[str] = None,
+    chunk_size: int = MAX_OPENIDS_PER_SEND,
+    max_workers: int = DEFAULT_WORKERS,
+    rate: Optional[float] = None,
+) -> List[MassChunk]:
+    """分块并发群发，返回每块的发送结果，单块失败不影响其他块
+
+    :param rate: 每秒最多发送的块数，为空时不限速
+    """
+    limiter = RateLimiter(rate, burst=max_workers) if rate else None
+
+    def send(index: int, chunk: List[str]) -> MassChunk:
+        result = MassChunk(index=index, recipients=len(chunk))
+        clientmsgid = None if campaign_id is None else f'{campaign_id}-{index}'
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            resp_json = client.mass_send(access_token, chunk, msgtype, msgtype_data,
+                                         send_ignore_reprint=send_ignore_reprint, clientmsgid=clientmsgid)
+        except WeiXinClientError as err:
+            if err.errcode == result_code.CLIENTMSGID_EXIST:
+                result.status = DUPLICATE
+            else:
+                result.status, result.error, result.openids = ERROR, str(err), chunk
+            return result
+        except Exception as err:
+            result.status, result.error, result.openids = ERROR, repr(err), chunk
+            return result
+        result.msg_id = resp_json['msg_id']
+        return result
+
+    results = []
+    # 在途的块最多 max_workers * 2 个，openid 迭代器不会被一次读完
+    with ThreadPoolExecutor(max_workers) as executor:
+        pending = deque()
+        for index, chunk in enumerate(chunk_openids(openids, chunk_size)):
+            pending.append(executor.submit(send, index, chunk))
+            if len(pending) >= max_workers * 2:
+                results.append(pending.popleft().result())
+        results.extend(future.result() for future in pending)
+    return results
+
+
+def summarize(chunks: List[MassChunk]) -> MassReport:
+    counts: Dict[str, int] = {}
+    recipients: Dict[str, int] = {}
+    for chunk in chunks:
+        counts[chunk.status] = counts.get(chunk.status, 0) + 1
+        recipients[chunk.status] = recipients.get(chunk.status, 0) + chunk.recipients
+    return MassReport(chunks=chunks, counts=counts, recipients=recipients)
+
+
+def track_mass_status(
+    client,
+    access_token: str,
+    chunks: List[MassChunk],
+    interval: float = 5.0,
+    timeout: float = 600.0,
+    max_workers: int = 8,
+) -> MassReport:
+    """每 interval 秒并发查询一轮还在发送中的块，全部结束或超时后返回汇总报告"""
+    deadline = time.monotonic() + timeout
+
+    def poll(chunk: MassChunk) -> None:
+        try:
+            status = client.mass_get(access_token, chunk.msg_id)['msg_status']
+        except Exception as err:
+            # 查询失败下一轮再试
+            chunk.error = repr(err)
+            return
+        chunk.status, chunk.error = status, None
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        while True:
+            sending = [chunk for chunk in chunks if chunk.status not in FINAL_STATUSES]
+            if sending:
+                list(executor.map(poll, sending))
+            sending = [chunk for chunk in chunks if chunk.status not in FINAL_STATUSES]
+            if not sending or time.monotonic() + interval > deadline:
+                break
+            time.sleep(interval)
+    return summarize(chunks)
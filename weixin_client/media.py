@@ -0,0 +1,202 @@
+"""
+本地素材库
+
+发布任务反复上传同一批本地文件（封面、logo、片头视频）。MediaLibrary 按内容 md5 索引一个目录：
+
+1. 文件以 mmap 打开并缓存映射，上传时直接从 page cache 发送（见 requests_clients.multipart），不重复读文件
+2. 记录 (公众号, 接口, md5) -> 上传结果，同样的内容再次上传时直接返回之前的 media_id / url，不发请求
+
+    library = MediaLibrary('assets/')
+    library.add_material(wx_client, token, 'thumbs/cover.jpg', 'image', account=appid)['media_id']
+    library.upload_img(wx_client, token, 'logo.png', account=appid)['url']
+
+索引保存在 <目录>/.media-index.json，文件大小和修改时间没变时不重新计算 md5。
+素材在公众号后台被删除后调用 forget(media_id)，下次会重新上传。
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from requests_clients.singleflight import SingleFlight
+
+INDEX_NAME = '.media-index.json'
+DEFAULT_MAX_OPEN = 64
+
+Buffer = Union[mmap.mmap, bytes]
+
+
+class MediaLibrary:
+    """
+    :param root: 素材目录
+    :param index_path: 索引文件，默认为目录下的 .media-index.json
+    :param max_open: 最多保持映射的文件数，按最近使用淘汰
+    """
+
+    def __init__(self, root: str, index_path: Optional[str] = None, max_open: int = DEFAULT_MAX_OPEN) -> None:
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or os.path.join(self.root, INDEX_NAME)
+        self.max_open = max_open
+        # 相对路径 -> {'size', 'mtime_ns', 'digest'}
+        self.files: Dict[str, Dict] = {}
+        # '公众号:接口:md5' -> 上传结果
+        self.uploads: Dict[str, Dict] = {}
+        self._maps: 'OrderedDict[str, Tuple[int, int, Buffer]]' = OrderedDict()
+        self._lock = threading.RLock()
+        # 写索引文件较慢，单独加锁，不阻塞上传
+        self._save_lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._counters = {'uploads': 0, 'hits': 0, 'bytes_uploaded': 0, 'bytes_skipped': 0}
+        self.load()
+
+    ### 索引 ###
+
+    def load(self) -> None:
+        try:
+            with open(self.index_path, encoding='utf-8') as fp:
+                index = json.load(fp)
+        except FileNotFoundError:
+            return
+        self.files, self.uploads = index.get('files', {}), index.get('uploads', {})
+
+    def save(self) -> None:
+        """先写临时文件再替换，中途崩溃也不会留下半个索引
+
+        快照到替换全程持有 _save_lock，并发保存按顺序落盘，较旧的快照不会覆盖较新的索引
+        """
+        with self._save_lock:
+            with self._lock:
+                index = {'files': dict(self.files), 'uploads': dict(self.uploads)}
+            tmp_path = f'{self.index_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as fp:
+                json.dump(index, fp, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+
+    def iter_paths(self) -> Iterator[str]:
+        """目录下所有文件的相对路径，跳过以 . 开头的文件和目录"""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+            for filename in sorted(filenames):
+                if not filename.startswith('.'):
+                    yield os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, '/')
+
+    def scan(self) -> Dict[str, str]:
+        """重新索引整个目录，返回 {相对路径: md5}，已经删除的文件从索引中移除"""
+        paths = list(self.iter_paths())
+        digests = {path: self.digest(path) for path in paths}
+        with self._lock:
+            for path in set(self.files) - set(digests):
+                del self.files[path]
+        self.save()
+        return digests
+
+    def path(self, relpath: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, relpath))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f'{relpath} 不在素材目录里')
+        return path
+
+    def digest(self, relpath: str) -> str:
+        """文件内容的 md5，大小和修改时间没变时用索引里的值"""
+        return self._digest(relpath)[0]
+
+    def _digest(self, relpath: str) -> Tuple[str, int]:
+        """返回 (md5, 文件大小)，两者来自同一次 stat"""
+        stat = os.stat(self.path(relpath))
+        with self._lock:
+            entry = self.files.get(relpath)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['digest'], stat.st_size
+        # 直接对映射计算，hashlib 会释放 GIL
+        digest = hashlib.md5(self.buffer(relpath)).hexdigest()
+        with self._lock:
+            self.files[relpath] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+        return digest, stat.st_size
+
+    ### 映射 ###
+
+    def buffer(self, relpath: str) -> Buffer:
+        """返回文件的只读 mmap（空文件返回 b''），文件被修改后重新映射"""
+        stat = os.stat(self.path(relpath))
+        with self._lock:
+            cached = self._maps.get(relpath)
+            if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+                self._maps.move_to_end(relpath)
+                return cached[2]
+            if stat.st_size == 0:
+                buffer = b''
+            else:
+                with open(self.path(relpath), 'rb') as fp:
+                    buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[relpath] = (stat.st_size, stat.st_mtime_ns, buffer)
+            self._maps.move_to_end(relpath)
+            while len(self._maps) > self.max_open:
+                # 不主动 close，正在发送的请求可能还引用着映射，最后一个引用释放时自动解除映射
+                self._maps.popitem(last=False)
+            return buffer
+
+    ### 上传 ###
+
+    def _upload(self, kind: str, relpath: str, account: str, upload) -> Dict:
+        digest, size = self._digest(relpath)
+        key = f'{account}:{kind}:{digest}'
+
+        def run() -> Dict:
+            with self._lock:
+                result = self.uploads.get(key)
+            if result is not None:
+                self._count(hits=1, bytes_skipped=size)
+                return result
+            result = upload((os.path.basename(relpath), self.buffer(relpath)))
+            with self._lock:
+                self.uploads[key] = result
+            self._count(uploads=1, bytes_uploaded=size)
+            self.save()
+            return result
+
+        # 多个线程同时上传同一个内容时只上传一次
+        return dict(self._flight.do(key, run))
+
+    def add_material(self, client, access_token: str, relpath: str, type: str, title: str = '', intro: str = '',
+                     account: str = '') -> Dict:
+        """上传永久素材，返回 {'media_id', 'url'}；相同公众号、类型和内容已经上传过时不发请求
+
+        :param account: 公众号标识（如 appid），media_id 只在同一个公众号内有效
+        """
+        def upload(content):
+            resp_json = client.add_material_by_content(access_token, type, content, title, intro)
+            return {'media_id': resp_json['media_id'], 'url': resp_json.get('url')}
+        return self._upload(f'material:{type}', relpath, account, upload)
+
+    def upload_img(self, client, access_token: str, relpath: str, account: str = '') -> Dict:
+        """上传图文消息内的图片，返回 {'url'}"""
+        def upload(content):
+            return {'url': client.upload_img_content(access_token, content)['url']}
+        return self._upload('uploadimg', relpath, account, upload)
+
+    def forget(self, media_id: str) -> int:
+        """media_id 在公众号后台被删除后调用，返回移除的记录数"""
+        with self._lock:
+            keys = [key for key, result in self.uploads.items() if result.get('media_id') == media_id]
+            for key in keys:
+                del self.uploads[key]
+        if keys:
+            self.save()
+        return len(keys)
+
+    def _count(self, **values: int) -> None:
+        with self._lock:
+            for name, value in values.items():
+                self._counters[name] += value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters, files=len(self.files), mapped=len(self._maps))
+
+    def close(self) -> None:
+        """释放所有映射"""
+        with self._lock:
+            self._maps.clear()
@@ -0,0 +1,174 @@
+"""
+可选的强类型响应模型
+
+客户端方法仍然返回 dict，需要长期持有大量列表数据（草稿、已发布、素材）时，可以用这里的 parse_* 把每页结果
+转换成 __slots__ dataclass，再丢掉原始 dict。文章 content 以 zlib 压缩后的 UTF-8 保存，访问 .content 时才解码。
+
+    page = parse_draft_list(wx_client.get_draft_list(token))
+    for draft in page.item:
+        print(draft.media_id, draft.news_item[0].title)
+"""
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Generic, List, Tuple, TypeVar
+
+# 小于这个长度的 content 只做 UTF-8 编码，不压缩
+COMPRESS_THRESHOLD = 256
+
+
+def pack_text(text: str) -> bytes:
+    data = text.encode('utf-8')
+    if len(data) < COMPRESS_THRESHOLD:
+        return b'\x00' + data
+    return b'\x01' + zlib.compress(data, 1)
+
+
+def unpack_text(packed: bytes) -> str:
+    if not packed:
+        return ''
+    if packed[0] == 1:
+        return zlib.decompress(packed[1:]).decode('utf-8')
+    return packed[1:].decode('utf-8')
+
+
+@dataclass(slots=True)
+class NewsItem:
+    title: str = ''
+    author: str = ''
+    digest: str = ''
+    content_source_url: str = ''
+    thumb_media_id: str = ''
+    url: str = ''
+    show_cover_pic: int = 0
+    need_open_comment: int = 0
+    only_fans_can_comment: int = 0
+    is_deleted: bool = False
+    packed_content: bytes = b''
+
+    @property
+    def content(self) -> str:
+        """文章 HTML，每次访问时解码，不常驻内存"""
+        return unpack_text(self.packed_content)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'NewsItem':
+        return cls(
+            title=data.get('title', ''),
+            author=data.get('author', ''),
+            digest=data.get('digest', ''),
+            content_source_url=data.get('content_source_url', ''),
+            thumb_media_id=data.get('thumb_media_id', ''),
+            url=data.get('url', ''),
+            show_cover_pic=data.get('show_cover_pic', 0),
+            need_open_comment=data.get('need_open_comment', 0),
+            only_fans_can_comment=data.get('only_fans_can_comment', 0),
+            is_deleted=data.get('is_deleted', False),
+            packed_content=pack_text(data.get('content') or ''),
+        )
+
+    def to_dict(self) -> Dict:
+        data = {name: getattr(self, name) for name in self.__slots__ if name != 'packed_content'}
+        data['content'] = self.content
+        return data
+
+
+def parse_news_items(data: Dict) -> Tuple[NewsItem, ...]:
+    return tuple(NewsItem.from_dict(news) for news in data.get('news_item') or ())
+
+
+@dataclass(slots=True)
+class Draft:
+    media_id: str
+    update_time: int = 0
+    news_item: Tuple[NewsItem, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Draft':
+        return cls(data['media_id'], data.get('update_time', 0), parse_news_items(data.get('content') or {}))
+
+
+@dataclass(slots=True)
+class PublishRecord:
+    article_id: str
+    update_time: int = 0
+    news_item: Tuple[NewsItem, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PublishRecord':
+        return cls(data['article_id'], data.get('update_time', 0), parse_news_items(data.get('content') or {}))
+
+
+@dataclass(slots=True)
+class Material:
+    """永久素材，图文素材时 news_item 不为空，其他类型有 name 和 url"""
+    media_id: str
+    update_time: int = 0
+    name: str = ''
+    url: str = ''
+    news_item: Tuple[NewsItem, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Material':
+        return cls(
+            data['media_id'],
+            data.get('update_time', 0),
+            data.get('name', ''),
+            data.get('url', ''),
+            parse_news_items(data.get('content') or {}),
+        )
+
+
+@dataclass(slots=True)
+class PublishStatus:
+    """发布状态，publish_status：0 成功，1 发布中，2 原创失败，3 常规失败，4 平台审核不通过，5 成功后用户删除，6 成功后系统封禁"""
+    publish_id: str
+    publish_status: int
+    article_id: str = ''
+    article_urls: Tuple[str, ...] = ()
+    fail_idx: Tuple[int, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PublishStatus':
+        detail = data.get('article_detail') or {}
+        return cls(
+            str(data['publish_id']),
+            data['publish_status'],
+            data.get('article_id', ''),
+            tuple(item['article_url'] for item in detail.get('item') or ()),
+            tuple(data.get('fail_idx') or ()),
+        )
+
+
+T = TypeVar('T')
+
+
+@dataclass(slots=True)
+class Page(Generic[T]):
+    total_count: int
+    item_count: int
+    item: List[T] = field(default_factory=list)
+
+
+def parse_page(resp_json: Dict, model) -> Page:
+    items = [model.from_dict(item) for item in resp_json.get('item') or ()]
+    return Page(resp_json.get('total_count', 0), resp_json.get('item_count', len(items)), items)
+
+
+def parse_draft_list(resp_json: Dict) -> Page[Draft]:
+    """转换 get_draft_list 的返回"""
+    return parse_page(resp_json, Draft)
+
+
+def parse_publish_list(resp_json: Dict) -> Page[PublishRecord]:
+    """转换 get_success_publish_list 的返回"""
+    return parse_page(resp_json, PublishRecord)
+
+
+def parse_material_list(resp_json: Dict) -> Page[Material]:
+    """转换 get_material_list 的返回"""
+    return parse_page(resp_json, Material)
+
+
+def parse_publish_status(resp_json: Dict) -> PublishStatus:
+    """转换 query_publish_status 的返回"""
+    return PublishStatus.from_dict(resp_json)
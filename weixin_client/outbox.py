@@ -0,0 +1,361 @@
+"""
+持久化的发送队列（outbox）
+
+写操作先写入本地 SQLite（WAL 模式），立即返回，由后台线程池调用 client 的对应方法发出去。
+进程崩溃或微信不可用时任务不会丢，重启后继续发送。
+
+    outbox = Outbox('outbox.db', wx_client, get_token)
+    outbox.enqueue('bizsend_message', openid, template_id, data, key=f'order-{order_id}')
+    outbox.start()   # 后台持续发送；也可以在定时任务里调用 outbox.drain()
+
+语义：
+
+1. 至少一次：任务被取走后有 lease 秒的租期，处理线程崩溃、租期到了还没完成的任务会被重新取走。
+   租期需要大于最长的请求超时（add_material 的读超时为 120 秒），租期已经被别人接手的线程写回的结果会被丢弃。
+   同一个任务可能被执行多次，需要幂等的调用请带上业务层的去重字段（如群发的 clientmsgid）。
+2. 去重：相同 key 的任务只会入队一次，已经完成的 key 再次入队也会被忽略。
+3. 死信：业务错误码（除过载、token 失效外）和参数错误不重试，直接进入 dead；可重试错误按指数退避，
+   超过 max_attempts 次也进入 dead。dead_letters() 查看，retry_dead() 重新入队。
+
+参数会以 JSON 保存，只能是 JSON 可以表示的值；add_material 保存的是文件路径，发送时文件需要仍然存在。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Union
+
+import requests
+
+from requests_clients.breaker import CircuitOpenError
+from requests_clients.deadline import DeadlineExceeded
+from requests_clients.limiter import LimitTimeout
+from weixin_client import result_code
+from weixin_client.errors import WeiXinClientError
+
+PENDING = 'pending'
+INFLIGHT = 'inflight'
+DONE = 'done'
+DEAD = 'dead'
+
+# 大于 WeiXinClient 最长的请求超时（上传素材 5 + 120 秒），正常执行的任务不会被重新取走
+DEFAULT_LEASE = 300.0
+
+# 允许入队的 client 方法
+METHODS = frozenset({
+    'add_draft',
+    'publish_article',
+    'mass_sendall',
+    'mass_send',
+    'bizsend_message',
+    'add_material',
+})
+
+# 这些错误码稍后重试可能成功：过载、token 失效（token 为函数时下次会取到新 token）
+RETRYABLE_CODES = result_code.OVERLOAD_CODES | {result_code.INVALID_CREDENTIAL, result_code.ACCESS_TOKEN_EXPIRED}
+RETRYABLE_ERRORS = (requests.exceptions.RequestException, DeadlineExceeded, CircuitOpenError, LimitTimeout)
+
+Token = Union[str, Callable[[], str]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT UNIQUE,
+    method TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_at REAL NOT NULL,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (status, next_at);
+"""
+
+
+@dataclass(slots=True)
+class Job:
+    id: int
+    key: Optional[str]
+    method: str
+    args: list
+    kwargs: dict
+    attempts: int
+    status: str = PENDING
+    error: Optional[str] = None
+    result: Optional[Dict] = None
+    # 租期到期时间，写回结果时用来确认任务没有被其他线程重新取走
+    leased_until: float = 0.0
+
+
+class Outbox:
+    """
+    :param access_token: access_token，或者返回 access_token 的函数（长期运行时传函数）
+    :param max_attempts: 可重试错误最多尝试的次数，超过后进入 dead
+    :param backoff: 第 n 次失败后等待 backoff * 2 ** (n - 1) 秒再重试，最多 max_backoff 秒
+    :param lease: 任务取走后多少秒内没有完成，视为处理线程已经崩溃，可以被重新取走；需要大于 client 最长的请求超时
+    :param synchronous: SQLite 的 synchronous 设置，NORMAL 在进程崩溃时不丢数据，FULL 在断电时也不丢
+    """
+
+    def __init__(
+        self,
+        path: str,
+        client,
+        access_token: Token,
+        max_workers: int = 4,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        lease: float = DEFAULT_LEASE,
+        poll_interval: float = 1.0,
+        synchronous: str = 'NORMAL',
+    ) -> None:
+        self.path = path
+        self.client = client
+        self.access_token = access_token
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._started_at = time.monotonic()
+        self._finished = deque(maxlen=10000)
+        self._counter_lock = threading.Lock()
+        self._counters = {'enqueued': 0, 'duplicates': 0, 'done': 0, 'retried': 0, 'dead': 0,
+                          'lost_leases': 0}
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        """每个线程一个连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA synchronous={self.synchronous}')
+            self._local.conn = conn
+        return conn
+
+    def get_access_token(self) -> str:
+        return self.access_token() if callable(self.access_token) else self.access_token
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._counter_lock:
+            self._counters[name] += value
+
+    ### 生产者 ###
+
+    def enqueue(self, method: str, *args, key: Optional[str] = None, **kwargs) -> int:
+        """入队一次 client.<method>(access_token, *args, **kwargs)，返回任务 id；key 已存在时返回已有任务的 id"""
+        return self.enqueue_many([(method, args, kwargs, key)])[0]
+
+    def enqueue_many(self, items) -> List[int]:
+        """一个事务里入队多个任务，items 为 [(method, args, kwargs, key), ...]"""
+        rows = []
+        now = time.time()
+        for method, args, kwargs, key in items:
+            if method not in METHODS:
+                raise ValueError(f'不支持入队的方法：{method}')
+            payload = json.dumps({'args': list(args), 'kwargs': kwargs}, ensure_ascii=False)
+            rows.append((key, method, payload, PENDING, now, now, now))
+
+        ids = []
+        inserted = 0
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for row in rows:
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO outbox (key, method, payload, status, next_at, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)', row)
+                if cursor.rowcount:
+                    ids.append(cursor.lastrowid)
+                    inserted += 1
+                else:
+                    ids.append(conn.execute('SELECT id FROM outbox WHERE key = ?', (row[0],)).fetchone()[0])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._count('enqueued', inserted)
+        self._count('duplicates', len(rows) - inserted)
+        self._wakeup.set()
+        return ids
+
+    ### 消费者 ###
+
+    def claim(self) -> Optional[Job]:
+        """取一个到期的任务，并设置租期"""
+        conn = self.connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id, key, method, payload, attempts FROM outbox '
+                'WHERE status IN (?, ?) AND next_at <= ? ORDER BY next_at, id LIMIT 1',
+                (PENDING, INFLIGHT, now)).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            leased_until = now + self.lease
+            conn.execute('UPDATE outbox SET status = ?, attempts = attempts + 1, next_at = ?, updated_at = ? '
+                         'WHERE id = ?', (INFLIGHT, leased_until, now, row[0]))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        id, key, method, payload, attempts = row
+        payload = json.loads(payload)
+        return Job(id=id, key=key, method=method, args=payload['args'], kwargs=payload['kwargs'],
+                   attempts=attempts + 1, status=INFLIGHT, leased_until=leased_until)
+
+    def execute(self, job: Job) -> Job:
+        """调用 client 方法并记录结果"""
+        try:
+            result = getattr(self.client, job.method)(self.get_access_token(), *job.args, **job.kwargs)
+        except WeiXinClientError as err:
+            self.fail(job, str(err), retryable=err.errcode in RETRYABLE_CODES)
+        except RETRYABLE_ERRORS as err:
+            self.fail(job, repr(err), retryable=True)
+        except Exception as err:
+            # 参数错误、文件不存在等，重试也不会成功
+            self.fail(job, repr(err), retryable=False)
+        else:
+            job.status, job.result, job.error = DONE, result, None
+            if self._update(job, next_at=time.time()):
+                self._count('done')
+                self._finished.append(time.monotonic())
+        return job
+
+    def fail(self, job: Job, error: str, retryable: bool) -> None:
+        job.error = error
+        now = time.time()
+        if retryable and job.attempts < self.max_attempts:
+            job.status = PENDING
+            if self._update(job, next_at=now + min(self.max_backoff, self.backoff * 2 ** (job.attempts - 1))):
+                self._count('retried')
+        else:
+            job.status = DEAD
+            if self._update(job, next_at=now):
+                self._count('dead')
+
+    def _update(self, job: Job, next_at: float) -> bool:
+        """写回结果，只有仍然持有租期时才会写入；租期已经过期并被重新取走时返回 False"""
+        result = None if job.result is None else json.dumps(job.result, ensure_ascii=False)
+        cursor = self.connection().execute(
+            'UPDATE outbox SET status = ?, next_at = ?, error = ?, result = ?, updated_at = ? '
+            'WHERE id = ? AND status = ? AND next_at = ?',
+            (job.status, next_at, job.error, result, time.time(), job.id, INFLIGHT, job.leased_until))
+        if cursor.rowcount:
+            return True
+        self._count('lost_leases')
+        return False
+
+    def work(self, until_idle: bool = False) -> int:
+        """处理线程：循环取任务执行，返回处理的任务数；until_idle 时没有到期任务就返回"""
+        processed = 0
+        while not self._stopping.is_set():
+            job = self.claim()
+            if job is None:
+                if until_idle:
+                    break
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.execute(job)
+            processed += 1
+        return processed
+
+    def drain(self) -> int:
+        """用 max_workers 个线程处理完当前所有到期的任务后返回，返回处理的任务数"""
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix='outbox') as executor:
+            futures = [executor.submit(self.work, True) for _ in range(self.max_workers)]
+        return sum(future.result() for future in futures)
+
+    def start(self) -> 'Outbox':
+        """启动后台处理线程"""
+        self._stopping.clear()
+        for index in range(self.max_workers):
+            thread = threading.Thread(target=self.work, name=f'outbox-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止后台线程，正在执行的任务会执行完"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def __enter__(self) -> 'Outbox':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    ### 查询 ###
+
+    def get(self, id: int) -> Optional[Job]:
+        row = self.connection().execute(
+            'SELECT id, key, method, payload, attempts, status, error, result FROM outbox WHERE id = ?',
+            (id,)).fetchone()
+        return None if row is None else self._job(row)
+
+    def dead_letters(self, limit: int = 100) -> List[Job]:
+        rows = self.connection().execute(
+            'SELECT id, key, method, payload, attempts, status, error, result FROM outbox '
+            'WHERE status = ? ORDER BY id LIMIT ?', (DEAD, limit)).fetchall()
+        return [self._job(row) for row in rows]
+
+    @staticmethod
+    def _job(row) -> Job:
+        id, key, method, payload, attempts, status, error, result = row
+        payload = json.loads(payload)
+        return Job(id=id, key=key, method=method, args=payload['args'], kwargs=payload['kwargs'], attempts=attempts,
+                   status=status, error=error, result=None if result is None else json.loads(result))
+
+    def retry_dead(self, ids: Optional[List[int]] = None) -> int:
+        """把 dead 任务重新入队（清零尝试次数），ids 为空时重试全部，返回重新入队的任务数"""
+        now = time.time()
+        sql = 'UPDATE outbox SET status = ?, attempts = 0, next_at = ?, updated_at = ? WHERE status = ?'
+        params = [PENDING, now, now, DEAD]
+        if ids is not None:
+            sql += f' AND id IN ({",".join("?" * len(ids))})'
+            params.extend(ids)
+        count = self.connection().execute(sql, params).rowcount
+        self._wakeup.set()
+        return count
+
+    def purge(self, older_than: float = 7 * 86400) -> int:
+        """删除 older_than 秒前完成的任务，去重 key 也随之失效"""
+        cutoff = time.time() - older_than
+        return self.connection().execute(
+            'DELETE FROM outbox WHERE status = ? AND updated_at < ?', (DONE, cutoff)).rowcount
+
+    def stats(self) -> Dict:
+        """各状态的任务数、本进程的计数，以及最近完成任务的吞吐"""
+        rows = self.connection().execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall()
+        stats = {PENDING: 0, INFLIGHT: 0, DONE: 0, DEAD: 0}
+        stats.update(rows)
+        with self._counter_lock:
+            stats.update(self._counters)
+        finished = list(self._finished)
+        elapsed = time.monotonic() - (finished[0] if len(finished) == self._finished.maxlen else self._started_at)
+        stats['done_per_s'] = round(len(finished) / elapsed, 1) if elapsed > 0 else 0.0
+        stats['size_bytes'] = sum(os.path.getsize(path) for path in (self.path, self.path + '-wal')
+                                  if os.path.exists(path))
+        return stats
@@ -0,0 +1,238 @@
+"""
+多公众号客户端池
+
+代运营等场景同时服务成百上千个公众号，按 appid 区分：
+
+    pool = WeiXinClientPool(secrets={'wx123': 'secret', ...}, rate=20)
+    pool.account('wx123').get_material_count()          # 自动带上该公众号的 access_token
+    future = pool.submit('wx123', 'bizsend_message', openid, template_id, data)
+
+1. 所有公众号共用一个 Session（连接池）和一个 WeiXinClient
+2. 每个公众号单独的 token 缓存、限速和当天的调用计数，token 失效（40001/42001）时强制刷新后重试一次
+3. submit 按公众号公平调度，某个公众号提交大量任务不会让其他公众号排队等待
+4. 公众号状态按 LRU 保留最多 max_tenants 个，还有任务在执行的不会被淘汰
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Mapping, Optional, Union
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from requests_clients.ratelimit import RateLimiter
+from requests_clients.scheduler import FairScheduler
+from weixin_client import result_code
+from weixin_client.client import WeiXinClient
+from weixin_client.errors import WeiXinClientError
+
+# token 被刷新或重置后旧 token 返回的错误码
+TOKEN_ERRORS = frozenset({result_code.INVALID_CREDENTIAL, result_code.ACCESS_TOKEN_EXPIRED})
+
+DEFAULT_MAX_TENANTS = 1000
+
+Secrets = Union[Mapping[str, str], Callable[[str], str]]
+# (appid, force_refresh) -> {'access_token': ..., 'expires_in': ...}
+TokenLoader = Callable[[str, bool], Dict]
+
+
+class TokenCache:
+    """缓存一个公众号的 access_token，快过期时刷新，多个线程同时发现过期时只有一个去刷新
+
+    :param loader: ``loader(force_refresh) -> {'access_token': ..., 'expires_in': ...}``
+    """
+
+    def __init__(self, loader: Callable[[bool], Dict], refresh_margin: float = 300) -> None:
+        self.loader = loader
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._force = False
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        if time.monotonic() < self._expires_at:
+            return self._token
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                resp_json = self.loader(self._force)
+                self._token, self._force = resp_json['access_token'], False
+                self._expires_at = time.monotonic() + int(resp_json.get('expires_in', 7200)) - self.refresh_margin
+        return self._token
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """token 失效时调用，下次 get 强制刷新；传入 token 时只在它仍是当前 token 时作废，避免重复刷新"""
+        with self._lock:
+            if token is None or token == self._token:
+                self._expires_at, self._force = 0.0, True
+
+
+class Tenant:
+    """一个公众号的状态"""
+
+    def __init__(self, appid: str, tokens: TokenCache, limiter: Optional[RateLimiter] = None) -> None:
+        self.appid = appid
+        self.tokens = tokens
+        self.limiter = limiter
+        self.day = time.strftime('%Y-%m-%d')
+        # 当天按方法统计的调用次数 / 失败次数，对照微信的每日接口配额
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, method: str, failed: bool = False) -> None:
+        with self._lock:
+            day = time.strftime('%Y-%m-%d')
+            if day != self.day:
+                self.day, self.calls, self.errors = day, {}, {}
+            self.calls[method] = self.calls.get(method, 0) + 1
+            if failed:
+                self.errors[method] = self.errors.get(method, 0) + 1
+
+    def usage(self) -> Dict:
+        with self._lock:
+            return {'day': self.day, 'calls': dict(self.calls), 'errors': dict(self.errors)}
+
+
+class AccountClient:
+    """绑定了公众号的客户端，调用方法时不用传 access_token"""
+
+    def __init__(self, pool: 'WeiXinClientPool', appid: str) -> None:
+        self.pool = pool
+        self.appid = appid
+
+    def __getattr__(self, method: str):
+        if method.startswith('_') or not callable(getattr(self.pool.client, method, None)):
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            return self.pool.call(self.appid, method, *args, **kwargs)
+        return call
+
+
+class WeiXinClientPool:
+    """
+    :param secrets: appid -> appsecret 的映射，或者根据 appid 返回 appsecret 的函数
+    :param token_loader: 自定义获取 token 的函数 ``(appid, force_refresh) -> resp_json``，如第三方平台的
+        authorizer_access_token，为空时用 secrets 调用 get_stable_token
+    :param client: 共用的 WeiXinClient，为空时新建一个连接池大小为 max_workers 的；不能配置 cache，
+        缓存的 key 不区分 access_token
+    :param rate: 每个公众号每秒最多请求数，为空时不限速
+    :param per_tenant_workers: submit 时每个公众号最多同时执行的任务数
+    """
+
+    def __init__(
+        self,
+        secrets: Optional[Secrets] = None,
+        token_loader: Optional[TokenLoader] = None,
+        client: Optional[WeiXinClient] = None,
+        rate: Optional[float] = None,
+        burst: int = 10,
+        max_tenants: int = DEFAULT_MAX_TENANTS,
+        max_workers: int = 32,
+        per_tenant_workers: int = 4,
+        refresh_margin: float = 300,
+    ) -> None:
+        if secrets is None and token_loader is None:
+            raise ValueError('secrets 和 token_loader 不能同时为空')
+        if client is None:
+            session = Session()
+            adapter = HTTPAdapter(pool_maxsize=max_workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            client = WeiXinClient(session=session)
+        elif client.cache is not None:
+            raise ValueError('共用的 client 不能配置 cache，缓存不区分公众号')
+        self.client = client
+        self.secrets = secrets
+        self.token_loader = token_loader or self.load_stable_token
+        self.rate = rate
+        self.burst = burst
+        self.max_tenants = max_tenants
+        self.refresh_margin = refresh_margin
+        self.scheduler = FairScheduler(max_workers, per_key_limit=per_tenant_workers, thread_name_prefix='tenant')
+        self._tenants: 'OrderedDict[str, Tenant]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def get_secret(self, appid: str) -> str:
+        return self.secrets(appid) if callable(self.secrets) else self.secrets[appid]
+
+    def load_stable_token(self, appid: str, force_refresh: bool) -> Dict:
+        return self.client.get_stable_token(appid, self.get_secret(appid), force_refresh=force_refresh)
+
+    def tenant(self, appid: str) -> Tenant:
+        """取得公众号状态（不存在时创建），并标记为最近使用"""
+        with self._lock:
+            tenant = self._tenants.get(appid)
+            if tenant is not None:
+                self._tenants.move_to_end(appid)
+                return tenant
+            tokens = TokenCache(lambda force: self.token_loader(appid, force), self.refresh_margin)
+            limiter = RateLimiter(self.rate, burst=self.burst) if self.rate else None
+            tenant = self._tenants[appid] = Tenant(appid, tokens, limiter)
+            self._evict()
+            return tenant
+
+    def _evict(self) -> None:
+        """从最久没用的开始淘汰，跳过还有任务的公众号"""
+        if len(self._tenants) <= self.max_tenants:
+            return
+        for appid in list(self._tenants):
+            if len(self._tenants) <= self.max_tenants:
+                break
+            if not self.scheduler.busy(appid):
+                del self._tenants[appid]
+                self._evictions += 1
+
+    def access_token(self, appid: str) -> str:
+        return self.tenant(appid).tokens.get()
+
+    def call(self, appid: str, method: Union[str, Callable], *args, **kwargs):
+        """在当前线程调用 client.<method>(该公众号的 access_token, *args, **kwargs)
+
+        method 也可以是 ``f(access_token, *args, **kwargs)`` 形式的函数，同样限速、token 失效时刷新后重试一次，
+        统计按函数名记录
+        """
+        tenant = self.tenant(appid)
+        if callable(method):
+            func, method = method, method.__name__
+        else:
+            func = getattr(self.client, method)
+        for attempt in range(2):
+            if tenant.limiter is not None:
+                tenant.limiter.acquire()
+            token = tenant.tokens.get()
+            try:
+                result = func(token, *args, **kwargs)
+            except WeiXinClientError as err:
+                if err.errcode in TOKEN_ERRORS and attempt == 0:
+                    tenant.tokens.invalidate(token)
+                    continue
+                tenant.count(method, failed=True)
+                raise
+            except Exception:
+                tenant.count(method, failed=True)
+                raise
+            tenant.count(method)
+            return result
+
+    def submit(self, appid: str, method: Union[str, Callable], *args, **kwargs) -> Future:
+        """提交到公平调度的线程池执行，返回 Future"""
+        return self.scheduler.submit(appid, self.call, appid, method, *args, **kwargs)
+
+    def account(self, appid: str) -> AccountClient:
+        return AccountClient(self, appid)
+
+    def usage(self, appid: str) -> Dict:
+        return self.tenant(appid).usage()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            tenants = len(self._tenants)
+        return {'tenants': tenants, 'evictions': self._evictions, 'scheduler': self.scheduler.stats(),
+                'client': self.client.stats()}
+
+    def close(self) -> None:
+        self.scheduler.close()
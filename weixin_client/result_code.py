@@ -2,8 +2,22 @@
 https://developers.weixin.qq.com/doc/offiaccount/Getting_Started/Global_Return_Code.html
 """
 SUCC_CODE = 0
+SYSTEM_BUSY = -1
 INVALID_MEDIA = 40007
+# access_token 无效 / 已过期
+INVALID_CREDENTIAL = 40001
+ACCESS_TOKEN_EXPIRED = 42001
+# 卡券 code 已被核销
+CODE_CONSUMED = 40099
 
 DRAFT_NOT_PASS = 53503
 DRAFT_ERROR_53504 = 53504
 DRAFT_ERROR_53505 = 53505
+
+API_FREQ_LIMIT = 45009
+API_TOO_FREQUENT = 45011
+# 群发的 clientmsgid 已经使用过，消息不会重复发送
+CLIENTMSGID_EXIST = 45065
+
+# 表示上游过载、需要降低请求速率的错误码。45001~45008 等是内容超限，不属于过载
+OVERLOAD_CODES = frozenset({SYSTEM_BUSY, API_FREQ_LIMIT, API_TOO_FREQUENT})
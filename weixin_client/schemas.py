@@ -1,3 +1,9 @@
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+from requests_clients.offload import register_stage, run_stage
+from weixin_client.errors import ArticleValidationError
+
 
 def make_article(
     title,
@@ -43,3 +49,97 @@ def make_article(
     article["only_fans_can_comment"] = only_fans_can_comment
 
     return article
+
+
+# 一个草稿最多包含 8 篇文章
+MAX_ARTICLES_PER_DRAFT = 8
+# content 去掉 HTML 标签后必须少于 2 万字符，整体小于 1M
+MAX_CONTENT_CHARS = 20000
+MAX_CONTENT_BYTES = 1024 * 1024
+MAX_TITLE_CHARS = 32
+MAX_AUTHOR_CHARS = 16
+MAX_DIGEST_CHARS = 128
+
+HTML_TAG = re.compile(r'<[^>]*>')
+
+
+def validate_article(article: dict, media_ids: Optional[Set[str]] = None) -> List[Tuple[str, str]]:
+    """校验单篇文章，返回 [(字段, 说明), ...]，合法时返回空列表
+
+    :param media_ids: 已知的永久素材 media_id，传入时 thumb_media_id 必须在其中
+    """
+    errors = []
+
+    title = article.get('title')
+    if not title:
+        errors.append(('title', '标题不能为空'))
+    elif len(title) > MAX_TITLE_CHARS:
+        errors.append(('title', f'标题不能超过{MAX_TITLE_CHARS}个字'))
+
+    author = article.get('author')
+    if author and len(author) > MAX_AUTHOR_CHARS:
+        errors.append(('author', f'作者不能超过{MAX_AUTHOR_CHARS}个字'))
+
+    digest = article.get('digest')
+    if digest and len(digest) > MAX_DIGEST_CHARS:
+        errors.append(('digest', f'摘要不能超过{MAX_DIGEST_CHARS}个字'))
+
+    content = article.get('content')
+    if not content:
+        errors.append(('content', '内容不能为空'))
+    else:
+        # UTF-8 每个字符最多 4 字节，字符数足够少时不需要真正编码
+        if len(content) * 4 >= MAX_CONTENT_BYTES and len(content.encode('utf-8')) >= MAX_CONTENT_BYTES:
+            errors.append(('content', '内容必须小于1M'))
+        if len(content) >= MAX_CONTENT_CHARS and len(HTML_TAG.sub('', content)) >= MAX_CONTENT_CHARS:
+            errors.append(('content', f'内容必须少于{MAX_CONTENT_CHARS}字符'))
+
+    thumb_media_id = article.get('thumb_media_id')
+    if not thumb_media_id:
+        errors.append(('thumb_media_id', '封面图片素材id不能为空'))
+    elif media_ids is not None and thumb_media_id not in media_ids:
+        errors.append(('thumb_media_id', f'{thumb_media_id} 不是已知的永久素材'))
+
+    for field in ('need_open_comment', 'only_fans_can_comment'):
+        if article.get(field, 0) not in (0, 1):
+            errors.append((field, '只能为0或1'))
+
+    return errors
+
+
+def validate_articles(articles: Iterable[dict], media_ids: Optional[Set[str]] = None) -> List[Tuple[int, str, str]]:
+    """一次校验所有文章，返回 [(文章序号, 字段, 说明), ...]"""
+    return [(index, field, message)
+            for index, article in enumerate(articles)
+            for field, message in validate_article(article, media_ids)]
+
+
+register_stage('articles.validate', validate_articles)
+
+
+def pack_articles(articles: List[dict], per_draft: int = MAX_ARTICLES_PER_DRAFT) -> List[List[dict]]:
+    """按每个草稿最多 per_draft 篇文章分组"""
+    if not 1 <= per_draft <= MAX_ARTICLES_PER_DRAFT:
+        raise ValueError(f'per_draft 必须在1~{MAX_ARTICLES_PER_DRAFT}之间')
+    return [articles[start:start + per_draft] for start in range(0, len(articles), per_draft)]
+
+
+def build_drafts(
+    articles: Iterable[dict],
+    media_ids: Optional[Set[str]] = None,
+    per_draft: int = MAX_ARTICLES_PER_DRAFT,
+    offloader=None,
+) -> List[List[dict]]:
+    """校验全部文章并分组为 add_draft 的 articles 参数，有任何不合法的文章时抛出 ArticleValidationError，列出所有错误
+
+        drafts = build_drafts(articles, media_ids={m['media_id'] for m in materials})
+        for draft_articles in drafts:
+            wx_client.add_draft(token, draft_articles)
+
+    :param offloader: requests_clients.offload.Offloader，校验放到进程池执行
+    """
+    articles = list(articles)
+    errors = run_stage(offloader, 'articles.validate', articles, media_ids)
+    if errors:
+        raise ArticleValidationError(errors)
+    return pack_articles(articles, per_draft)
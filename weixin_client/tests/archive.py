@@ -0,0 +1,107 @@
+"""
+pytest weixin_client/tests/archive.py -s
+"""
+import gzip
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from weixin_client.archive import export_archive, import_drafts, import_materials, iter_archive
+from weixin_client.client import WeiXinClient
+
+TOKEN = 'MOCK_TOKEN'
+
+
+def make_client(app):
+    return WeiXinClient(session=mock_session(app))
+
+
+def test_drafts_roundtrip(tmp_path):
+    """
+    pytest weixin_client/tests/archive.py::test_drafts_roundtrip -s
+    """
+    app = MockApp()
+    client = make_client(app)
+    thumb = app.weixin.add_material('image', b'x')['media_id']
+    long_content = '<p>正文</p>' * 1000
+    for index in range(25):
+        client.add_draft(TOKEN, [{'title': f't{index}', 'content': long_content, 'thumb_media_id': thumb},
+                                 {'title': f's{index}', 'content': 'short', 'thumb_media_id': thumb}])
+    drafts = {media_id: draft['news_item'] for media_id, draft in app.weixin.drafts.items()}
+
+    path = str(tmp_path / 'drafts.ndjson.gz')
+    assert export_archive(client, TOKEN, 'drafts', path, page_size=7) == len(drafts)
+    with gzip.open(path, 'rt', encoding='utf-8') as fp:
+        assert len(fp.readlines()) == len(drafts)
+    # 相同的正文只存一份
+    blobs = [name for _, _, names in os.walk(tmp_path / 'drafts.blobs') for name in names]
+    long_contents = {news['content'] for items in drafts.values() for news in items
+                     if len(news['content'].encode('utf-8')) >= 4096}
+    assert long_content in long_contents and len(blobs) == len(long_contents)
+
+    # 只读元数据时正文保持引用
+    meta = list(iter_archive(path, load_content=False))
+    long_item = next(item for item in meta if item['content']['news_item'][0]['title'] == 't0')
+    news = long_item['content']['news_item']
+    assert 'content' not in news[0] and news[0]['content_size'] == len(long_content.encode('utf-8'))
+    assert news[1]['content'] == 'short'
+    assert {item['media_id']: item['content']['news_item'][0].get('content', long_content)
+            for item in iter_archive(path)} == {media_id: items[0]['content'] for media_id, items in drafts.items()}
+
+    # 导入到另一个公众号，封面换成新的 media_id
+    other = MockApp()
+    other_client = make_client(other)
+    new_thumb = other.weixin.add_material('image', b'x')['media_id']
+    results = list(import_drafts(other_client, TOKEN, path, thumb_map={thumb: new_thumb}))
+    assert [result['source'] for result in results] == list(drafts)
+    for result in results:
+        imported = other.weixin.drafts[result['media_id']]['news_item']
+        source = drafts[result['source']]
+        assert [(news['title'], news['content']) for news in imported] == \
+            [(news['title'], news['content']) for news in source]
+        assert [news['thumb_media_id'] for news in imported] == \
+            [{thumb: new_thumb}.get(news['thumb_media_id'], news['thumb_media_id']) for news in source]
+
+
+def test_materials_roundtrip(tmp_path):
+    """
+    pytest weixin_client/tests/archive.py::test_materials_roundtrip -s
+    """
+    app = MockApp()
+    contents = [os.urandom(1000 + index) for index in range(5)]
+    for index, content in enumerate(contents):
+        app.weixin.add_material('image', content, filename=f'{index}.jpg')
+    path = str(tmp_path / 'images.ndjson')
+    count = export_archive(make_client(app), TOKEN, 'materials', path, type='image', download=True)
+    items = list(iter_archive(path))
+    assert len(items) == count and all('blob' in item for item in items)
+
+    other = MockApp()
+    before = set(other.weixin.materials)
+    results = list(import_materials(make_client(other), TOKEN, path, 'image'))
+    assert len(results) == count
+    uploaded = [other.weixin.materials[media_id]['content'] for media_id in set(other.weixin.materials) - before]
+    assert set(contents) <= set(uploaded)
+
+    # 视频素材接口返回的是 JSON，不能当作文件内容下载和上传
+    with pytest.raises(ValueError):
+        export_archive(make_client(app), TOKEN, 'materials', str(tmp_path / 'videos.ndjson'), type='video',
+                       download=True)
+    with pytest.raises(ValueError):
+        list(import_materials(make_client(other), TOKEN, path, 'video'))
+
+
+def test_zstd(tmp_path):
+    """
+    pytest weixin_client/tests/archive.py::test_zstd -s
+    """
+    pytest.importorskip('zstandard')
+    app = MockApp()
+    path = str(tmp_path / 'published.ndjson.zst')
+    count = export_archive(make_client(app), TOKEN, 'published', path)
+    assert [item['article_id'] for item in iter_archive(path)] == list(app.weixin.published)[:count]
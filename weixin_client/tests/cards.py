@@ -0,0 +1,122 @@
+"""
+pytest weixin_client/tests/cards.py -s
+"""
+import os
+import sys
+
+import requests
+
+sys.path.append(os.getcwd())
+
+from requests_clients.breaker import CircuitOpenError
+from requests_clients.mock.adapters import MockAdapter
+from requests_clients.mock.app import MockApp
+from weixin_client.cards import CONSUMED, FAILED, UNKNOWN, RedemptionQueue, sync_cards
+from weixin_client.client import WeiXinClient
+
+
+class LostResponseAdapter(MockAdapter):
+    """请求正常到达桩服务，但 lost 中的 code 第一次核销的响应丢失（ReadTimeout）"""
+
+    def __init__(self, app, lost=()):
+        super().__init__(app)
+        self.lost = set(lost)
+
+    def send(self, request, **kwargs):
+        resp = super().send(request, **kwargs)
+        if request.path_url.startswith('/card/code/consume'):
+            code = resp.request.body.decode('utf-8')
+            for lost in list(self.lost):
+                if f'"{lost}"' in code:
+                    self.lost.discard(lost)
+                    raise requests.exceptions.ReadTimeout('response lost', request=request)
+        return resp
+
+
+def make_client(app, lost=()):
+    session = requests.Session()
+    session.mount('https://', LostResponseAdapter(app, lost))
+    return WeiXinClient(session=session)
+
+
+def test_redemption_queue():
+    """
+    pytest weixin_client/tests/cards.py::test_redemption_queue -s
+    """
+    app = MockApp()
+    card_id = app.weixin.add_card(codes=200)
+    codes = [f'{card_id}-{index}' for index in range(200)]
+    lost = codes[:5]
+    client = make_client(app, lost=lost)
+    queue = RedemptionQueue(client, 'token', max_workers=8)
+
+    results = queue.consume_all(codes + ['NO_SUCH_CODE'])
+    assert [result.status for result in results[:200]] == [CONSUMED] * 200
+    # 响应丢失的 code 通过查询确认已经核销，不会再发一次核销
+    assert all(result.attempts == 1 for result in results[:5])
+    assert results[200].status == FAILED
+
+    # 相同的 code 再提交返回同一个结果，不会再请求
+    count = app.request_count
+    assert queue.submit(codes[0]).result() is results[0]
+    assert app.request_count == count
+    assert queue.stats() == {'submitted': 201, 'pending': 0, CONSUMED: 200, FAILED: 1}
+    queue.close()
+
+
+def test_redemption_unknown():
+    """
+    pytest weixin_client/tests/cards.py::test_redemption_unknown -s
+    """
+    class TimeoutClient:
+        def consume_card(self, *args, **kwargs):
+            raise requests.exceptions.ConnectTimeout('timeout')
+
+        def get_card_code(self, *args, **kwargs):
+            raise requests.exceptions.ConnectTimeout('timeout')
+
+    queue = RedemptionQueue(TimeoutClient(), 'token', retries=2)
+    result = queue.submit('CODE').result()
+    assert result.status == UNKNOWN and result.attempts == 3
+    queue.close()
+
+
+def test_redemption_errors_and_eviction():
+    """
+    pytest weixin_client/tests/cards.py::test_redemption_errors_and_eviction -s
+    """
+    class BreakerClient:
+        def consume_card(self, access_token, code, card_id=None):
+            if code == 'OPEN':
+                raise CircuitOpenError('consume', 10)
+            return {'errcode': 0, 'openid': 'OPENID'}
+
+    queue = RedemptionQueue(BreakerClient(), 'token', max_workers=2, max_keys=3)
+    results = queue.consume_all(['A', 'OPEN', 'B', 'C', 'D'])
+    # 一条被熔断拒绝只记为这一条失败
+    assert [result.status for result in results] == [CONSUMED, FAILED, CONSUMED, CONSUMED, CONSUMED]
+    assert 'CircuitOpenError' in results[1].error
+    assert queue.stats() == {'submitted': 5, 'pending': 0, CONSUMED: 4, FAILED: 1}
+    # 最多保留 3 个已完成的 key
+    assert len(queue._finished) == 3
+    queue.close()
+
+
+def test_sync_cards():
+    """
+    pytest weixin_client/tests/cards.py::test_sync_cards -s
+    """
+    app = MockApp()
+    client = make_client(app)
+    card_ids = [app.weixin.add_card(codes=3) for _ in range(120)]
+
+    index = sync_cards(client, 'token')
+    assert len(index) == 120
+    assert index.get(card_ids[0]).title == '测试券'
+    assert index.get(card_ids[0]).quantity == 3
+
+    client.delete_card('token', card_ids[0])
+    sync_cards(client, 'token', index)
+    assert [card.card_id for card in index.by_status('CARD_STATUS_DELETE')] == [card_ids[0]]
+    sync_cards(client, 'token', index, status_list=['CARD_STATUS_VERIFY_OK'])
+    assert card_ids[0] not in index and len(index) == 119
@@ -0,0 +1,86 @@
+"""
+pytest weixin_client/tests/followers.py -s
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from requests_clients.mock.weixin import WeiXinState
+from weixin_client.client import WeiXinClient
+from weixin_client.followers import enrich_followers, export_openids, iter_openids, load_progress
+
+FOLLOWERS = 25000
+
+
+class FailingClient:
+    """第 fail_at 次调用 method 时抛出异常，模拟导出中途中断"""
+
+    def __init__(self, client, method, fail_at):
+        self.client = client
+        self.method = method
+        self.fail_at = fail_at
+        self.calls = 0
+
+    def __getattr__(self, name):
+        func = getattr(self.client, name)
+        if name != self.method:
+            return func
+
+        def wrapper(*args, **kwargs):
+            self.calls += 1
+            if self.calls == self.fail_at:
+                raise ConnectionError('interrupted')
+            return func(*args, **kwargs)
+        return wrapper
+
+
+def test_export_and_resume(tmp_path):
+    """
+    pytest weixin_client/tests/followers.py::test_export_and_resume -s
+    """
+    app = MockApp(weixin=WeiXinState(follower_count=FOLLOWERS))
+    client = WeiXinClient(session=mock_session(app))
+    path = str(tmp_path / 'openids.txt')
+
+    with pytest.raises(ConnectionError):
+        export_openids(FailingClient(client, 'get_user_list', 3), 'token', path)
+    assert load_progress(path)['count'] == 20000
+    # 模拟写了一半的页
+    with open(path, 'a') as fp:
+        fp.write('oPARTIAL\n')
+
+    assert export_openids(client, lambda: 'token', path) == FOLLOWERS
+    openids = list(iter_openids(path))
+    assert openids == app.weixin.followers
+    # 已完成的导出不会再请求
+    count = app.request_count
+    assert export_openids(client, 'token', path) == FOLLOWERS
+    assert app.request_count == count
+
+
+def test_enrich_and_resume(tmp_path):
+    """
+    pytest weixin_client/tests/followers.py::test_enrich_and_resume -s
+    """
+    app = MockApp(weixin=WeiXinState(follower_count=2050))
+    client = WeiXinClient(session=mock_session(app))
+    openid_path = str(tmp_path / 'openids.txt')
+    output_path = str(tmp_path / 'followers.ndjson')
+    export_openids(client, 'token', openid_path)
+
+    with pytest.raises(ConnectionError):
+        enrich_followers(FailingClient(client, 'batchget_user_info', 10), 'token', openid_path, output_path,
+                         max_workers=4)
+    assert 0 < load_progress(output_path)['batches'] < 10
+
+    assert enrich_followers(client, 'token', openid_path, output_path, max_workers=4) == 2050
+    with open(output_path, encoding='utf-8') as fp:
+        users = [json.loads(line) for line in fp]
+    assert [user['openid'] for user in users] == app.weixin.followers
+    assert users[0]['unionid'] == 'u000000000000000000000000001'
@@ -0,0 +1,87 @@
+"""
+pytest weixin_client/tests/images.py -s
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import Faults, MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.images import ImageUploader, collect_images, localize_images, rewrite_images
+
+ARTICLE = '''
+<p>正文</p>
+<img src="https://example.com/a.png?x=1&amp;y=2" data-src="https://example.com/a.png?x=1&amp;y=2">
+<img data-src='https://example.com/b.jpg' src=//cdn.example.com/c.gif />
+<img src="http://mmbiz.qpic.cn/mmbiz_jpg/abc/0">
+<img src="data:image/png;base64,AAAA">
+'''
+
+
+def test_collect_and_rewrite():
+    """
+    pytest weixin_client/tests/images.py::test_collect_and_rewrite -s
+    """
+    urls = collect_images(ARTICLE)
+    assert urls == ['https://example.com/a.png?x=1&y=2', 'https://example.com/b.jpg', '//cdn.example.com/c.gif']
+    assert collect_images(iter([ARTICLE[:40], ARTICLE[40:]])) == urls
+
+    mapping = {url: f'http://mmbiz.qpic.cn/{index}/0' for index, url in enumerate(urls)}
+    content = rewrite_images(ARTICLE, mapping)
+    assert collect_images(content) == []
+    assert content.count('http://mmbiz.qpic.cn/0/0') == 2
+    assert 'data:image/png;base64,AAAA' in content
+
+
+def test_localize_images_concurrently():
+    """50 张图片的耗时应接近一次下载+上传
+
+    pytest weixin_client/tests/images.py::test_localize_images_concurrently -s
+    """
+    faults = Faults()
+    faults.add('/cgi-bin/media/uploadimg', latency=0.2)
+    app = MockApp(faults=faults)
+    wx_client = WeiXinClient(session=mock_session(app))
+
+    def fetch(url):
+        time.sleep(0.1)
+        # 第 0 张和第 1 张内容相同，只会上传一次
+        index = max(1, int(url.rsplit('/', 1)[1].split('.')[0]))
+        return 'image.png', b'PNG' + index.to_bytes(4, 'big')
+
+    images = [f'https://example.com/{index}.png' for index in range(50)]
+    content = ''.join(f'<p><img src="{url}"></p>' for url in images + images[:5])
+
+    start = time.perf_counter()
+    result = localize_images(wx_client, 'token', content, fetch=fetch)
+    elapsed = time.perf_counter() - start
+
+    assert collect_images(result) == []
+    assert app.request_count == 49
+    assert elapsed < 1.0
+
+
+def test_retry_after_failure():
+    """
+    pytest weixin_client/tests/images.py::test_retry_after_failure -s
+    """
+    app = MockApp()
+    uploader = ImageUploader(WeiXinClient(session=mock_session(app)), 'token', fetch=lambda url: ('a.png', b'PNG'))
+    failing = {'count': 1}
+    upload_img_content = uploader.client.upload_img_content
+
+    def flaky(access_token, content):
+        if failing['count']:
+            failing['count'] -= 1
+            raise ConnectionError('reset')
+        return upload_img_content(access_token, content)
+
+    uploader.client.upload_img_content = flaky
+    with pytest.raises(ConnectionError):
+        uploader.upload(['https://example.com/a.png'])
+    assert uploader.upload(['https://example.com/a.png'])['https://example.com/a.png'].startswith('http')
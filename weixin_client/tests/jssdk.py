@@ -0,0 +1,101 @@
+"""
+pytest weixin_client/tests/jssdk.py -s
+"""
+import os
+import sys
+import threading
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import Faults, MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client import jssdk
+from weixin_client.jssdk import JsapiSigner, make_signature
+
+
+def test_signature():
+    """
+    pytest weixin_client/tests/jssdk.py::test_signature -s
+    """
+    # 官方文档中的示例
+    ticket = 'sM4AOVdWfPE4DxkXGEs8VMCPGGVi4C3VM0P37wVUCFvkVAy_90u5h9nbSlYy3-Sl-HhTdfl2fzFy1AOcHKP7qg'
+    expected = '0f9de62fce790f9a083d5c99e95740ceb90c27ed'
+    assert make_signature(ticket, 'Wm3WZYTPz0wzccnW', 1414587457, 'http://mp.weixin.qq.com?params=value') == expected
+
+    class StubClient:
+        def get_jsapi_ticket(self, access_token):
+            return {'errcode': 0, 'ticket': ticket, 'expires_in': 7200}
+
+    signer = JsapiSigner(StubClient(), 'token')
+    assert signer.signature('http://mp.weixin.qq.com?params=value', 'Wm3WZYTPz0wzccnW', 1414587457) == expected
+
+
+def test_ticket_cache_and_memoize():
+    """
+    pytest weixin_client/tests/jssdk.py::test_ticket_cache_and_memoize -s
+    """
+    faults = Faults()
+    faults.add('/cgi-bin/ticket/getticket', latency=0.05)
+    app = MockApp(faults=faults)
+    client = WeiXinClient(session=mock_session(app))
+    signer = JsapiSigner(client, lambda: 'token', appid='APPID', memoize=True)
+
+    # 并发签名只取一次 ticket
+    threads = [threading.Thread(target=signer.sign, args=(f'https://example.com/{i}',)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert app.request_count == 1
+
+    config = signer.sign('https://example.com/page?id=1#top')
+    assert config['appId'] == 'APPID'
+    assert config['signature'] == make_signature(
+        'MOCK_TICKET_token', config['nonceStr'], config['timestamp'], 'https://example.com/page?id=1')
+    # 同一 URL（忽略 #）复用签名
+    assert signer.sign('https://example.com/page?id=1#other') == config
+
+    signer.invalidate()
+    assert signer.sign('https://example.com/page?id=1') != config
+    assert app.request_count == 2
+
+
+def test_refresh_during_sign(monkeypatch):
+    """签名期间 ticket 被其他线程刷新，旧 ticket 的签名不能缓存到新 ticket 下
+
+    pytest weixin_client/tests/jssdk.py::test_refresh_during_sign -s
+    """
+    tickets = iter(['old', 'new'])
+
+    class StubClient:
+        def get_jsapi_ticket(self, access_token):
+            return {'errcode': 0, 'ticket': next(tickets), 'expires_in': 7200}
+
+    signer = JsapiSigner(StubClient(), 'token', memoize=True)
+
+    def racing(ticket, *args):
+        signer.invalidate()
+        signer.ticket()
+        return make_signature(ticket, *args)
+
+    monkeypatch.setattr(jssdk, 'make_signature', racing)
+    signer.sign('https://example.com/')
+    monkeypatch.undo()
+
+    config = signer.sign('https://example.com/')
+    assert config['signature'] == make_signature('new', config['nonceStr'], config['timestamp'], 'https://example.com/')
+
+
+def test_ticket_not_cached():
+    """响应缓存不能返回旧的 ticket，否则签名器会按完整的 expires_in 继续使用它
+
+    pytest weixin_client/tests/jssdk.py::test_ticket_not_cached -s
+    """
+    app = MockApp()
+    client = WeiXinClient(session=mock_session(app), cache=WeiXinClient.make_cache())
+    signer = JsapiSigner(client, 'token')
+    signer.ticket()
+    signer.invalidate()
+    signer.ticket()
+    assert app.request_count == 2
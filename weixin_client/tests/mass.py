@@ -0,0 +1,62 @@
+"""
+pytest weixin_client/tests/mass.py -s
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from requests_clients.mock.weixin import WeiXinState
+from weixin_client.client import WeiXinClient
+from weixin_client.mass import (DUPLICATE, ERROR, SEND_SUCCESS, chunk_openids, mass_send_openids,
+                                track_mass_status)
+
+TEXT = {'content': 'hello'}
+
+
+def test_chunk_openids():
+    """
+    pytest weixin_client/tests/mass.py::test_chunk_openids -s
+    """
+    openids = [f'o{i}' for i in range(21)]
+    chunks = list(chunk_openids(iter(openids), size=10))
+    # 最后一块只剩 1 个时从上一块借一个
+    assert [len(chunk) for chunk in chunks] == [10, 9, 2]
+    assert sum(chunks, []) == openids
+    assert [len(chunk) for chunk in chunk_openids(openids[:20], size=10)] == [10, 10]
+    assert list(chunk_openids([], size=10)) == []
+    with pytest.raises(ValueError):
+        list(chunk_openids(['o1']))
+    with pytest.raises(ValueError):
+        list(chunk_openids(openids, size=10001))
+
+
+def test_send_and_track():
+    """
+    pytest weixin_client/tests/mass.py::test_send_and_track -s
+    """
+    state = WeiXinState(follower_count=25001)
+    app = MockApp(weixin=state)
+    client = WeiXinClient(session=mock_session(app))
+
+    chunks = mass_send_openids(client, 'token', iter(state.followers), 'text', TEXT, campaign_id='c1', rate=100)
+    assert [chunk.recipients for chunk in chunks] == [10000, 10000, 5001]
+    assert all(chunk.msg_id is not None and not chunk.openids for chunk in chunks)
+
+    report = track_mass_status(client, 'token', chunks, interval=0.01)
+    assert report.done
+    assert report.counts == {SEND_SUCCESS: 3}
+    assert report.recipients == {SEND_SUCCESS: 25001}
+
+    # 相同 campaign_id 重发不会重复发送
+    again = mass_send_openids(client, 'token', iter(state.followers), 'text', TEXT, campaign_id='c1')
+    assert {chunk.status for chunk in again} == {DUPLICATE}
+
+    # 接口报错的块保留 openid 便于重试
+    failed = mass_send_openids(client, '', state.followers[:3], 'text', TEXT)
+    report = track_mass_status(client, 'token', failed, interval=0.01)
+    assert report.counts == {ERROR: 1} and report.failed[0].openids == state.followers[:3]
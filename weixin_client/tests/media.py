@@ -0,0 +1,128 @@
+"""
+pytest weixin_client/tests/media.py -s
+"""
+import hashlib
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.media import MediaLibrary
+
+TOKEN = 'MOCK_TOKEN'
+
+
+def make_library(tmp_path):
+    (tmp_path / 'thumbs').mkdir()
+    (tmp_path / 'thumbs' / 'cover.jpg').write_bytes(b'cover' * 10000)
+    (tmp_path / 'thumbs' / 'copy.jpg').write_bytes(b'cover' * 10000)
+    (tmp_path / 'logo.png').write_bytes(b'logo' * 1000)
+    (tmp_path / 'empty.txt').write_bytes(b'')
+    return MediaLibrary(str(tmp_path))
+
+
+def test_scan(tmp_path):
+    """
+    pytest weixin_client/tests/media.py::test_scan -s
+    """
+    library = make_library(tmp_path)
+    digests = library.scan()
+    assert sorted(digests) == ['empty.txt', 'logo.png', 'thumbs/copy.jpg', 'thumbs/cover.jpg']
+    assert digests['logo.png'] == hashlib.md5(b'logo' * 1000).hexdigest()
+    assert library.buffer('empty.txt') == b''
+    assert library.buffer('logo.png')[:4] == b'logo'
+
+    # 内容变化后重新计算，删除的文件从索引中移除
+    (tmp_path / 'logo.png').write_bytes(b'new logo')
+    os.remove(tmp_path / 'empty.txt')
+    digests = library.scan()
+    assert digests['logo.png'] == hashlib.md5(b'new logo').hexdigest()
+    assert library.buffer('logo.png')[:] == b'new logo'
+    assert 'empty.txt' not in library.files
+
+    with pytest.raises(ValueError):
+        library.digest('../outside.jpg')
+
+
+def test_upload_dedup(tmp_path):
+    """
+    pytest weixin_client/tests/media.py::test_upload_dedup -s
+    """
+    app = MockApp()
+    client = WeiXinClient(session=mock_session(app))
+    library = make_library(tmp_path)
+
+    first = library.add_material(client, TOKEN, 'thumbs/cover.jpg', 'image', account='wx1')
+    assert app.weixin.materials[first['media_id']]['content'] == b'cover' * 10000
+    count = app.request_count
+    # 相同内容（包括不同路径）不再上传
+    assert library.add_material(client, TOKEN, 'thumbs/cover.jpg', 'image', account='wx1') == first
+    assert library.add_material(client, TOKEN, 'thumbs/copy.jpg', 'image', account='wx1') == first
+    assert app.request_count == count
+    # 其他公众号需要重新上传
+    assert library.add_material(client, TOKEN, 'thumbs/cover.jpg', 'image', account='wx2') != first
+
+    url = library.upload_img(client, TOKEN, 'logo.png')['url']
+    assert hashlib.md5(b'logo' * 1000).hexdigest() in url
+
+    # 索引持久化，新进程也不用重新上传
+    count = app.request_count
+    reopened = MediaLibrary(str(tmp_path))
+    assert reopened.add_material(client, TOKEN, 'thumbs/cover.jpg', 'image', account='wx1') == first
+    assert app.request_count == count
+
+    # 素材被删除后重新上传
+    assert reopened.forget(first['media_id']) == 1
+    assert reopened.add_material(client, TOKEN, 'thumbs/cover.jpg', 'image', account='wx1') != first
+    assert reopened.stats()['uploads'] == 1 and reopened.stats()['hits'] == 1
+
+    # 计算 md5 之后索引条目被并发的 scan() 移除，上传仍然使用同一次 stat 的大小
+    digest = reopened._digest
+
+    def digest_then_drop(relpath):
+        result = digest(relpath)
+        reopened.files.clear()
+        return result
+
+    reopened._digest = digest_then_drop
+    reopened.add_material(client, TOKEN, 'logo.png', 'image', account='wx1')
+    assert reopened.stats()['bytes_uploaded'] == 50000 + 4000
+
+
+def test_concurrent_upload(tmp_path):
+    """
+    pytest weixin_client/tests/media.py::test_concurrent_upload -s
+    """
+    app = MockApp()
+    app.faults.add('/cgi-bin/material/add_material', latency=0.05)
+    client = WeiXinClient(session=mock_session(app))
+    library = make_library(tmp_path)
+    results = []
+
+    def upload():
+        results.append(library.add_material(client, TOKEN, 'thumbs/cover.jpg', 'image'))
+
+    threads = [threading.Thread(target=upload) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({result['media_id'] for result in results}) == 1
+    assert library.stats()['uploads'] == 1
+
+    # 并发上传不同的文件，落盘的索引包含全部结果
+    for index in range(16):
+        (tmp_path / f'{index}.jpg').write_bytes(b'image%d' % index)
+    threads = [threading.Thread(target=library.add_material, args=(client, TOKEN, f'{index}.jpg', 'image'))
+               for index in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(MediaLibrary(str(tmp_path)).uploads) == 17
@@ -0,0 +1,62 @@
+"""
+pytest weixin_client/tests/models.py -s
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.models import (Draft, NewsItem, parse_draft_list, parse_publish_list,
+                                  parse_publish_status)
+
+
+def test_parse_draft_list():
+    """
+    pytest weixin_client/tests/models.py::test_parse_draft_list -s
+    """
+    wx_client = WeiXinClient(session=mock_session(MockApp()))
+    resp_json = wx_client.get_draft_list('token')
+    page = parse_draft_list(resp_json)
+    assert page.total_count == resp_json['total_count']
+    assert len(page.item) == resp_json['item_count']
+
+    draft = page.item[0]
+    news = resp_json['item'][0]['content']['news_item'][0]
+    assert isinstance(draft, Draft)
+    assert draft.media_id == resp_json['item'][0]['media_id']
+    assert draft.news_item[0].content == news['content']
+    assert len(draft.news_item[0].packed_content) < len(news['content'].encode('utf-8'))
+    assert draft.news_item[0].to_dict() == dict(news, is_deleted=False)
+
+    with pytest.raises(AttributeError):
+        draft.extra = 1
+
+
+def test_parse_publish():
+    """
+    pytest weixin_client/tests/models.py::test_parse_publish -s
+    """
+    wx_client = WeiXinClient(session=mock_session(MockApp()))
+    page = parse_publish_list(wx_client.get_success_publish_list('token', no_content=1))
+    assert page.item[0].article_id
+    assert page.item[0].news_item[0].content == ''
+
+    draft_id = wx_client.get_draft_list('token')['item'][0]['media_id']
+    publish_id = wx_client.publish_article('token', draft_id)['publish_id']
+    status = parse_publish_status(wx_client.query_publish_status('token', publish_id))
+    assert status.publish_status == 0
+    assert len(status.article_urls) == 1
+
+
+def test_short_content_is_not_compressed():
+    """
+    pytest weixin_client/tests/models.py::test_short_content_is_not_compressed -s
+    """
+    news = NewsItem.from_dict({'title': '标题', 'content': '<p>内容</p>'})
+    assert news.packed_content[0] == 0
+    assert news.content == '<p>内容</p>'
@@ -0,0 +1,121 @@
+"""
+pytest weixin_client/tests/outbox.py -s
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.outbox import DEAD, DONE, INFLIGHT, Outbox
+
+DATA = {'thing1': {'value': 'hello'}}
+
+
+def make_outbox(path, app, **kwargs):
+    return Outbox(str(path), WeiXinClient(session=mock_session(app)), 'token', **kwargs)
+
+
+def test_enqueue_and_drain(tmp_path):
+    """
+    pytest weixin_client/tests/outbox.py::test_enqueue_and_drain -s
+    """
+    app = MockApp()
+    outbox = make_outbox(tmp_path / 'outbox.db', app)
+    ids = [outbox.enqueue('bizsend_message', f'openid{i}', 'TEMPLATE', DATA, key=f'order-{i}') for i in range(20)]
+    # 相同 key 只入队一次
+    assert outbox.enqueue('bizsend_message', 'openid0', 'TEMPLATE', DATA, key='order-0') == ids[0]
+    media_id = app.weixin.add_material('image', b'x')['media_id']
+    draft_id = outbox.enqueue('add_draft', [{'title': 't', 'content': 'c', 'thumb_media_id': media_id}])
+
+    assert outbox.drain() == 21
+    assert len(app.weixin.sent_messages) == 20
+    assert outbox.get(draft_id).status == DONE
+    assert outbox.get(draft_id).result['media_id'] in app.weixin.drafts
+    stats = outbox.stats()
+    assert stats[DONE] == 21 and stats['enqueued'] == 21 and stats['duplicates'] == 1
+
+    # 已经完成的 key 再次入队也不会重复发送
+    outbox.enqueue('bizsend_message', 'openid0', 'TEMPLATE', DATA, key='order-0')
+    assert outbox.drain() == 0
+
+
+def test_dead_letters(tmp_path):
+    """
+    pytest weixin_client/tests/outbox.py::test_dead_letters -s
+    """
+    app = MockApp()
+    outbox = make_outbox(tmp_path / 'outbox.db', app, backoff=0, max_attempts=3)
+    # 参数错误（47003）直接进入死信
+    invalid = outbox.enqueue('bizsend_message', 'openid', '', DATA)
+    # 系统繁忙重试 3 次后进入死信
+    app.faults.add('/cgi-bin/freepublish/submit', error_rate=1.0, errcode=-1)
+    media_id = app.weixin.add_material('image', b'x')['media_id']
+    article = {'title': 't', 'content': 'c', 'thumb_media_id': media_id}
+    draft_id = outbox.client.add_draft('token', [article])['media_id']
+    busy = outbox.enqueue('publish_article', draft_id)
+
+    outbox.drain()
+    assert outbox.get(invalid).status == DEAD and outbox.get(invalid).attempts == 1
+    assert outbox.get(busy).status == DEAD and outbox.get(busy).attempts == 3
+    assert [job.id for job in outbox.dead_letters()] == [invalid, busy]
+
+    del app.faults.overrides['/cgi-bin/freepublish/submit']
+    assert outbox.retry_dead([busy]) == 1
+    outbox.drain()
+    assert outbox.get(busy).status == DONE
+
+
+def test_crash_recovery(tmp_path):
+    """
+    pytest weixin_client/tests/outbox.py::test_crash_recovery -s
+    """
+    app = MockApp()
+    path = tmp_path / 'outbox.db'
+    crashed = make_outbox(path, app, lease=0.05)
+    job_id = crashed.enqueue('bizsend_message', 'openid', 'TEMPLATE', DATA)
+    # 取走后没有完成（进程崩溃），租期到了之后新进程会重新发送
+    assert crashed.claim().id == job_id
+    assert crashed.get(job_id).status == INFLIGHT
+
+    outbox = make_outbox(path, app)
+    assert outbox.drain() == 0
+    time.sleep(0.1)
+    assert outbox.drain() == 1
+    assert outbox.get(job_id).status == DONE and outbox.get(job_id).attempts == 2
+
+
+def test_lost_lease(tmp_path):
+    """租期过期、任务被重新取走后，原来的线程写回的结果被丢弃
+
+    pytest weixin_client/tests/outbox.py::test_lost_lease -s
+    """
+    app = MockApp()
+    path = tmp_path / 'outbox.db'
+    slow = make_outbox(path, app, lease=0.05)
+    job_id = slow.enqueue('bizsend_message', 'openid', 'TEMPLATE', DATA)
+    stale = slow.claim()
+    time.sleep(0.1)
+
+    outbox = make_outbox(path, app)
+    assert outbox.drain() == 1
+    slow.fail(stale, 'late failure', retryable=False)
+    assert outbox.get(job_id).status == DONE and outbox.get(job_id).error is None
+    assert slow.stats()['lost_leases'] == 1 and slow.stats()['dead'] == 0
+
+
+def test_background_workers(tmp_path):
+    """
+    pytest weixin_client/tests/outbox.py::test_background_workers -s
+    """
+    app = MockApp()
+    with make_outbox(tmp_path / 'outbox.db', app, poll_interval=0.01).start() as outbox:
+        for i in range(50):
+            outbox.enqueue('bizsend_message', f'openid{i}', 'TEMPLATE', DATA)
+        deadline = time.monotonic() + 5
+        while outbox.stats()[DONE] < 50 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert len(app.weixin.sent_messages) == 50
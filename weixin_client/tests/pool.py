@@ -0,0 +1,100 @@
+"""
+pytest weixin_client/tests/pool.py -s
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.errors import WeiXinClientError
+from weixin_client.pool import WeiXinClientPool
+
+DATA = {'thing1': {'value': 'hello'}}
+
+
+def make_pool(app, **kwargs):
+    secrets = {f'wx{index}': 'secret' for index in range(20)}
+    return WeiXinClientPool(secrets, client=WeiXinClient(session=mock_session(app)), **kwargs)
+
+
+def test_account_client():
+    """
+    pytest weixin_client/tests/pool.py::test_account_client -s
+    """
+    app = MockApp()
+    pool = make_pool(app)
+    account = pool.account('wx1')
+    assert account.get_material_count()['image_count'] == 3
+    account.bizsend_message('openid', 'TEMPLATE', DATA)
+    assert app.weixin.sent_messages[-1]['touser'] == 'openid'
+    # token 只取一次
+    assert pool.access_token('wx1') == 'MOCK_STABLE_TOKEN_wx1'
+    assert len(app.weixin.stable_tokens) == 1
+    assert pool.usage('wx1')['calls'] == {'get_material_count': 1, 'bizsend_message': 1}
+
+    with pytest.raises(AttributeError):
+        account.no_such_method
+    with pytest.raises(KeyError):
+        pool.account('unknown').get_material_count()
+    pool.close()
+
+
+def test_token_refresh():
+    """
+    pytest weixin_client/tests/pool.py::test_token_refresh -s
+    """
+    app = MockApp()
+    pool = make_pool(app)
+    old_token = pool.access_token('wx1')
+    # token 在别处被强制刷新，旧 token 返回 40001，刷新后重试一次
+    app.weixin.revoked.add(old_token)
+    assert pool.account('wx1').get_material_count()['image_count'] == 3
+    assert pool.access_token('wx1') != old_token
+
+    with pytest.raises(WeiXinClientError):
+        pool.account('wx1').bizsend_message('', 'TEMPLATE', DATA)
+    assert pool.usage('wx1')['errors'] == {'bizsend_message': 1}
+
+    # 传入函数时同样刷新 token 后重试
+    app.weixin.revoked.add(pool.access_token('wx1'))
+
+    def count_images(access_token):
+        return pool.client.get_material_count(access_token)['image_count']
+
+    assert pool.submit('wx1', count_images).result() == 3
+    pool.close()
+
+
+def test_submit_and_eviction():
+    """
+    pytest weixin_client/tests/pool.py::test_submit_and_eviction -s
+    """
+    app = MockApp()
+    pool = make_pool(app, max_tenants=3, max_workers=4, per_tenant_workers=2)
+    futures = [pool.submit(f'wx{index % 10}', 'bizsend_message', f'o{index}', 'TEMPLATE', DATA) for index in range(100)]
+    for future in futures:
+        future.result()
+    assert len(app.weixin.sent_messages) == 100
+    # 有任务的公众号不会被淘汰，空闲后下次新建公众号状态时淘汰
+    assert pool.stats()['tenants'] > 3
+
+    pool.account('wx10').get_material_count()
+    stats = pool.stats()
+    assert stats['tenants'] == 3 and stats['evictions'] >= 8
+    assert stats['scheduler']['inflight'] == 0
+    pool.close()
+
+
+def test_shared_cache_rejected():
+    """
+    pytest weixin_client/tests/pool.py::test_shared_cache_rejected -s
+    """
+    with pytest.raises(ValueError):
+        WeiXinClientPool({}, client=WeiXinClient(cache=WeiXinClient.make_cache()))
+    with pytest.raises(ValueError):
+        WeiXinClientPool()
@@ -0,0 +1,55 @@
+"""
+pytest weixin_client/tests/prepared.py -s
+"""
+import os
+import sys
+from json import dumps as json_dumps
+
+import pytest
+from requests import Request
+
+sys.path.append(os.getcwd())
+
+from weixin_client.client import WeiXinClient
+
+CASES = [
+    ('get', 'https://api.weixin.qq.com/cgi-bin/draft/count', {'access_token': 'TOKEN'}, None),
+    ('get', 'https://api.weixin.qq.com/cgi-bin/user/get', {'access_token': 'a b&c', 'next_openid': None}, None),
+    ('post', 'https://api.weixin.qq.com/cgi-bin/message/mass/get', {'access_token': 'TOKEN'}, {'msg_id': 1}),
+    ('post', 'https://api.weixin.qq.com/cgi-bin/message/subscribe/bizsend', {'access_token': 'TOKEN'},
+     {'touser': 'openid', 'data': {'thing1': {'value': '中文'}}}),
+    ('post', 'https://api.weixin.qq.com/cgi-bin/material/add_material', {'access_token': 'T', 'type': 'image'}, {}),
+]
+
+
+@pytest.mark.parametrize('method,url,params,json', CASES)
+def test_template_matches_prepare(method, url, params, json):
+    """
+    pytest weixin_client/tests/prepared.py::test_template_matches_prepare -s
+    """
+    expected = Request(method=method, url=url, params=params, json=json).prepare()
+    if json is not None:
+        expected.body = json_dumps(json, ensure_ascii=False, allow_nan=False).encode('utf-8')
+        expected.prepare_content_length(expected.body)
+
+    client = WeiXinClient()
+    for _ in range(2):
+        prepared = client.prepare_request(method, url, params=params, json=json)
+        assert prepared.method == expected.method
+        assert prepared.url == expected.url
+        assert prepared.body == expected.body
+        assert dict(prepared.headers) == dict(expected.headers)
+
+
+def test_template_is_not_mutated():
+    """
+    pytest weixin_client/tests/prepared.py::test_template_is_not_mutated -s
+    """
+    client = WeiXinClient()
+    url = 'https://api.weixin.qq.com/cgi-bin/message/mass/get'
+    first = client.prepare_request('post', url, params={'access_token': 'A'}, json={'msg_id': 1})
+    second = client.prepare_request('post', url, params={'access_token': 'B'}, json={'msg_id': 22})
+    assert first.url.endswith('access_token=A')
+    assert first.headers['Content-Length'] == str(len(first.body))
+    assert second.headers['Content-Length'] == str(len(second.body))
+    assert len(client._templates) == 1
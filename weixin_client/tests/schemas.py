@@ -0,0 +1,70 @@
+"""
+pytest weixin_client/tests/schemas.py -s
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from requests_clients.mock.adapters import mock_session
+from requests_clients.mock.app import MockApp
+from weixin_client.client import WeiXinClient
+from weixin_client.errors import ArticleValidationError
+from weixin_client.schemas import build_drafts, make_article, validate_articles
+
+
+def test_validate_articles_reports_all_errors():
+    """
+    pytest weixin_client/tests/schemas.py::test_validate_articles_reports_all_errors -s
+    """
+    articles = [
+        make_article('标题', '内容', 'MEDIA_1'),
+        make_article('', '内容', ''),
+        make_article('标题' * 20, '<p>' + '字' * 20000 + '</p>', 'MEDIA_2'),
+        make_article('标题', 'a' * (1024 * 1024), 'MEDIA_1', need_open_comment=2),
+    ]
+    errors = validate_articles(articles, media_ids={'MEDIA_1'})
+    assert [(index, field) for index, field, _ in errors] == [
+        (1, 'title'),
+        (1, 'thumb_media_id'),
+        (2, 'title'),
+        (2, 'content'),
+        (2, 'thumb_media_id'),
+        (3, 'content'),
+        (3, 'content'),
+        (3, 'need_open_comment'),
+    ]
+
+    with pytest.raises(ArticleValidationError) as exc_info:
+        build_drafts(articles)
+    assert len(exc_info.value.errors) == 7
+
+
+def test_build_drafts_packs_articles():
+    """
+    pytest weixin_client/tests/schemas.py::test_build_drafts_packs_articles -s
+    """
+    articles = [make_article(f'标题{i}', '内容', 'MEDIA_1') for i in range(17)]
+    assert [len(draft) for draft in build_drafts(articles)] == [8, 8, 1]
+    assert [len(draft) for draft in build_drafts(articles, per_draft=5)] == [5, 5, 5, 2]
+    with pytest.raises(ValueError):
+        build_drafts(articles, per_draft=9)
+
+
+def test_add_drafts():
+    """
+    pytest weixin_client/tests/schemas.py::test_add_drafts -s
+    """
+    app = MockApp()
+    wx_client = WeiXinClient(session=mock_session(app))
+    media_id = next(iter(app.weixin.materials))
+    articles = [make_article(f'标题{i}', '内容', media_id) for i in range(10)]
+    results = wx_client.add_drafts('token', articles)
+    assert len(results) == 2
+
+    count = app.request_count
+    with pytest.raises(ArticleValidationError):
+        wx_client.add_drafts('token', articles + [make_article('标题', '', media_id)])
+    assert app.request_count == count
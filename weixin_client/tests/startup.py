@@ -0,0 +1,59 @@
+"""
+pytest weixin_client/tests/startup.py -s
+"""
+import os
+import subprocess
+import sys
+
+sys.path.append(os.getcwd())
+
+from requests_clients.importtime import IMPORT_BUDGET_MS, MODULE_BUDGET, cold_start, import_time_us
+from weixin_client.client import WeiXinClient
+
+# 导入客户端时不应该加载的可选模块，用到时才导入
+LAZY_MODULES = (
+    'multiprocessing',
+    'concurrent.futures.process',
+    'concurrent.futures.thread',
+    'sqlite3',
+    'requests_clients.cache',
+    'requests_clients.multipart',
+    'weixin_client.outbox',
+    'weixin_client.pool',
+    'httpx',
+)
+
+
+def test_lazy_imports():
+    """
+    pytest weixin_client/tests/startup.py::test_lazy_imports -s
+    """
+    code = ('import sys, weixin_client.client, baidu_client.client; '
+            f'print(",".join(name for name in {LAZY_MODULES!r} if name in sys.modules))')
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.getcwd(), capture_output=True, text=True,
+                            check=True).stdout
+    assert output.strip() == ''
+
+
+def test_import_budget():
+    """导入耗时和模块数不能超过 requests_clients.importtime 中的预算
+
+    pytest weixin_client/tests/startup.py::test_import_budget -s
+    """
+    cold_start()
+    seconds, modules = cold_start()
+    assert modules <= MODULE_BUDGET
+    # 取最小值，排除磁盘缓存和调度抖动
+    import_ms = min(import_time_us('weixin_client.client') for _ in range(3)) / 1000
+    assert import_ms <= IMPORT_BUDGET_MS, f'导入 weixin_client.client 耗时 {import_ms:.1f}ms'
+
+
+def test_default_session():
+    """
+    pytest weixin_client/tests/startup.py::test_default_session -s
+    """
+    client = WeiXinClient()
+    # 构造时不创建 Session，第一次请求时创建后复用
+    assert client._default_session is None
+    assert client.default_session() is client.default_session()
+    assert client.make_cache().ttls['/cgi-bin/draft/count'] == 60